@@ -1,15 +1,54 @@
 """Client for external API services."""
 
-import requests
-import pandas as pd
+from __future__ import annotations
+
 import io
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Tuple, Callable, Iterator
 from config import WISE_API_HEADERS, DEFAULT_CUSTOMER_ID
+from utils import report_progress, lazy_import
+from telemetry import WISE_API_LATENCY
+
+# Loaded on first API call rather than at app startup
+requests = lazy_import("requests")
+pd = lazy_import("pandas")
 
 # Split the comma-separated IDs into a list
 CUSTOMER_IDS = [cid.strip() for cid in DEFAULT_CUSTOMER_ID.split(',')]
 
+# Failures of the API calls made inside track_fetch_errors(); the fetch
+# functions return empty results on error, which look like a quiet day
+_fetch_errors: ContextVar[Optional[List[str]]] = ContextVar("fetch_errors", default=None)
+
+@contextmanager
+def track_fetch_errors() -> Iterator[List[str]]:
+    """
+    Collect the API failures of the calls made inside the block.
+    
+    Yields:
+        List that receives a description of each failed call
+    """
+    errors: List[str] = []
+    token = _fetch_errors.set(errors)
+    try:
+        yield errors
+    finally:
+        _fetch_errors.reset(token)
+
+def record_fetch_error(source: str, error: Any) -> None:
+    """
+    Note a failed API call for the enclosing track_fetch_errors() block, if any.
+    
+    Args:
+        source: API or data source that failed
+        error: Exception or description
+    """
+    errors = _fetch_errors.get()
+    if errors is not None:
+        errors.append(f"{source}: {error}")
+
 def get_tomorrow_date_range(days_ahead: int = 2) -> Tuple[datetime, datetime, datetime, datetime]:
     """
     Get tomorrow's date range for API requests.
@@ -76,7 +115,8 @@ def get_priority_report(sheet_name: Optional[str] = None) -> Optional[Dict[str,
     
     try:
         print("Fetching priority report file...")
-        response = requests.post(url, headers=WISE_API_HEADERS, json=payload)
+        with WISE_API_LATENCY.time(endpoint="priority_report", customer="all"):
+            response = requests.post(url, headers=WISE_API_HEADERS, json=payload)
         response.raise_for_status()
         
         if response.status_code == 200:
@@ -112,6 +152,7 @@ def get_priority_report(sheet_name: Optional[str] = None) -> Optional[Dict[str,
     
     except Exception as e:
         print(f"Error fetching priority report: {str(e)}")
+        record_fetch_error("priority_report", e)
         return None
 
 def get_inbound_receipts(target_date: Optional[datetime] = None) -> List[Dict[str, Any]]:
@@ -141,7 +182,8 @@ def get_inbound_receipts(target_date: Optional[datetime] = None) -> List[Dict[st
 
     try:
         print("Fetching inbound receipts...")
-        response = requests.post(url, headers=WISE_API_HEADERS, json=payload)
+        with WISE_API_LATENCY.time(endpoint="inbound_receipts", customer="all"):
+            response = requests.post(url, headers=WISE_API_HEADERS, json=payload)
         response.raise_for_status()
         
         data = response.json()
@@ -152,6 +194,7 @@ def get_inbound_receipts(target_date: Optional[datetime] = None) -> List[Dict[st
     
     except Exception as e:
         print(f"Error in inbound receipt API: {str(e)}")
+        record_fetch_error("inbound_receipts", e)
         return []
 
 def get_equipment_details() -> List[Dict[str, Any]]:
@@ -175,13 +218,15 @@ def get_equipment_details() -> List[Dict[str, Any]]:
         
         try:
             print(f"Fetching equipment details for customer {customer_id}...")
-            response = requests.post(url, headers=WISE_API_HEADERS, json=payload)
+            with WISE_API_LATENCY.time(endpoint="equipment_detail", customer=customer_id):
+                response = requests.post(url, headers=WISE_API_HEADERS, json=payload)
             response.raise_for_status()
             
             data = response.json()
             
             if not isinstance(data, list):
                 print(f"Unexpected response format from equipment details API for {customer_id}. Expected list, got {type(data)}")
+                record_fetch_error(f"equipment_detail/{customer_id}", f"unexpected response {type(data).__name__}")
                 continue
                 
             # Extract equipment details with receipt IDs
@@ -199,15 +244,21 @@ def get_equipment_details() -> List[Dict[str, Any]]:
                 
         except Exception as e:
             print(f"Error in fetching equipment details for {customer_id}: {str(e)}")
+            record_fetch_error(f"equipment_detail/{customer_id}", e)
     
     print(f"Processed {len(all_equipment_details)} equipment details with receipt IDs across all customers")
     
     return all_equipment_details
 
-def get_outbound_orders(target_date: Optional[datetime] = None):
+def get_outbound_orders(target_date: Optional[datetime] = None,
+                        progress_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None):
     """
     Get outbound orders from status report.
     
+    Args:
+        target_date: Date to fetch orders for, defaults to tomorrow
+        progress_callback: Optional callable notified as each customer's fetch completes
+    
     Returns:
         List of dictionaries containing outbound order information
     """
@@ -232,10 +283,12 @@ def get_outbound_orders(target_date: Optional[datetime] = None):
             "statuses": ["Imported", "Open", "Planning", "Planned", "Committed"]
         }
         
+        orders = []
         try:
             print(f"Fetching outbound orders for customer {customer_id}...")
             print(f"DEBUG: Date range for {customer_id}: {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
-            response = requests.post(url, headers=WISE_API_HEADERS, json=payload)
+            with WISE_API_LATENCY.time(endpoint="outbound_orders", customer=customer_id):
+                response = requests.post(url, headers=WISE_API_HEADERS, json=payload)
             response.raise_for_status()
             
             data = response.json()
@@ -263,15 +316,28 @@ def get_outbound_orders(target_date: Optional[datetime] = None):
         
         except Exception as e:
             print(f"Error in outbound status report API for {customer_id}: {str(e)}")
+            record_fetch_error(f"outbound_orders/{customer_id}", e)
+        
+        report_progress(progress_callback, "customer_fetched", {
+            'customer': customer_id,
+            'source': 'outbound_orders',
+            'date': start_date.strftime('%Y-%m-%d'),
+            'orders': len(orders)
+        })
     
     print(f"Retrieved {len(all_processed_orders)} outbound orders across all customers")    
     return all_processed_orders
 
 
-def get_picked_outbound_orders(target_date: Optional[datetime] = None):
+def get_picked_outbound_orders(target_date: Optional[datetime] = None,
+                               progress_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None):
     """
     Get picked outbound orders from status report.
     
+    Args:
+        target_date: Date to fetch orders for, defaults to tomorrow
+        progress_callback: Optional callable notified as each customer's fetch completes
+    
     Returns:
         List of dictionaries containing picked outbound order information
     """
@@ -297,9 +363,11 @@ def get_picked_outbound_orders(target_date: Optional[datetime] = None):
         }
 
         
+        orders = []
         try:
             print(f"Fetching picked outbound orders for customer {customer_id}...")
-            response = requests.post(url, headers=WISE_API_HEADERS, json=payload)
+            with WISE_API_LATENCY.time(endpoint="picked_outbound_orders", customer=customer_id):
+                response = requests.post(url, headers=WISE_API_HEADERS, json=payload)
             response.raise_for_status()
             
             data = response.json()
@@ -329,6 +397,14 @@ def get_picked_outbound_orders(target_date: Optional[datetime] = None):
 
         except Exception as e:
             print(f"Error in picked outbound status report API for {customer_id}: {str(e)}")
+            record_fetch_error(f"picked_outbound_orders/{customer_id}", e)
+        
+        report_progress(progress_callback, "customer_fetched", {
+            'customer': customer_id,
+            'source': 'picked_orders',
+            'date': start_date.strftime('%Y-%m-%d'),
+            'orders': len(orders)
+        })
     
     print(f"Retrieved {len(all_processed_picked_orders)} picked outbound orders across all customers")
 
@@ -0,0 +1,118 @@
+"""Process-wide ChromaDB client registry and collection helpers."""
+
+import os
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+from config import DB_PATH
+
+# Collection metadata key recording the placeholder embedding size
+EMBEDDING_DIMENSION_KEY = "embedding_dimension"
+
+# Size of the default embedding model's vectors (all-MiniLM-L6-v2). Rows
+# written before placeholder embeddings carry vectors of this size, and a
+# collection keeps its dimensionality even after all its rows are deleted.
+DEFAULT_EMBEDDING_DIMENSION = 384
+
+# One client per database directory and one handle per collection, created on
+# first use so importing the app never opens the database
+_clients: Dict[str, Any] = {}
+_collections: Dict[Tuple[str, str], Any] = {}
+_registry_lock = threading.Lock()
+
+class PlaceholderEmbeddingFunction:
+    """Embedding function returning constant vectors without running a model."""
+
+    def __init__(self, dimension: int = DEFAULT_EMBEDDING_DIMENSION):
+        self.dimension = dimension
+
+    def __call__(self, texts: List[str]) -> List[List[float]]:
+        return [[0.0] * self.dimension for _ in texts]
+
+def get_structured_collection(client, name: str):
+    """
+    Get or create a collection that is only read by ID or metadata filter.
+
+    Documents written to it get placeholder embeddings instead of running
+    the default embedding model. Collections that are vector-searched must
+    opt in to real embeddings by passing an embedding function to
+    get_or_create_collection themselves.
+
+    Args:
+        client: ChromaDB client
+        name: Collection name
+
+    Returns:
+        ChromaDB collection
+    """
+    embedding_function = PlaceholderEmbeddingFunction()
+    collection = client.get_or_create_collection(name=name, embedding_function=embedding_function)
+
+    metadata = collection.metadata or {}
+    dimension = metadata.get(EMBEDDING_DIMENSION_KEY)
+    if dimension is None:
+        # Match whatever existing rows were embedded with, so placeholder
+        # vectors fit the collection's index
+        existing = collection.peek(1)
+        if existing["ids"]:
+            dimension = len(existing["embeddings"][0])
+        else:
+            dimension = DEFAULT_EMBEDDING_DIMENSION
+        try:
+            collection.modify(metadata={**metadata, EMBEDDING_DIMENSION_KEY: dimension})
+        except Exception as e:
+            print(f"Warning: Could not record embedding dimension for {name}: {e}")
+
+    embedding_function.dimension = int(dimension)
+    return collection
+
+def get_chroma_client(path: str = DB_PATH):
+    """
+    Get the shared ChromaDB client for a database directory, creating it on first use.
+
+    Args:
+        path: Database directory
+
+    Returns:
+        ChromaDB PersistentClient
+    """
+    path = os.path.abspath(path)
+    client = _clients.get(path)
+    if client is None:
+        with _registry_lock:
+            client = _clients.get(path)
+            if client is None:
+                import chromadb
+                client = _clients[path] = chromadb.PersistentClient(path=path)
+    return client
+
+def get_collection(name: str, path: str = DB_PATH, embedding_function: Optional[Any] = None,
+                   metadata: Optional[Dict[str, Any]] = None):
+    """
+    Get a collection from the shared client, resolving it on first use.
+
+    Args:
+        name: Collection name
+        path: Database directory
+        embedding_function: Embedding function for collections that are
+            vector-searched; structured collections leave this unset
+        metadata: Metadata for a vector-searched collection when it is
+            created, such as its distance function
+
+    Returns:
+        ChromaDB collection
+    """
+    key = (os.path.abspath(path), name)
+    collection = _collections.get(key)
+    if collection is None:
+        client = get_chroma_client(path)
+        with _registry_lock:
+            collection = _collections.get(key)
+            if collection is None:
+                if embedding_function is None:
+                    collection = get_structured_collection(client, name)
+                else:
+                    collection = client.get_or_create_collection(
+                        name=name, embedding_function=embedding_function, metadata=metadata
+                    )
+                _collections[key] = collection
+    return collection
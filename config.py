@@ -22,6 +22,54 @@ EMAIL_CONFIG = {
 
 # Database Settings
 DB_PATH = os.getenv("DB_PATH", "./chroma_db")
+# "sqlite" (default) or "chroma"
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "sqlite").lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", os.path.join(DB_PATH, "scheduler.sqlite3"))
+# Directory of the memory-mapped date x role staffing matrix used for long-range analytics
+STAFFING_MATRIX_PATH = os.getenv("STAFFING_MATRIX_PATH", os.path.join(DB_PATH, "staffing_matrix"))
+# Records fetched per page when reading whole collections
+STORAGE_PAGE_SIZE = int(os.getenv("STORAGE_PAGE_SIZE", "500"))
+# Employees written per storage call when importing a roster file
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+# Smallest response body worth gzipping, in bytes, and the gzip level (1-9)
+GZIP_MINIMUM_SIZE = int(os.getenv("GZIP_MINIMUM_SIZE", "1000"))
+GZIP_COMPRESSLEVEL = int(os.getenv("GZIP_COMPRESSLEVEL", "6"))
+# Largest roster file accepted by the upload endpoint, in bytes
+ROSTER_UPLOAD_MAX_BYTES = int(os.getenv("ROSTER_UPLOAD_MAX_BYTES", str(50 * 1024 * 1024)))
+# Token the upload endpoint requires as "Authorization: Bearer <token>"; uploads are
+# disabled while it is unset
+ROSTER_UPLOAD_TOKEN = os.getenv("ROSTER_UPLOAD_TOKEN", "")
+# Embed employees for semantic search (a small ONNX model, downloaded on first use and
+# loaded by each worker on its first search; the precompute runner catches up the index)
+SEMANTIC_SEARCH_ENABLED = os.getenv("SEMANTIC_SEARCH_ENABLED", "true").lower() in ("1", "true", "yes")
+# Cosine similarity a job title needs to its nearest role prototype to be suggested that role
+ROLE_CLASSIFIER_MIN_SIMILARITY = float(os.getenv("ROLE_CLASSIFIER_MIN_SIMILARITY", "0.5"))
+# Cosine similarity at which that role is assigned rather than only suggested for review
+ROLE_CLASSIFIER_ACCEPT_SIMILARITY = float(os.getenv("ROLE_CLASSIFIER_ACCEPT_SIMILARITY", "0.85"))
+# Employee records kept in the in-memory details cache
+EMPLOYEE_CACHE_SIZE = int(os.getenv("EMPLOYEE_CACHE_SIZE", "5000"))
+
+# Background Job Settings
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))  # concurrent scheduler runs
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", "3600"))  # keep finished jobs this long
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "1800"))  # unfinished jobs silent this long are abandoned
+# Run scheduler jobs within the request that starts them instead of on a background
+# thread. On by default on Vercel, which can freeze a function after it responds.
+JOB_RUN_INLINE = os.getenv("JOB_RUN_INLINE", "true" if os.getenv("VERCEL") else "false").lower() in ("1", "true", "yes")
+
+# Profiling Settings
+# "off" (default, no overhead), "request" (profile requests sent with an X-Profile: 1
+# header or ?profile=1) or "all" (profile every request)
+PROFILING = os.getenv("PROFILING", "off").lower()
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))  # seconds between stack samples
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "200"))
+
+# Precompute Settings
+# Cron expressions (minute hour day month weekday), separated by ';'. Empty disables the runner.
+PRECOMPUTE_CRON = os.getenv("PRECOMPUTE_CRON", "0 5-18 * * 1-5")
+FORECAST_CACHE_PATH = os.getenv("FORECAST_CACHE_PATH", os.path.join(DB_PATH, "forecast_cache.json"))
+FORECAST_CACHE_MAX_AGE = int(os.getenv("FORECAST_CACHE_MAX_AGE", "7200"))  # seconds a cached forecast stays valid
 
 # we will use the following orgs
 # ORG-629731 Rise and Shine, 
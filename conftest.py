@@ -0,0 +1,49 @@
+"""Shared test setup: a temporary database and a helper for running concurrent worker processes."""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import pytest
+
+# Set before any test module imports config, so the whole session (and the
+# worker processes it starts, which inherit the environment) uses one
+# temporary database instead of ./chroma_db. Tests share it, so each keeps
+# to its own employee IDs and staffing dates.
+os.environ["DB_PATH"] = tempfile.mkdtemp(prefix="scheduler_tests_")
+os.environ["SEMANTIC_SEARCH_ENABLED"] = "false"
+os.environ["PRECOMPUTE_CRON"] = ""
+
+# Seconds given to every worker to start up before they run their scripts together
+WORKER_START_DELAY = 3
+
+# Prepended to worker scripts: parses the worker's index and count and waits for the common start
+WORKER_PREAMBLE = """
+import sys, time
+worker, workers, args = int(sys.argv[1]), int(sys.argv[2]), sys.argv[4:]
+time.sleep(max(0.0, float(sys.argv[3]) - time.time()))
+"""
+
+@pytest.fixture
+def run_workers():
+    """
+    Run a script in several processes at once against the test database.
+
+    The script sees its index as `worker`, the number of processes as
+    `workers` and any extra arguments as strings in `args`. Returns the
+    processes' exit codes.
+    """
+    def run(script: str, workers: int, *args) -> list:
+        start_at = time.time() + WORKER_START_DELAY
+        processes = [
+            subprocess.Popen(
+                [sys.executable, "-c", WORKER_PREAMBLE + script, str(worker), str(workers), str(start_at),
+                 *map(str, args)],
+                cwd=os.path.dirname(os.path.abspath(__file__)), stdout=subprocess.DEVNULL
+            )
+            for worker in range(workers)
+        ]
+        return [process.wait() for process in processes]
+    return run
@@ -1,17 +1,130 @@
 """Database connection and operations for the warehouse scheduler."""
 
-import chromadb
-import json
 import re
-import Levenshtein
-from typing import Dict, List, Any, Optional
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Iterator, Tuple
 from datetime import datetime
-from config import DB_PATH, ROLE_MAPPINGS
+from config import ROLE_MAPPINGS, EMPLOYEE_CACHE_SIZE
+from telemetry import DATABASE_LATENCY, timed
+from roster_index import SkillIndex, NameIndex, EmployeeSearchIndex
+from storage import get_storage, is_schedulable
+from role_classifier import get_role_classifier
 
-# Initialize ChromaDB client
-chroma_client = chromadb.PersistentClient(path=DB_PATH)
-employee_collection = chroma_client.get_or_create_collection(name="employees")
-scheduled_employees_collection = chroma_client.get_or_create_collection(name="scheduled_employees")
+# Roster version shared by the in-memory roster indexes. It increases whenever
+# the stored roster revision changes or the roster is invalidated.
+_roster_lock = threading.Lock()
+_roster_state = {"version": 0, "revision": None}
+# Roster indexes by name, each as {"version": ..., "index": ...}
+_roster_indexes: Dict[str, Dict[str, Any]] = {}
+# Read-through LRU of employee metadata for one roster version. Unknown IDs
+# are cached as empty dicts.
+_employee_cache: Dict[str, Any] = {"version": None, "entries": OrderedDict()}
+
+def invalidate_roster_indexes() -> int:
+    """
+    Mark the roster as changed so in-memory indexes are rebuilt on next use.
+    
+    Call after writing employees.
+    
+    Returns:
+        New roster version
+    """
+    with _roster_lock:
+        _roster_state["version"] += 1
+        _roster_state["revision"] = None
+        return _roster_state["version"]
+
+def get_roster_revision() -> str:
+    """
+    Get the stored roster revision.
+    
+    Every employee write replaces it, whichever process made the write, so
+    it identifies the roster's content across workers and restarts.
+    
+    Returns:
+        Revision token; '' if no employee was ever written
+    """
+    return get_storage().get_roster_revision()
+
+def get_roster_version() -> int:
+    """
+    Get the current roster version of this process's in-memory indexes.
+    
+    The version advances whenever the stored roster revision changes, so
+    edits made by other processes are picked up on the next call.
+    
+    Returns:
+        Roster version number
+    """
+    revision = get_roster_revision()
+    with _roster_lock:
+        if revision != _roster_state["revision"]:
+            if _roster_state["revision"] is not None:
+                _roster_state["version"] += 1
+            _roster_state["revision"] = revision
+        return _roster_state["version"]
+
+def _get_roster_index(name: str, build, schedulable_only: bool = False):
+    """
+    Get a cached roster index, rebuilding it if the roster version changed.
+    
+    Args:
+        name: Cache key of the index
+        build: Callable building the index from (ids, metadatas)
+        schedulable_only: Build from schedulable employees only, filtered by the datastore
+        
+    Returns:
+        Index built from the current roster
+    """
+    version = get_roster_version()
+    with _roster_lock:
+        cached = _roster_indexes.get(name)
+        if cached and cached["version"] == version:
+            return cached["index"]
+    
+    all_employees = get_storage().get_all_employees(schedulable_only=schedulable_only)
+    index = build(all_employees["ids"], all_employees["metadatas"])
+    
+    with _roster_lock:
+        _roster_indexes[name] = {"version": version, "index": index}
+    return index
+
+def get_skill_index() -> SkillIndex:
+    """
+    Get the skill index of available employees for the current roster.
+    
+    Returns:
+        SkillIndex for the current roster version
+    """
+    return _get_roster_index("skills", SkillIndex, schedulable_only=True)
+
+def get_name_index() -> NameIndex:
+    """
+    Get the fuzzy name index for the current roster.
+    
+    Returns:
+        NameIndex for the current roster version
+    """
+    return _get_roster_index("names", NameIndex)
+
+def get_search_index() -> EmployeeSearchIndex:
+    """
+    Get the full-text employee search index for the current roster.
+    
+    Returns:
+        EmployeeSearchIndex for the current roster version
+    """
+    return _get_roster_index("search", EmployeeSearchIndex)
+
+def iter_employees() -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Stream the whole roster page by page, without documents or embeddings.
+    
+    Returns:
+        Iterator of (employee ID, metadata) in roster order
+    """
+    return get_storage().iter_employees()
 
 def normalize_role(role: str) -> str:
     """
@@ -30,9 +143,10 @@ def normalize_role(role: str) -> str:
     role = re.sub(r'\s+', '_', role)
     return role
 
+@timed(DATABASE_LATENCY, module="database", operation="retrieve_employees")
 def retrieve_employees(required_roles: Dict[str, int]) -> Dict[str, List[str]]:
     """
-    Retrieves employees from ChromaDB matching the required roles.
+    Retrieves employees from the database matching the required roles.
     
     Args:
         required_roles: Dictionary of roles and their required counts
@@ -43,23 +157,18 @@ def retrieve_employees(required_roles: Dict[str, int]) -> Dict[str, List[str]]:
     matched_employees = {}
     
     try:
-        # Get all employees from the database once
-        all_employees = employee_collection.get()
-        all_ids = all_employees.get("ids", [])
-        all_metadatas = all_employees.get("metadatas", [])
+        # Role lookups are set unions over the prebuilt skill index
+        skill_index = get_skill_index()
+        classifier = get_role_classifier()
         
         for role in required_roles:
-            matched_employees[role] = []
-            role_variations = ROLE_MAPPINGS.get(role, [role])
-            
-            for i, metadata in enumerate(all_metadatas):
-                if is_employee_available(metadata):
-                    employee_skills = metadata.get("skills", "").lower().split(',')
-                    employee_skills = [skill.strip() for skill in employee_skills]
-                    
-                    # Check if employee has any of the role variations in their skills
-                    if any(variation.lower() in employee_skills for variation in role_variations):
-                        matched_employees[role].append(all_ids[i])
+            role_variations = list(ROLE_MAPPINGS.get(role, [role]))
+            # Employees whose title or skills were classified into the same
+            # canonical role match as well
+            canonical_role = classifier.match_rule(role)
+            if canonical_role:
+                role_variations.append(canonical_role)
+            matched_employees[role] = skill_index.lookup(role_variations)
             
             if not matched_employees[role]:
                 print(f"Warning: No employees found for role {role}")
@@ -73,31 +182,19 @@ def is_employee_available(metadata: Dict[str, Any]) -> bool:
     """
     Check if an employee is available for scheduling based on their metadata.
     
+    Retrieval does not call this per employee: the same rule is stored as a
+    normalized schedulable flag when employees are written and filtered on
+    by the datastore.
+    
     Args:
-        metadata: Employee metadata from ChromaDB
+        metadata: Employee metadata from the database
         
     Returns:
         bool: True if employee is available, False otherwise
     """
-    try:
-        # Check if employee is active
-        if not metadata.get("active", True):
-            return False
-        
-        # Check if employee is on leave
-        if metadata.get("on_leave", False):
-            return False
-        
-        # Check shift preferences if available
-        shift_preferences = metadata.get("shift_preferences", [])
-        if shift_preferences and "day" not in shift_preferences:
-            return False
-        
-        return True
-        
-    except Exception:
-        return False
+    return is_schedulable(metadata)
 
+@timed(DATABASE_LATENCY, module="database", operation="find_best_match")
 def find_best_match(name: str, employee_list: List[str]) -> Optional[str]:
     """
     Find the best matching employee name using fuzzy matching.
@@ -109,47 +206,50 @@ def find_best_match(name: str, employee_list: List[str]) -> Optional[str]:
     Returns:
         Best matching employee ID or None if no good match found
     """
-    best_match = None
-    best_score = float('inf')  # Lower is better for Levenshtein distance
-    
-    name_lower = name.lower()
+    try:
+        return get_name_index().best_match(name, employee_list)
+    except Exception as e:
+        print(f"Error in name matching for {name}: {e}")
+        return None
+
+@timed(DATABASE_LATENCY, module="database", operation="reconcile_names")
+def reconcile_names(names: List[str]) -> List[Dict[str, Any]]:
+    """
+    Match a batch of free-text names against the roster in one pass.
     
-    for emp_id in employee_list:
-        # Get name variations
-        try:
-            emp_data = employee_collection.get(ids=[emp_id])
-            if not emp_data or not emp_data["metadatas"]:
-                continue
-            
-            metadata = emp_data["metadatas"][0]
-            name_variations_json = metadata.get("name_variations", "[]")
-            name_variations = json.loads(name_variations_json)
-            
-            # If no variations stored, use the ID
-            if not name_variations:
-                name_variations = [emp_id]
-            
-            # Try all variations and find the best match
-            for variation in name_variations:
-                variation_lower = variation.lower()
-                
-                # Exact match
-                if name_lower == variation_lower:
-                    return emp_id
-                
-                # Calculate Levenshtein distance
-                distance = Levenshtein.distance(name_lower, variation_lower)
-                if distance < best_score:
-                    best_score = distance
-                    best_match = emp_id
-        except Exception as e:
-            print(f"Error in name matching for {emp_id}: {e}")
+    Args:
+        names: Names to match, e.g. from a timeclock export or sign-in sheet
+        
+    Returns:
+        One match result per name, in input order
+    """
+    return get_name_index().reconcile(names)
+
+@timed(DATABASE_LATENCY, module="database", operation="search_employees")
+def search_employees(query: str = "", filters: Optional[Dict[str, str]] = None,
+                     ids: Optional[List[str]] = None, sort: Optional[str] = None,
+                     offset: int = 0, limit: int = 50,
+                     fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Search the roster and return one page of matching employees.
     
-    # Only return a match if the score is below a threshold (30% of name length)
-    if best_score <= len(name) * 0.3:
-        return best_match
-    return None
+    Args:
+        query: Free-text query, prefix-matched against name, ID, department,
+            job title and skills
+        filters: Exact, case-insensitive department, job_title or status filters
+        ids: Restrict results to these employee IDs
+        sort: Field to sort by, '-' prefixed for descending; roster order if omitted
+        offset: Matches to skip
+        limit: Maximum employees to return
+        fields: Employee fields to return; all if omitted
+        
+    Returns:
+        Dictionary with the page of employees and the total number of matches
+    """
+    total_count, employees = get_search_index().search(query, filters, ids, sort, offset, limit, fields)
+    return {"employees": employees, "total_count": total_count}
 
+@timed(DATABASE_LATENCY, module="database", operation="get_employee_details")
 def get_employee_details(emp_id: str) -> Dict[str, Any]:
     """
     Get employee details from the database.
@@ -160,16 +260,58 @@ def get_employee_details(emp_id: str) -> Dict[str, Any]:
     Returns:
         Dictionary containing employee details
     """
+    return get_employee_details_many([emp_id]).get(emp_id, {})
+
+@timed(DATABASE_LATENCY, module="database", operation="get_employee_details_many")
+def get_employee_details_many(emp_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Get details for several employees with at most one database read.
+    
+    Results are served from a bounded LRU cache where possible, and the
+    cache is dropped whenever the roster version changes.
+    
+    Args:
+        emp_ids: Employee IDs
+        
+    Returns:
+        Dictionary mapping each requested ID to its details ({} if not found)
+    """
     try:
-        emp_data = employee_collection.get(ids=[emp_id])
-        if not emp_data or not emp_data["metadatas"]:
-            return {}
+        version = get_roster_version()
+        entries = _employee_cache["entries"]
+        details = {}
+        missing = []
+        
+        with _roster_lock:
+            if _employee_cache["version"] != version:
+                entries.clear()
+                _employee_cache["version"] = version
+            for emp_id in dict.fromkeys(emp_ids):
+                if emp_id in entries:
+                    entries.move_to_end(emp_id)
+                    details[emp_id] = dict(entries[emp_id])
+                else:
+                    missing.append(emp_id)
         
-        return emp_data["metadatas"][0]
+        if missing:
+            fetched = {emp_id: {} for emp_id in missing}
+            fetched.update(get_storage().get_employees(missing))
+            
+            with _roster_lock:
+                if _employee_cache["version"] == version:
+                    for emp_id, metadata in fetched.items():
+                        entries[emp_id] = metadata
+                        entries.move_to_end(emp_id)
+                    while len(entries) > EMPLOYEE_CACHE_SIZE:
+                        entries.popitem(last=False)
+            details.update((emp_id, dict(metadata)) for emp_id, metadata in fetched.items())
+        
+        return details
     except Exception as e:
         print(f"Error getting employee details: {e}")
         return {}
 
+@timed(DATABASE_LATENCY, module="database", operation="save_scheduled_employees")
 def save_scheduled_employees(date: str, day_name: str, assigned_employees: Dict[str, List[str]]) -> bool:
     """
     Save scheduled employee details to the database.
@@ -192,10 +334,13 @@ def save_scheduled_employees(date: str, day_name: str, assigned_employees: Dict[
         metadatas = []
         ids = []
         
+        all_details = get_employee_details_many(
+            [employee_id for employee_ids in assigned_employees.values() for employee_id in employee_ids]
+        )
+        
         for role, employee_ids in assigned_employees.items():
             for employee_id in employee_ids:
-                # Get employee details
-                employee_details = get_employee_details(employee_id)
+                employee_details = all_details.get(employee_id, {})
                 
                 # Create unique ID for this assignment
                 assignment_id = f"{schedule_id}_{role}_{employee_id}"
@@ -226,13 +371,9 @@ Created: {metadata['created_at']}"""
                 metadatas.append(metadata)
                 documents.append(document)
         
-        # Save to ChromaDB
+        # Save to the database
         if ids:  # Only save if there are assignments
-            scheduled_employees_collection.upsert(
-                ids=ids,
-                metadatas=metadatas,
-                documents=documents
-            )
+            get_storage().upsert_assignments(ids, metadatas, documents)
             print(f"Saved {len(ids)} scheduled employee assignments for {date}")
             return True
         else:
@@ -243,6 +384,25 @@ Created: {metadata['created_at']}"""
         print(f"Error saving scheduled employees: {e}")
         return False
 
+def assignment_record(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the API representation of a scheduled assignment.
+    
+    Args:
+        metadata: Stored assignment metadata
+        
+    Returns:
+        Dictionary of assignment details
+    """
+    return {
+        "employee_id": metadata.get("employee_id"),
+        "employee_name": metadata.get("employee_name"),
+        "assigned_role": metadata.get("assigned_role"),
+        "day_name": metadata.get("day_name"),
+        "created_at": metadata.get("created_at")
+    }
+
+@timed(DATABASE_LATENCY, module="database", operation="get_scheduled_employees")
 def get_scheduled_employees(date: str) -> Dict[str, Any]:
     """
     Retrieve scheduled employees for a specific date.
@@ -255,23 +415,12 @@ def get_scheduled_employees(date: str) -> Dict[str, Any]:
     """
     try:
         # Query scheduled employees for the specific date
-        results = scheduled_employees_collection.get(
-            where={"schedule_date": date}
-        )
+        results = get_storage().get_assignments(date)
         
-        if not results or not results.get("metadatas"):
+        if not results:
             return {"date": date, "assignments": [], "total_count": 0}
         
-        assignments = []
-        for i, metadata in enumerate(results["metadatas"]):
-            assignment = {
-                "employee_id": metadata.get("employee_id"),
-                "employee_name": metadata.get("employee_name"),
-                "assigned_role": metadata.get("assigned_role"),
-                "day_name": metadata.get("day_name"),
-                "created_at": metadata.get("created_at")
-            }
-            assignments.append(assignment)
+        assignments = [assignment_record(metadata) for metadata in results]
         
         return {
             "date": date,
@@ -283,6 +432,41 @@ def get_scheduled_employees(date: str) -> Dict[str, Any]:
         print(f"Error retrieving scheduled employees: {e}")
         return {"date": date, "assignments": [], "total_count": 0}
 
+@timed(DATABASE_LATENCY, module="database", operation="get_scheduled_employees_range")
+def get_scheduled_employees_range(start_date: str, end_date: str, role: Optional[str] = None,
+                                  employee_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Retrieve scheduled employees between two dates with one range query.
+    
+    Args:
+        start_date: First date in YYYY-MM-DD format
+        end_date: Last date in YYYY-MM-DD format, inclusive
+        role: Only assignments to this role
+        employee_id: Only assignments of this employee
+        
+    Returns:
+        Dictionary containing the assignments ordered by date, each with its
+        date, and the number of assignments per date
+    """
+    summary = {"start_date": start_date, "end_date": end_date, "assignments": [], "by_date": {}, "total_count": 0}
+    try:
+        results = get_storage().get_assignments_range(start_date, end_date, role=role, employee_id=employee_id)
+        
+        by_date: Dict[str, int] = {}
+        assignments = []
+        for metadata in results:
+            date = metadata.get("schedule_date")
+            by_date[date] = by_date.get(date, 0) + 1
+            assignments.append({"date": date, **assignment_record(metadata)})
+        
+        summary.update(assignments=assignments, by_date=by_date, total_count=len(assignments))
+        return summary
+        
+    except Exception as e:
+        print(f"Error retrieving scheduled employees: {e}")
+        return summary
+
+@timed(DATABASE_LATENCY, module="database", operation="delete_scheduled_employees")
 def delete_scheduled_employees(date: str) -> bool:
     """
     Delete all scheduled employee assignments for a specific date.
@@ -294,15 +478,11 @@ def delete_scheduled_employees(date: str) -> bool:
         bool: True if successful, False otherwise
     """
     try:
-        # Get all assignments for the date
-        results = scheduled_employees_collection.get(
-            where={"schedule_date": date}
-        )
+        # Delete all assignments for this date
+        deleted = get_storage().delete_assignments(date)
         
-        if results and results.get("ids"):
-            # Delete all assignments for this date
-            scheduled_employees_collection.delete(ids=results["ids"])
-            print(f"Deleted {len(results['ids'])} scheduled assignments for {date}")
+        if deleted:
+            print(f"Deleted {deleted} scheduled assignments for {date}")
             return True
         else:
             print(f"No scheduled assignments found for {date}")
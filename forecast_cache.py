@@ -0,0 +1,91 @@
+"""File-backed cache of daily forecast data shared by all app workers."""
+
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Any, Optional
+from config import FORECAST_CACHE_PATH, FORECAST_CACHE_MAX_AGE
+from utils import FileLock
+
+_cache_lock = threading.Lock()
+# Held by writers in every worker across the read-modify-write of the file,
+# so concurrent stores can't drop each other's entries
+_file_lock = FileLock(f"{FORECAST_CACHE_PATH}.lock")
+# In-memory copy of the cache file, reloaded when another worker rewrites it
+_cache: Dict[str, Any] = {"mtime": None, "entries": {}}
+
+def _load_entries(force: bool = False) -> Dict[str, Dict[str, Any]]:
+    """Return the cache entries, re-reading the file if it changed (or always, with force). Caller holds the lock."""
+    try:
+        mtime = os.path.getmtime(FORECAST_CACHE_PATH)
+    except OSError:
+        return {}
+
+    if force or mtime != _cache["mtime"]:
+        try:
+            with open(FORECAST_CACHE_PATH, "r", encoding="utf-8") as f:
+                _cache["entries"] = json.load(f)
+            _cache["mtime"] = mtime
+        except (OSError, ValueError) as e:
+            print(f"Error reading forecast cache: {e}")
+            return {}
+    return _cache["entries"]
+
+def get_cached_forecast(date: str, max_age: int = FORECAST_CACHE_MAX_AGE) -> Optional[Dict[str, Any]]:
+    """
+    Get a cached forecast for a date if it is fresh enough.
+
+    Args:
+        date: Date in YYYY-MM-DD format
+        max_age: Maximum age of the cached forecast in seconds
+
+    Returns:
+        Forecast data dictionary or None if missing or stale
+    """
+    with _cache_lock:
+        entry = _load_entries().get(date)
+
+    if not entry:
+        return None
+    if datetime.now().timestamp() - entry.get("computed_at", 0) > max_age:
+        return None
+    return entry.get("forecast_data")
+
+def store_forecast(date: str, forecast_data: Dict[str, Any]) -> bool:
+    """
+    Store a forecast in the cache.
+
+    Args:
+        date: Date in YYYY-MM-DD format
+        forecast_data: Forecast data dictionary from get_orders_for_scheduling
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    try:
+        with _file_lock, _cache_lock:
+            entries = dict(_load_entries(force=True))
+            entries[date] = {
+                "forecast_data": forecast_data,
+                "computed_at": datetime.now().timestamp()
+            }
+
+            # Drop entries for past dates so the file stays small
+            today = datetime.now().strftime('%Y-%m-%d')
+            entries = {d: e for d, e in entries.items() if d >= today}
+
+            # Write to a temporary file and swap it in so readers in other
+            # workers never see a partially written cache
+            os.makedirs(os.path.dirname(os.path.abspath(FORECAST_CACHE_PATH)), exist_ok=True)
+            tmp_path = f"{FORECAST_CACHE_PATH}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, FORECAST_CACHE_PATH)
+
+            _cache["entries"] = entries
+            _cache["mtime"] = os.path.getmtime(FORECAST_CACHE_PATH)
+        return True
+    except Exception as e:
+        print(f"Error writing forecast cache: {e}")
+        return False
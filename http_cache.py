@@ -0,0 +1,143 @@
+"""Conditional GET (ETag / If-None-Match) and response compression for the JSON APIs."""
+
+import hashlib
+from typing import Any, Optional
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder
+from starlette.types import Message, Receive, Scope, Send
+
+try:
+    import orjson  # noqa: F401
+    # Serializes the large roster payloads several times faster than json
+    JSON_RESPONSE_CLASS = ORJSONResponse
+except ImportError:
+    JSON_RESPONSE_CLASS = JSONResponse
+
+# Content types that are streamed incrementally and must not be buffered by gzip
+UNCOMPRESSED_STREAM_TYPES = ("text/event-stream",)
+
+def make_etag(*parts: Any) -> str:
+    """
+    Build a weak ETag from the values a response depends on.
+
+    The ETag is weak because the same representation may be sent gzipped
+    or not.
+
+    Args:
+        parts: Versions, query strings or content the response is derived from
+
+    Returns:
+        ETag header value
+    """
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return f'W/"{digest.hexdigest()[:20]}"'
+
+def revision_etag(name: str, revision: Any, *parts: Any) -> str:
+    """
+    Build an ETag from a stored revision that every write replaces.
+
+    The revision is shared by all workers, so any of them can answer a
+    conditional request.
+
+    Args:
+        name: What is versioned, e.g. "roster"
+        revision: Current revision
+        parts: Anything else the response depends on, such as the query string
+
+    Returns:
+        ETag header value
+    """
+    return make_etag(name, revision, *parts)
+
+def etag_matches(headers: Headers, etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag, using weak comparison.
+
+    Args:
+        headers: Request headers
+        etag: Current ETag of the resource
+
+    Returns:
+        True if the client already has this version
+    """
+    if_none_match = headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+def not_modified(etag: str) -> Response:
+    """
+    Build a 304 response for a matched ETag.
+
+    Args:
+        etag: Current ETag of the resource
+
+    Returns:
+        Empty 304 response carrying the ETag
+    """
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+def json_response(headers: Headers, content: Any, etag: Optional[str] = None) -> Response:
+    """
+    Serialize a JSON payload, answering 304 if the client's copy is current.
+
+    Without an ETag, one is derived from the serialized body, which saves the
+    transfer but not the work of building the payload. Responses must be
+    revalidated on every use (Cache-Control: no-cache), so browsers send
+    If-None-Match on refresh.
+
+    Args:
+        headers: Request headers
+        content: JSON-serializable payload
+        etag: ETag computed from versions, checked before serializing
+
+    Returns:
+        304 response or JSON response with an ETag
+    """
+    if etag is not None and etag_matches(headers, etag):
+        return not_modified(etag)
+
+    response = JSON_RESPONSE_CLASS(content, headers={"Cache-Control": "no-cache"})
+    if etag is None:
+        etag = make_etag(response.body)
+        if etag_matches(headers, etag):
+            return not_modified(etag)
+    response.headers["ETag"] = etag
+    return response
+
+class StreamingAwareGZipResponder(GZipResponder):
+    """GZip responder that passes event streams through uncompressed."""
+
+    async def send_with_gzip(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            content_type = Headers(raw=message["headers"]).get("content-type", "")
+            if content_type.startswith(UNCOMPRESSED_STREAM_TYPES):
+                # Compressed chunks would sit in the gzip buffer instead of
+                # reaching the client as each event is sent
+                await super().send_with_gzip(message)
+                self.content_encoding_set = True
+                return
+        await super().send_with_gzip(message)
+
+class StreamingAwareGZipMiddleware(GZipMiddleware):
+    """GZipMiddleware that leaves Server-Sent Events streams uncompressed."""
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and "gzip" in Headers(scope=scope).get("Accept-Encoding", ""):
+            responder = StreamingAwareGZipResponder(self.app, self.minimum_size, compresslevel=self.compresslevel)
+            await responder(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
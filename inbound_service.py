@@ -1,10 +1,14 @@
 """Service for processing inbound warehouse operations."""
 
+from __future__ import annotations
+
 from typing import Dict, List, Any, Optional, Tuple
-import pandas as pd
-from api_client import get_priority_report, get_inbound_receipts, get_equipment_details
+from api_client import get_priority_report, get_inbound_receipts, get_equipment_details, record_fetch_error
+from utils import lazy_import
 from datetime import datetime
 
+pd = lazy_import("pandas")
+
 def find_priority_report_columns(priority_df: pd.DataFrame) -> Tuple[Optional[str], Optional[str]]:
     """
     Find relevant columns in inbound priority report.
@@ -151,6 +155,7 @@ def get_incoming_data(target_date: Optional[Any] = None) -> Dict[str, float]:
         print(f"DEBUG: get_incoming_data called with target_date: {target_date.strftime('%Y-%m-%d') if target_date else 'None'}")
         priority_dfs = get_priority_report(sheet_name='all')
         if priority_dfs is None or 'Inbound' not in priority_dfs:
+            record_fetch_error("priority_report", "no inbound sheet")
             return {"incoming_pallets": 0}
             
         priority_df = priority_dfs['Inbound']
@@ -228,4 +233,5 @@ def get_incoming_data(target_date: Optional[Any] = None) -> Dict[str, float]:
 
     except Exception as e:
         print(f"Error in inbound receipt API: {str(e)}")
+        record_fetch_error("incoming_data", e)
         return {"incoming_pallets": 0}
\ No newline at end of file
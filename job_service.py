@@ -0,0 +1,220 @@
+"""Service for running the scheduler as a background job with progress tracking."""
+
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+import schedule_service
+from api_client import CUSTOMER_IDS
+from config import DB_PATH, JOB_WORKERS, JOB_RETENTION_SECONDS, JOB_STALE_SECONDS, JOB_RUN_INLINE
+from storage import get_storage
+from utils import FileLock
+
+# Progress percentage reached once each scheduler stage has completed
+STAGE_PROGRESS = {
+    "queued": 0,
+    "started": 5,
+    "forecast_ready": 55,
+    "roles_computed": 65,
+    "assignments_saved": 80,
+    "emails_sent": 95,
+    "completed": 100
+}
+
+# Jobs are kept in storage so a poll served by any worker process sees them;
+# the lock serializes job writes across those processes
+_jobs_lock = FileLock(os.path.join(DB_PATH, "scheduler_jobs.lock"))
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="scheduler-job")
+
+# Per-customer fetches in a run: outbound and picked orders for two days
+TOTAL_CUSTOMER_FETCHES = len(CUSTOMER_IDS) * 4
+
+def _now() -> str:
+    return datetime.now().isoformat()
+
+def _update_job(job_id: str, **fields) -> None:
+    with _jobs_lock:
+        job = get_storage().get_job(job_id)
+        if job:
+            job.update(fields)
+            job["updated_at"] = _now()
+            get_storage().put_job(job)
+
+def _snapshot(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy a job for returning to callers, without its internal fields."""
+    snapshot = dict(job)
+    snapshot.pop("finished_ts", None)
+    snapshot.pop("events", None)
+    return snapshot
+
+def _append_event(job: Dict[str, Any], event: str, data: Any) -> None:
+    """Add an event to a job's stream. Caller holds the lock and saves the job."""
+    job["events"].append({
+        "event": event,
+        "progress": job["progress"],
+        "data": data,
+        "timestamp": _now()
+    })
+
+def _prune_finished_jobs() -> None:
+    """Drop finished jobs older than the retention period. Caller holds the lock."""
+    get_storage().delete_jobs_finished_before(datetime.now().timestamp() - JOB_RETENTION_SECONDS)
+
+def _is_stale(job: Dict[str, Any]) -> bool:
+    """Whether an unfinished job has gone quiet, as when its worker process died mid-run."""
+    updated = datetime.fromisoformat(job["updated_at"]).timestamp()
+    return updated < datetime.now().timestamp() - JOB_STALE_SECONDS
+
+def _record_progress(job_id: str, stage: str, data: Dict[str, Any]) -> None:
+    """Progress callback handed to run_scheduler for a job."""
+    with _jobs_lock:
+        job = get_storage().get_job(job_id)
+        if not job:
+            return
+        
+        if stage == "customer_fetched":
+            # Customer fetches move the bar through the data-gathering band
+            # without replacing the last completed stage
+            job["customer_fetches"] += 1
+            fraction = min(1.0, job["customer_fetches"] / max(1, TOTAL_CUSTOMER_FETCHES))
+            job["progress"] = max(job["progress"], STAGE_PROGRESS["started"] + round(fraction * 45))
+            job["updated_at"] = _now()
+            _append_event(job, stage, data)
+            get_storage().put_job(job)
+            return
+        
+        partial = job["partial_results"]
+        if stage in ("forecast_ready", "inbound_computed"):
+            # These arrive once per day; keep both under the day's date
+            partial.setdefault(stage, {})[data.get("date") or "unknown"] = data
+        else:
+            partial[stage] = data
+        
+        progress = STAGE_PROGRESS.get(stage, job["progress"])
+        if stage == "forecast_ready" and len(partial[stage]) < 2:
+            # Only the second day's forecast closes the data-gathering band
+            progress = job["progress"]
+        
+        job["stage"] = stage
+        job["progress"] = max(job["progress"], progress)
+        job["stages_completed"].append(stage)
+        job["updated_at"] = _now()
+        _append_event(job, stage, data)
+        get_storage().put_job(job)
+
+def _finish_job(job_id: str, result: Optional[Dict[str, Any]] = None,
+                error: Optional[str] = None) -> None:
+    """Mark a job completed or failed and close its event stream."""
+    with _jobs_lock:
+        job = get_storage().get_job(job_id)
+        if not job:
+            return
+        if error is None:
+            job.update(status="completed", stage="completed",
+                       progress=STAGE_PROGRESS["completed"], result=result)
+            _append_event(job, "schedule", result)
+        else:
+            job.update(status="failed", error=error)
+            _append_event(job, "error", {"error": error})
+        job["finished_at"] = _now()
+        job["finished_ts"] = datetime.now().timestamp()
+        job["updated_at"] = job["finished_at"]
+        get_storage().put_job(job)
+
+def _run_job(job_id: str) -> None:
+    """Execute a scheduler run on a worker thread and store its outcome."""
+    _update_job(job_id, status="running", stage="started",
+                progress=STAGE_PROGRESS["started"], started_at=_now())
+    try:
+        result = schedule_service.run_scheduler(
+            progress_callback=lambda stage, data: _record_progress(job_id, stage, data)
+        )
+        if not result:
+            _finish_job(job_id, error="No scheduling data available")
+            return
+        _finish_job(job_id, result=result)
+    except Exception as e:
+        print(f"Error in scheduler job {job_id}: {str(e)}")
+        _finish_job(job_id, error=str(e))
+
+def create_scheduler_job() -> Dict[str, Any]:
+    """
+    Queue a scheduler run, or return the run already in progress.
+
+    With JOB_RUN_INLINE set the run happens before this returns, for hosts
+    such as Vercel that may freeze a function once its response is sent.
+
+    Returns:
+        Snapshot of the queued, active or (when run inline) finished job
+    """
+    with _jobs_lock:
+        storage = get_storage()
+        _prune_finished_jobs()
+
+        # A second refresh while a run is active, from any worker process,
+        # joins that run instead of starting another one (which would also
+        # send duplicate emails)
+        for job in storage.get_active_jobs():
+            if not _is_stale(job):
+                return _snapshot(job)
+            print(f"Scheduler job {job['job_id']} stopped reporting progress; marking it failed")
+            _finish_job(job["job_id"], error="Scheduler job was abandoned by its worker")
+
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "status": "queued",
+            "stage": "queued",
+            "progress": STAGE_PROGRESS["queued"],
+            "stages_completed": [],
+            "customer_fetches": 0,
+            "partial_results": {},
+            "result": None,
+            "error": None,
+            "created_at": _now(),
+            "updated_at": _now(),
+            "started_at": None,
+            "finished_at": None,
+            "finished_ts": None,
+            "events": []
+        }
+        storage.put_job(job)
+
+    if JOB_RUN_INLINE:
+        _run_job(job_id)
+        return get_job(job_id)
+    _executor.submit(_run_job, job_id)
+    return _snapshot(job)
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Get the current state of a scheduler job.
+
+    Args:
+        job_id: ID returned by create_scheduler_job
+
+    Returns:
+        Snapshot of the job or None if it is unknown or expired
+    """
+    job = get_storage().get_job(job_id)
+    if not job:
+        return None
+    return _snapshot(job)
+
+def get_job_events(job_id: str, since: int = 0) -> Optional[Tuple[List[Dict[str, Any]], bool]]:
+    """
+    Get the events a job has produced since a given position in its stream.
+
+    Args:
+        job_id: ID returned by create_scheduler_job
+        since: Number of events the caller has already consumed
+
+    Returns:
+        Tuple of (new events, whether the job has finished), or None if the
+        job is unknown or expired
+    """
+    job = get_storage().get_job(job_id)
+    if not job:
+        return None
+    return job["events"][since:], job["status"] in ("completed", "failed")
@@ -1,12 +1,32 @@
 """Main application for warehouse scheduler."""
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from typing import Dict, Any
+from fastapi.responses import FileResponse, StreamingResponse, PlainTextResponse, Response
+from typing import Dict, Any, Optional
+import asyncio
+import hmac
+from datetime import datetime
+import json
+import os
+import tempfile
+import time
 import schedule_service
-from database import save_scheduled_employees, get_scheduled_employees, delete_scheduled_employees, employee_collection
+import job_service
+import precompute_service
+import profiling
+import semantic_search
+from telemetry import HTTP_REQUEST_LATENCY, render_metrics
+from config import ROSTER_UPLOAD_MAX_BYTES, ROSTER_UPLOAD_TOKEN, GZIP_MINIMUM_SIZE, GZIP_COMPRESSLEVEL, SEMANTIC_SEARCH_ENABLED
+from database import save_scheduled_employees, get_scheduled_employees, get_scheduled_employees_range, delete_scheduled_employees, iter_employees, reconcile_names, invalidate_roster_indexes, search_employees, get_roster_revision, get_employee_details_many
+from http_cache import JSON_RESPONSE_CLASS, StreamingAwareGZipMiddleware, etag_matches, json_response, not_modified, revision_etag
+from models import ReconcileRequest
+from roster_import import RosterSync, iter_roster_chunks, sniff_format
+from roster_index import employee_record, employee_status, EMPLOYEE_FIELDS, SEARCH_SORT_FIELDS, SEARCH_STATUSES
+from storage import get_storage
+from staffing_history import get_staffing_between, get_staffing_aggregates, calculate_moving_averages
+from staffing_matrix import year_over_year
 
 def calculate_total_staff(required_roles: Dict[str, Any]) -> int:
     """
@@ -28,11 +48,66 @@ def calculate_total_staff(required_roles: Dict[str, Any]) -> int:
             total += roles
     return total
 
+def format_sse_event(event: str, data: Any, event_id: Optional[int] = None) -> str:
+    """
+    Format a Server-Sent Events message.
+    
+    Args:
+        event: Event name
+        data: JSON-serializable event payload
+        event_id: Position of the event in the stream, used for reconnects
+        
+    Returns:
+        Encoded SSE message
+    """
+    message = f"event: {event}\n"
+    if event_id is not None:
+        message += f"id: {event_id}\n"
+    return message + f"data: {json.dumps(data, default=str)}\n\n"
+
+def validate_date_range(start_date: str, end_date: str) -> None:
+    """
+    Check the from/to parameters of a history range query.
+    
+    Args:
+        start_date: First date in YYYY-MM-DD format
+        end_date: Last date in YYYY-MM-DD format, inclusive
+    
+    Raises:
+        HTTPException: If a date is invalid, the range is reversed or longer
+            than HISTORY_RANGE_MAX_DAYS.
+    """
+    try:
+        first = datetime.strptime(start_date, "%Y-%m-%d")
+        last = datetime.strptime(end_date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be in YYYY-MM-DD format")
+    if last < first:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    if (last - first).days + 1 > HISTORY_RANGE_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range is limited to {HISTORY_RANGE_MAX_DAYS} days")
+
+# Seconds between checks for new scheduler events, and between keep-alives
+SSE_POLL_INTERVAL = 0.25
+SSE_KEEPALIVE_INTERVAL = 15
+
+# Largest page served by the employee search
+SEARCH_MAX_PAGE_SIZE = 200
+
+# Most results returned by semantic search, and how many extra neighbours are
+# fetched when unavailable employees are filtered out afterwards
+SEMANTIC_SEARCH_MAX_RESULTS = 50
+SEMANTIC_SEARCH_OVERFETCH = 3
+
+# Longest date range served by the assignment and staffing history range queries
+HISTORY_RANGE_MAX_DAYS = 366
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Warehouse Scheduler API",
     description="API for calculating warehouse staffing requirements",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=JSON_RESPONSE_CLASS
 )
 
 # Add CORS middleware
@@ -44,61 +119,411 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+# Compress JSON responses; event streams are left alone so events are not held back
+app.add_middleware(StreamingAwareGZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE, compresslevel=GZIP_COMPRESSLEVEL)
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Observe every request's latency, labelled by route template rather than raw path."""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_LATENCY.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=status
+        )
+
+# Profiling adds no middleware at all unless it is enabled
+if profiling.PROFILING_ENABLED:
+    app.middleware("http")(profiling.profile_requests)
+
+@app.on_event("startup")
+async def start_background_precompute():
+    """Start the periodic forecast and staffing precompute for this worker."""
+    precompute_service.start_precompute_runner()
+
 # Mount static files for the dashboard
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """Expose latency histograms in Prometheus text format."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/profiles")
+async def get_profiles() -> Dict[str, Any]:
+    """
+    List saved request profiles, newest first.
+    
+    Returns:
+        Dict containing profile IDs, sizes and creation times.
+    """
+    profiles = profiling.list_profiles()
+    return {
+        'success': True,
+        'data': {
+            "profiles": profiles,
+            "total_count": len(profiles)
+        }
+    }
+
+@app.get("/api/profiles/{profile_id}")
+async def get_profile(profile_id: str) -> FileResponse:
+    """
+    Download a saved profile in collapsed-stack (flamegraph) format.
+    
+    Args:
+        profile_id: ID from the X-Profile-Id response header or the profile list
+        
+    Returns:
+        The profile file as plain text.
+    
+    Raises:
+        HTTPException: If the profile does not exist.
+    """
+    path = profiling.get_profile_path(profile_id)
+    if not path:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Profile {profile_id} not found"
+        )
+    return FileResponse(path, media_type="text/plain", filename=f"{profile_id}.folded")
+
 @app.get("/dashboard")
 async def dashboard():
     """Serve the dashboard HTML page."""
     return FileResponse("static/dashboard.html")
 
 @app.get("/api/employees")
-async def get_all_employees() -> Dict[str, Any]:
+async def get_all_employees(request: Request) -> Response:
     """
     Get all employees from the database.
     
+    Args:
+        request: Incoming request, checked for If-None-Match
+    
     Returns:
-        Dict containing all employee details.
+        Dict containing all employee details, or 304 if the roster is unchanged.
     
     Raises:
         HTTPException: If there's an error retrieving employees.
     """
     try:
-        all_employees = employee_collection.get()
+        # The ETag is known from the roster revision before anything is read
+        etag = revision_etag("roster", get_roster_revision())
+        if etag_matches(request.headers, etag):
+            return not_modified(etag)
+        
+        # Employees are read page by page and only the listed fields are kept
+        employees = []
+        for emp_id, metadata in iter_employees():
+            employees.append(employee_record(emp_id, metadata))
         
-        if not all_employees or not all_employees.get("metadatas"):
-            return {
-                'success': True,
-                'data': {"employees": [], "total_count": 0}
+        return json_response(request.headers, {
+            'success': True,
+            'data': {
+                "employees": employees,
+                "total_count": len(employees)
             }
+        }, etag)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error retrieving employees: {str(e)}"
+        )
+
+@app.get("/api/employees/search")
+async def search_roster(request: Request, q: str = "", department: Optional[str] = None, job_title: Optional[str] = None,
+                        status: Optional[str] = None, ids: Optional[str] = None, sort: Optional[str] = None,
+                        fields: Optional[str] = None, page: int = Query(1, ge=1),
+                        page_size: int = Query(50, ge=1, le=SEARCH_MAX_PAGE_SIZE)) -> Response:
+    """
+    Search employees server-side and return one page of results.
+    
+    Args:
+        request: Incoming request, checked for If-None-Match
+        q: Free-text query; every word must prefix-match the employee's name,
+            ID, department, job title or skills
+        department: Exact department, case-insensitive
+        job_title: Exact job title, case-insensitive
+        status: active, inactive or on_leave
+        ids: Comma-separated employee IDs to restrict results to
+        sort: name, id, department or job_title, prefixed with '-' for
+            descending order; roster order if omitted
+        fields: Comma-separated employee fields to return; all if omitted
+        page: 1-based page number
+        page_size: Employees per page, at most SEARCH_MAX_PAGE_SIZE
+    
+    Returns:
+        Dict containing the page of employees and the total number of matches,
+        or 304 if the roster is unchanged since the client's copy.
+    
+    Raises:
+        HTTPException: If a parameter is invalid or the search fails.
+    """
+    requested_fields = None
+    if fields:
+        requested_fields = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in requested_fields if field not in EMPLOYEE_FIELDS]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields: {', '.join(unknown)}; expected some of {', '.join(EMPLOYEE_FIELDS)}"
+            )
+    if sort and sort.lstrip("-") not in SEARCH_SORT_FIELDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cannot sort by {sort}; expected one of {', '.join(SEARCH_SORT_FIELDS)}"
+        )
+    if status and status not in SEARCH_STATUSES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown status {status}; expected one of {', '.join(SEARCH_STATUSES)}"
+        )
+    
+    filters = {
+        field: value for field, value in
+        (("department", department), ("job_title", job_title), ("status", status))
+        if value is not None
+    }
+    id_list = [emp_id.strip() for emp_id in ids.split(",") if emp_id.strip()] if ids is not None else None
+    
+    try:
+        # Same roster revision and same query give the same page
+        etag = revision_etag("roster-search", get_roster_revision(), request.url.query)
+        if etag_matches(request.headers, etag):
+            return not_modified(etag)
         
-        employees = []
-        for i, metadata in enumerate(all_employees["metadatas"]):
-            employee = {
-                "id": all_employees["ids"][i],
-                "name": metadata.get("name", "Unknown"),
-                "email": metadata.get("email", ""),
-                "department": metadata.get("department", ""),
-                "job_title": metadata.get("original_job_title", ""),
-                "skills": metadata.get("skills", ""),
-                "active": metadata.get("active", True),
-                "on_leave": metadata.get("on_leave", False)
+        # The first search after a roster change rebuilds the index
+        results = await asyncio.to_thread(
+            search_employees, q, filters, id_list, sort,
+            (page - 1) * page_size, page_size, requested_fields
+        )
+        return json_response(request.headers, {
+            'success': True,
+            'data': {
+                **results,
+                "page": page,
+                "page_size": page_size
             }
-            employees.append(employee)
+        }, etag)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error searching employees: {str(e)}"
+        )
+
+@app.get("/api/employees/semantic-search")
+async def semantic_search_roster(request: Request, q: str, k: int = Query(10, ge=1, le=SEMANTIC_SEARCH_MAX_RESULTS),
+                                 available_only: bool = False) -> Response:
+    """
+    Find the employees whose job, department and skills best match a description.
+    
+    Args:
+        request: Incoming request, checked for If-None-Match
+        q: Free-text description, e.g. "experienced reach truck operator"
+        k: Number of employees to return
+        available_only: Leave out inactive employees and those on leave
+    
+    Returns:
+        Dict containing the closest employees with their similarity scores,
+        best first, or 304 if the roster is unchanged since the client's copy.
+    
+    Raises:
+        HTTPException: If semantic search is disabled or the search fails.
+    """
+    if not SEMANTIC_SEARCH_ENABLED:
+        raise HTTPException(
+            status_code=404,
+            detail="Semantic search is disabled (SEMANTIC_SEARCH_ENABLED=false)"
+        )
+    
+    try:
+        # Results also change when a reindex catches the index up with the roster
+        etag = revision_etag("roster-semantic", get_roster_revision(), semantic_search.index_revision(), request.url.query)
+        if etag_matches(request.headers, etag):
+            return not_modified(etag)
         
+        # Embedding the query (loading the model on this worker's first search)
+        # and the ANN lookup are blocking
+        neighbours = await asyncio.to_thread(
+            semantic_search.search, q, k * SEMANTIC_SEARCH_OVERFETCH if available_only else k
+        )
+        details = get_employee_details_many([emp_id for emp_id, _ in neighbours])
+        
+        employees = []
+        for emp_id, score in neighbours:
+            # Rows deleted since they were embedded are skipped
+            if not details.get(emp_id):
+                continue
+            employee = employee_record(emp_id, details[emp_id])
+            if available_only and employee_status(employee) != "active":
+                continue
+            employees.append({**employee, "score": score})
+        
+        return json_response(request.headers, {
+            'success': True,
+            'data': {
+                "query": q,
+                "employees": employees[:k]
+            }
+        }, etag)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error in semantic search: {str(e)}"
+        )
+
+@app.post("/api/employees/reconcile")
+async def reconcile_employee_names(request: ReconcileRequest) -> Dict[str, Any]:
+    """
+    Match a list of free-text names against the roster.
+    
+    Args:
+        request: Names to match, e.g. a timeclock export or agency sign-in sheet
+    
+    Returns:
+        Dict containing the best match, score and ambiguity flag for each name.
+    
+    Raises:
+        HTTPException: If there's an error matching the names.
+    """
+    try:
+        # Matching is CPU-bound; keep it off the event loop
+        matches = await asyncio.to_thread(reconcile_names, request.names)
+        matched_count = sum(1 for match in matches if match["employee_id"])
         return {
             'success': True,
             'data': {
-                "employees": employees,
-                "total_count": len(employees)
+                "matches": matches,
+                "matched_count": matched_count,
+                "unmatched_count": len(matches) - matched_count,
+                "ambiguous_count": sum(1 for match in matches if match["ambiguous"])
             }
         }
     except Exception as e:
         raise HTTPException(
             status_code=500,
-            detail=f"Error retrieving employees: {str(e)}"
+            detail=f"Error reconciling names: {str(e)}"
         )
 
+@app.post("/api/employees/upload")
+async def upload_roster(request: Request, format: Optional[str] = None,
+                        deactivate_missing: bool = False) -> StreamingResponse:
+    """
+    Import an XLSX or CSV roster export sent as the request body.
+    
+    Requires "Authorization: Bearer <ROSTER_UPLOAD_TOKEN>", and is disabled
+    while no token is configured. The upload is streamed to a temporary
+    file, then read and imported in batches of IMPORT_BATCH_SIZE rows. Progress is streamed back as
+    Server-Sent Events: a progress event after each batch with running
+    counts, then a complete event with the diff against the stored roster
+    (or an error event if the import fails).
+    
+    Args:
+        request: Incoming request whose body is the roster file
+        format: 'xlsx' or 'csv'; detected from the file contents if omitted
+        deactivate_missing: Deactivate employees missing from the export;
+            off by default, so a partial file can't deactivate the rest
+        
+    Returns:
+        text/event-stream response
+    
+    Raises:
+        HTTPException: If uploads are disabled or the token is wrong, the
+            format is unsupported, or the body is empty or larger than
+            ROSTER_UPLOAD_MAX_BYTES.
+    """
+    if not ROSTER_UPLOAD_TOKEN:
+        raise HTTPException(
+            status_code=403,
+            detail="Roster upload is disabled; set ROSTER_UPLOAD_TOKEN to enable it"
+        )
+    authorization = request.headers.get("authorization", "").encode("utf-8")
+    if not hmac.compare_digest(authorization, f"Bearer {ROSTER_UPLOAD_TOKEN}".encode("utf-8")):
+        raise HTTPException(
+            status_code=401,
+            detail="Missing or invalid roster upload token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    
+    # Refuse a declared oversized body before reading any of it; the limit
+    # is enforced again while streaming for bodies without a length
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > ROSTER_UPLOAD_MAX_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Roster file is larger than {ROSTER_UPLOAD_MAX_BYTES} bytes"
+        )
+    
+    if format is not None and format.lower() not in ("xlsx", "csv"):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported roster format: {format}, expected xlsx or csv"
+        )
+    
+    # XLSX files are ZIP archives and need random access, so the body is
+    # spooled to disk rather than parsed straight off the socket
+    fd, path = tempfile.mkstemp(prefix="roster_upload_")
+    size = 0
+    head = b""
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > ROSTER_UPLOAD_MAX_BYTES:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Roster file is larger than {ROSTER_UPLOAD_MAX_BYTES} bytes"
+                    )
+                if len(head) < 8:
+                    head += chunk[:8]
+                f.write(chunk)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Roster file is empty")
+    except BaseException:
+        os.remove(path)
+        raise
+    
+    file_format = format.lower() if format else sniff_format(head)
+    
+    def import_next_batch(sync: RosterSync, chunks) -> Optional[Dict[str, int]]:
+        chunk = next(chunks, None)
+        return None if chunk is None else sync.process(chunk)
+    
+    async def event_stream():
+        try:
+            # Reading and writing are blocking; keep them off the event loop
+            sync = await asyncio.to_thread(RosterSync, get_storage(), deactivate_missing)
+            chunks = iter_roster_chunks(path, file_format)
+            yield format_sse_event("started", {"format": file_format, "bytes": size})
+            while True:
+                progress = await asyncio.to_thread(import_next_batch, sync, chunks)
+                if progress is None:
+                    break
+                yield format_sse_event("progress", progress)
+            summary = await asyncio.to_thread(sync.finish)
+            yield format_sse_event("complete", summary)
+        except Exception as e:
+            print(f"Error importing uploaded roster: {e}")
+            yield format_sse_event("error", {"error": str(e)})
+        finally:
+            invalidate_roster_indexes()
+            os.remove(path)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/")
 async def root():
     try:
@@ -143,12 +568,16 @@ async def root():
         return {"error": str(e)}
 
 @app.get("/api/schedule")
-async def get_schedule() -> Dict[str, Any]:
+async def get_schedule(request: Request) -> Response:
     """
     Get warehouse scheduling data for tomorrow.
     
+    Args:
+        request: Incoming request, checked for If-None-Match
+    
     Returns:
-        Dict containing scheduling data including required staff and forecast.
+        Dict containing scheduling data including required staff and forecast,
+        or 304 if it matches the client's copy.
     
     Raises:
         HTTPException: If there's an error generating the schedule.
@@ -180,27 +609,293 @@ async def get_schedule() -> Dict[str, Any]:
                 day_after_data['assigned_employees']
             )
         
-        return {
+        return json_response(request.headers, {
             'success': True,
             'data': scheduling_data,
             'database_saves': saves_successful
-        }
+        })
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error generating schedule: {str(e)}"
         )
 
+@app.post("/api/schedule/jobs", status_code=202)
+async def create_schedule_job() -> Dict[str, Any]:
+    """
+    Start a scheduler run in the background.
+    
+    Returns:
+        Dict containing the job ID to poll for progress. If a run is already
+        in progress its job is returned instead of starting another one.
+        With JOB_RUN_INLINE set the finished job is returned.
+    """
+    job = await asyncio.to_thread(job_service.create_scheduler_job)
+    return {
+        'success': True,
+        'data': job
+    }
+
+@app.get("/api/schedule/jobs/{job_id}")
+async def get_schedule_job(request: Request, job_id: str) -> Response:
+    """
+    Get status, current stage, partial results and final output of a scheduler run.
+    
+    Args:
+        request: Incoming request, checked for If-None-Match
+        job_id: ID returned when the job was created
+        
+    Returns:
+        Dict containing the job state, or 304 if it has not changed since the
+        client's last poll.
+    
+    Raises:
+        HTTPException: If the job is unknown or has expired.
+    """
+    job = await asyncio.to_thread(job_service.get_job, job_id)
+    if not job:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Scheduler job {job_id} not found"
+        )
+    
+    return json_response(request.headers, {
+        'success': True,
+        'data': job
+    })
+
+@app.get("/api/schedule/stream")
+async def stream_schedule(request: Request, job_id: Optional[str] = None) -> StreamingResponse:
+    """
+    Stream scheduler progress and the final schedule as Server-Sent Events.
+    
+    Events are pushed as each stage completes: customer_fetched,
+    inbound_computed, forecast_ready, roles_computed, assignments_saved and
+    emails_sent, followed by a schedule event with the full payload (or an
+    error event if the run fails). Each event's data is a JSON object with
+    the job's overall "progress" percentage and the stage's "data".
+    
+    Args:
+        request: Incoming request, used for the Last-Event-ID reconnect header
+        job_id: Existing scheduler job to follow; a run is started if omitted
+        
+    Returns:
+        text/event-stream response
+    
+    Raises:
+        HTTPException: If the requested job is unknown or has expired.
+    """
+    if job_id is None:
+        job_id = (await asyncio.to_thread(job_service.create_scheduler_job))["job_id"]
+    elif await asyncio.to_thread(job_service.get_job, job_id) is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Scheduler job {job_id} not found"
+        )
+    
+    last_event_id = request.headers.get("last-event-id", "")
+    position = int(last_event_id) + 1 if last_event_id.isdigit() else 0
+    
+    async def event_stream():
+        nonlocal position
+        if position == 0:
+            yield format_sse_event("job", {"job_id": job_id})
+        
+        idle_seconds = 0.0
+        while True:
+            state = await asyncio.to_thread(job_service.get_job_events, job_id, position)
+            if state is None:
+                yield format_sse_event("error", {
+                    "progress": 0,
+                    "data": {"error": f"Scheduler job {job_id} expired"}
+                })
+                return
+            
+            events, finished = state
+            for event in events:
+                yield format_sse_event(
+                    event["event"],
+                    {"progress": event["progress"], "data": event["data"]},
+                    position
+                )
+                position += 1
+            if finished:
+                return
+            
+            if events:
+                idle_seconds = 0.0
+            elif idle_seconds >= SSE_KEEPALIVE_INTERVAL:
+                # Comment line keeps proxies from closing an idle stream
+                yield ": keepalive\n\n"
+                idle_seconds = 0.0
+            
+            await asyncio.sleep(SSE_POLL_INTERVAL)
+            idle_seconds += SSE_POLL_INTERVAL
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/scheduled-employees")
+async def get_scheduled_employees_between(request: Request, start_date: str = Query(..., alias="from"),
+                                          end_date: str = Query(..., alias="to"), role: Optional[str] = None,
+                                          employee_id: Optional[str] = None) -> Response:
+    """
+    Get scheduled employees for a date range, e.g. a week or a month.
+    
+    Args:
+        request: Incoming request, checked for If-None-Match
+        start_date: First date (the "from" parameter) in YYYY-MM-DD format
+        end_date: Last date (the "to" parameter) in YYYY-MM-DD format, inclusive
+        role: Only assignments to this role
+        employee_id: Only assignments of this employee
+        
+    Returns:
+        Dict containing the assignments ordered by date and the count per date,
+        or 304 if they match the client's copy.
+    
+    Raises:
+        HTTPException: If the range is invalid or the assignments can't be retrieved.
+    """
+    validate_date_range(start_date, end_date)
+    try:
+        scheduled_data = await asyncio.to_thread(get_scheduled_employees_range, start_date, end_date, role, employee_id)
+        return json_response(request.headers, {
+            'success': True,
+            'data': scheduled_data
+        })
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error retrieving scheduled employees: {str(e)}"
+        )
+
+@app.get("/api/staffing-history")
+async def get_staffing_history_between(request: Request, start_date: str = Query(..., alias="from"),
+                                       end_date: str = Query(..., alias="to"), role: Optional[str] = None) -> Response:
+    """
+    Get the daily staffing requirements saved for a date range.
+    
+    Args:
+        request: Incoming request, checked for If-None-Match
+        start_date: First date (the "from" parameter) in YYYY-MM-DD format
+        end_date: Last date (the "to" parameter) in YYYY-MM-DD format, inclusive
+        role: Comma-separated roles to include, as "<operation>_<role>" keys
+            or bare role names; all roles if omitted
+        
+    Returns:
+        Dict containing the staffing records, oldest first, or 304 if they
+        match the client's copy.
+    
+    Raises:
+        HTTPException: If the range is invalid or the history can't be retrieved.
+    """
+    validate_date_range(start_date, end_date)
+    roles = [name.strip() for name in role.split(",") if name.strip()] if role else None
+    try:
+        history = await asyncio.to_thread(get_staffing_between, start_date, end_date, roles)
+        return json_response(request.headers, {
+            'success': True,
+            'data': {
+                "start_date": start_date,
+                "end_date": end_date,
+                "history": history,
+                "total_count": len(history)
+            }
+        })
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error retrieving staffing history: {str(e)}"
+        )
+
+@app.get("/api/staffing-history/trends")
+async def get_staffing_trends(request: Request,
+                              days: Optional[int] = Query(None, ge=1, le=HISTORY_RANGE_MAX_DAYS)) -> Response:
+    """
+    Get rolling staffing averages per role for trend widgets.
+    
+    The aggregates are maintained as staffing is saved, so this does not
+    read the history unless another period is requested with days.
+    
+    Args:
+        request: Incoming request, checked for If-None-Match
+        days: Additional period, in days, to average each role over; like
+            the maintained windows it ends at the latest saved date
+        
+    Returns:
+        Dict containing the 7, 28 and 90-day totals and averages and the
+        exponentially weighted average of each role, plus the requested
+        period's averages under "moving_averages", or 304 if they match the
+        client's copy.
+    
+    Raises:
+        HTTPException: If there's an error retrieving the aggregates.
+    """
+    try:
+        trends = await asyncio.to_thread(get_staffing_aggregates)
+        if days is not None:
+            trends["moving_averages"] = {
+                "days": days,
+                "averages": await asyncio.to_thread(calculate_moving_averages, days)
+            }
+        return json_response(request.headers, {
+            'success': True,
+            'data': trends
+        })
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error retrieving staffing trends: {str(e)}"
+        )
+
+@app.get("/api/staffing-history/year-over-year")
+async def get_staffing_year_over_year(request: Request, end: Optional[str] = None,
+                                      days: int = Query(28, ge=1, le=HISTORY_RANGE_MAX_DAYS)) -> Response:
+    """
+    Compare each role's average staffing with the same period a year earlier.
+    
+    Args:
+        request: Incoming request, checked for If-None-Match
+        end: Last date of the current period in YYYY-MM-DD format; the latest
+            saved date if omitted
+        days: Length of both periods in days
+        
+    Returns:
+        Dict containing both periods and each role's averages and percentage
+        change, or 304 if they match the client's copy.
+    
+    Raises:
+        HTTPException: If the date is invalid or the comparison fails.
+    """
+    if end is not None:
+        validate_date_range(end, end)
+    try:
+        comparison = await asyncio.to_thread(year_over_year, end, days)
+        return json_response(request.headers, {
+            'success': True,
+            'data': comparison
+        })
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error comparing staffing history: {str(e)}"
+        )
+
 @app.get("/api/scheduled-employees/{date}")
-async def get_scheduled_employees_by_date(date: str) -> Dict[str, Any]:
+async def get_scheduled_employees_by_date(request: Request, date: str) -> Response:
     """
     Get scheduled employees for a specific date.
     
     Args:
+        request: Incoming request, checked for If-None-Match
         date: Date in YYYY-MM-DD format
         
     Returns:
-        Dict containing scheduled employee details for the specified date.
+        Dict containing scheduled employee details for the specified date,
+        or 304 if they match the client's copy.
     
     Raises:
         HTTPException: If there's an error retrieving the scheduled employees.
@@ -208,10 +903,11 @@ async def get_scheduled_employees_by_date(date: str) -> Dict[str, Any]:
     try:
         scheduled_data = get_scheduled_employees(date)
         
-        return {
+        # Assignments can be saved by any worker, so the ETag comes from the content
+        return json_response(request.headers, {
             'success': True,
             'data': scheduled_data
-        }
+        })
     except Exception as e:
         raise HTTPException(
             status_code=500,
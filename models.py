@@ -57,4 +57,8 @@ class ScheduleData(BaseModel):
     day_name: str
     required_roles: Dict[str, int]
     assigned_employees: Dict[str, List[str]]
-    forecast_data: Dict[str, float]
\ No newline at end of file
+    forecast_data: Dict[str, float]
+
+class ReconcileRequest(BaseModel):
+    """Bulk name reconciliation request."""
+    names: List[str] = Field(..., max_length=10000)
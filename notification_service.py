@@ -6,8 +6,9 @@ from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta
 from typing import Dict, List, Any
 from config import EMAIL_CONFIG, DEFAULT_SHIFT
-from database import get_employee_details
+from database import get_employee_details_many
 from metrics_config import ROLE_URLS, DEFAULT_ROLE_URL
+from telemetry import EMAIL_SEND_LATENCY
 
 
 def calculate_total_staff_from_dict(staff_dict: Dict[str, int]) -> int:
@@ -450,14 +451,18 @@ def send_schedule_email(schedule_data: Dict[str, Any], assigned_employees: Dict[
             print("ERROR: Sender email not configured")
             return False
 
+        # Get every assigned employee's email from the database in one read
+        all_details = get_employee_details_many(
+            [emp_id for employees in assigned_employees.values() for emp_id in employees]
+        )
+        
         for role, employees in assigned_employees.items():
             # Extract base role without operation prefix for display
             display_role = role.split('_', 1)[-1] if '_' in role else role
             
             for emp_id in employees:
                 try:
-                    # Get employee email from database
-                    metadata = get_employee_details(emp_id)
+                    metadata = all_details.get(emp_id)
                     if not metadata:
                         print(f"No data found for employee {emp_id}")
                         continue
@@ -480,10 +485,11 @@ def send_schedule_email(schedule_data: Dict[str, Any], assigned_employees: Dict[
                     msg.attach(MIMEText(html, "html"))
                     
                     # Send email
-                    with smtplib.SMTP(EMAIL_CONFIG["smtp_server"], EMAIL_CONFIG["smtp_port"]) as server:
-                        server.starttls()
-                        server.login(EMAIL_CONFIG["sender_email"], EMAIL_CONFIG["sender_password"])
-                        server.send_message(msg)
+                    with EMAIL_SEND_LATENCY.time(email_type="schedule"):
+                        with smtplib.SMTP(EMAIL_CONFIG["smtp_server"], EMAIL_CONFIG["smtp_port"]) as server:
+                            server.starttls()
+                            server.login(EMAIL_CONFIG["sender_email"], EMAIL_CONFIG["sender_password"])
+                            server.send_message(msg)
                     
                     print(f"Enhanced schedule email sent successfully to {email}")
                 
@@ -710,10 +716,11 @@ def send_combined_forecast_email(tomorrow_data: Dict[str, Any], day_after_data:
         msg.attach(MIMEText(html, "html"))
         
         # Send email
-        with smtplib.SMTP(EMAIL_CONFIG["smtp_server"], EMAIL_CONFIG["smtp_port"]) as server:
-            server.starttls()
-            server.login(EMAIL_CONFIG["sender_email"], EMAIL_CONFIG["sender_password"])
-            server.send_message(msg)
+        with EMAIL_SEND_LATENCY.time(email_type="forecast"):
+            with smtplib.SMTP(EMAIL_CONFIG["smtp_server"], EMAIL_CONFIG["smtp_port"]) as server:
+                server.starttls()
+                server.login(EMAIL_CONFIG["sender_email"], EMAIL_CONFIG["sender_password"])
+                server.send_message(msg)
         
         print("Combined forecast and staffing email sent successfully")
         return True
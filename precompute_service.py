@@ -0,0 +1,287 @@
+"""Periodic precompute of forecasts and staffing so interactive requests hit warm data."""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Set
+import semantic_search
+from config import DB_PATH, PRECOMPUTE_CRON, SEMANTIC_SEARCH_ENABLED
+from api_client import get_tomorrow_date_range
+from metrics_service import get_metrics_summary, calculate_required_roles
+from role_classifier import classify_roster
+from schedule_service import get_orders_for_scheduling
+from staffing_history import save_daily_staffing
+from utils import FileLock
+
+# Lock and last-run marker shared by every worker using the same database directory
+LOCK_PATH = os.path.join(DB_PATH, "precompute.lock")
+STATE_PATH = os.path.join(DB_PATH, "precompute_state.json")
+_precompute_lock = FileLock(LOCK_PATH)
+
+# (name, minimum, maximum) of each cron field, in expression order
+CRON_FIELDS = [
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day", 1, 31),
+    ("month", 1, 12),
+    ("weekday", 0, 7)
+]
+
+_runner_thread: Optional[threading.Thread] = None
+
+def parse_cron_field(field: str, minimum: int, maximum: int) -> Set[int]:
+    """
+    Parse one cron field into the set of values it matches.
+
+    Supports '*', single values, ranges ('1-5'), steps ('*/15', '8-18/2')
+    and comma-separated lists of those.
+
+    Args:
+        field: Field text
+        minimum: Smallest allowed value
+        maximum: Largest allowed value
+
+    Returns:
+        Set of matching values
+
+    Raises:
+        ValueError: If the field is malformed or out of range
+    """
+    values = set()
+    for part in field.split(','):
+        step = 1
+        if '/' in part:
+            part, step_text = part.split('/', 1)
+            step = int(step_text)
+            if step < 1:
+                raise ValueError(f"Invalid cron step: {step_text}")
+
+        if part == '*':
+            start, end = minimum, maximum
+        elif '-' in part:
+            start_text, end_text = part.split('-', 1)
+            start, end = int(start_text), int(end_text)
+        else:
+            start = int(part)
+            end = maximum if step > 1 else start
+
+        if start < minimum or end > maximum or start > end:
+            raise ValueError(f"Cron value out of range: {part}")
+        values.update(range(start, end + 1, step))
+    return values
+
+def parse_cron(expression: str) -> Dict[str, Any]:
+    """
+    Parse a five-field cron expression (minute hour day month weekday).
+
+    Weekday 0 and 7 both mean Sunday.
+
+    Args:
+        expression: Cron expression
+
+    Returns:
+        Dictionary of field name to matching values, plus whether the day
+        and weekday fields were restricted
+
+    Raises:
+        ValueError: If the expression is malformed
+    """
+    fields = expression.split()
+    if len(fields) != 5:
+        raise ValueError(f"Cron expression must have 5 fields: {expression!r}")
+
+    schedule = {
+        name: parse_cron_field(text, minimum, maximum)
+        for text, (name, minimum, maximum) in zip(fields, CRON_FIELDS)
+    }
+    schedule["weekday"] = {day % 7 for day in schedule["weekday"]}
+    schedule["day_restricted"] = fields[2] != '*'
+    schedule["weekday_restricted"] = fields[4] != '*'
+    return schedule
+
+def cron_matches(schedule: Dict[str, Any], moment: datetime) -> bool:
+    """
+    Check whether a parsed cron schedule fires at the given minute.
+
+    Args:
+        schedule: Result of parse_cron
+        moment: Time to check
+
+    Returns:
+        bool: True if the schedule fires at this minute
+    """
+    if moment.minute not in schedule["minute"] or moment.hour not in schedule["hour"]:
+        return False
+    if moment.month not in schedule["month"]:
+        return False
+
+    # Cron weekdays count from Sunday; Python's count from Monday
+    day_match = moment.day in schedule["day"]
+    weekday_match = (moment.weekday() + 1) % 7 in schedule["weekday"]
+
+    # Standard cron: when both day fields are restricted either may match
+    if schedule["day_restricted"] and schedule["weekday_restricted"]:
+        return day_match or weekday_match
+    return day_match and weekday_match
+
+def get_precompute_schedules() -> List[Dict[str, Any]]:
+    """
+    Parse the configured precompute cron expressions.
+
+    Returns:
+        List of parsed schedules; invalid expressions are skipped with a warning
+    """
+    schedules = []
+    for expression in PRECOMPUTE_CRON.split(';'):
+        expression = expression.strip()
+        if not expression:
+            continue
+        try:
+            schedules.append(parse_cron(expression))
+        except ValueError as e:
+            print(f"Warning: Ignoring invalid precompute schedule {expression!r}: {e}")
+    return schedules
+
+def acquire_precompute_lock() -> bool:
+    """
+    Take the cross-process precompute lock without waiting.
+
+    The lock file is locked with the OS, so only one uvicorn worker (or
+    other process sharing DB_PATH) can hold it, and it is released
+    automatically if the holder crashes.
+
+    Returns:
+        bool: True if the lock was acquired
+    """
+    try:
+        return _precompute_lock.acquire(blocking=False)
+    except OSError as e:
+        print(f"Error acquiring precompute lock: {e}")
+        return False
+
+def release_precompute_lock() -> None:
+    """Release the precompute lock."""
+    try:
+        _precompute_lock.release()
+    except OSError as e:
+        print(f"Error releasing precompute lock: {e}")
+
+def _read_last_slot() -> Optional[str]:
+    try:
+        with open(STATE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f).get("last_slot")
+    except (OSError, ValueError):
+        return None
+
+def _write_last_slot(slot: str) -> None:
+    try:
+        with open(STATE_PATH, "w", encoding="utf-8") as f:
+            json.dump({"last_slot": slot, "finished_at": datetime.now().isoformat()}, f)
+    except OSError as e:
+        print(f"Error writing precompute state: {e}")
+
+def precompute_upcoming_schedules() -> Dict[str, Any]:
+    """
+    Precompute forecasts and staffing for the upcoming scheduling horizon.
+
+    Fetches fresh forecasts (refreshing the shared forecast cache), calculates
+    required roles and saves them to the staffing history. Assignments and
+    emails are left to interactive runs, which then find warm forecasts.
+
+    Returns:
+        Dictionary mapping each precomputed date to its required roles
+    """
+    tomorrow_start, _, day_after_start, _ = get_tomorrow_date_range()
+    metrics_summaries = get_metrics_summary()
+
+    precomputed = {}
+    for target_date in (tomorrow_start, day_after_start):
+        date_str = target_date.strftime('%Y-%m-%d')
+        forecast_data, _ = get_orders_for_scheduling(target_date, use_cache=False)
+        if not forecast_data:
+            print(f"Warning: Precompute could not build a forecast for {date_str}")
+            continue
+
+        required_roles = calculate_required_roles(metrics_summaries, forecast_data)
+        save_daily_staffing(date_str, required_roles)
+        precomputed[date_str] = required_roles
+
+    return precomputed
+
+def refresh_roster_embeddings() -> None:
+    """
+    Catch the semantic search index and suggested roles up with the roster.
+
+    Employees imported or synced while no worker had the embedding model
+    loaded are embedded and classified here, once per slot by the worker
+    holding the precompute lock, instead of by every worker at startup.
+    """
+    if not SEMANTIC_SEARCH_ENABLED:
+        return
+    try:
+        semantic_search.reindex()
+        if semantic_search.model_loaded():
+            classify_roster()
+    except Exception as e:
+        print(f"Error refreshing roster embeddings: {e}")
+
+def run_precompute_slot(slot: str) -> bool:
+    """
+    Run the precompute for a schedule slot unless another worker already has.
+
+    Args:
+        slot: Identifier of the scheduled minute, e.g. '2025-01-06T05:00'
+
+    Returns:
+        bool: True if this process ran the precompute
+    """
+    if not acquire_precompute_lock():
+        return False
+    try:
+        if _read_last_slot() == slot:
+            return False
+        started = time.time()
+        precomputed = precompute_upcoming_schedules()
+        _write_last_slot(slot)
+        print(f"Precomputed schedules for {list(precomputed)} in {time.time() - started:.1f}s")
+        refresh_roster_embeddings()
+        return True
+    except Exception as e:
+        print(f"Error in precompute run: {e}")
+        return False
+    finally:
+        release_precompute_lock()
+
+def _runner_loop(schedules: List[Dict[str, Any]]) -> None:
+    """Wake at the start of every minute and run the precompute when a schedule fires."""
+    while True:
+        time.sleep(60 - time.time() % 60)
+        now = datetime.now().replace(second=0, microsecond=0)
+        if any(cron_matches(schedule, now) for schedule in schedules):
+            run_precompute_slot(now.strftime('%Y-%m-%dT%H:%M'))
+
+def start_precompute_runner() -> bool:
+    """
+    Start the background precompute runner for this process.
+
+    Returns:
+        bool: True if a runner is running after the call
+    """
+    global _runner_thread
+
+    if _runner_thread is not None and _runner_thread.is_alive():
+        return True
+
+    schedules = get_precompute_schedules()
+    if not schedules:
+        print("Precompute runner disabled (no PRECOMPUTE_CRON schedules)")
+        return False
+
+    _runner_thread = threading.Thread(
+        target=_runner_loop, args=(schedules,), name="precompute-runner", daemon=True
+    )
+    _runner_thread.start()
+    print(f"Precompute runner started with schedules: {PRECOMPUTE_CRON}")
+    return True
@@ -0,0 +1,190 @@
+"""Opt-in sampling profiler for API requests, saved as flamegraph-compatible stacks."""
+
+import os
+import re
+import sys
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+from config import PROFILING, PROFILE_DIR, PROFILE_SAMPLE_INTERVAL, PROFILE_MAX_FILES
+
+PROFILING_ENABLED = PROFILING in ("request", "all")
+
+# Profile files are named by us; anything else is rejected on retrieval
+PROFILE_ID_PATTERN = re.compile(r'^[A-Za-z0-9_.-]+$')
+
+# Name of the sampling threads, which are left out of every profile
+PROFILER_THREAD_NAME = "request-profiler"
+
+# (file, function) of innermost frames where a thread waits for work rather
+# than doing any: the event loop's select, idle executor and anyio workers
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker")
+}
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def _is_idle(frame) -> bool:
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES
+
+class SamplingProfiler:
+    """
+    Samples the Python stacks of every busy thread at a fixed interval from a helper thread.
+
+    Request work runs on the event loop and, through asyncio.to_thread, the
+    thread pool, while scheduler runs use the job executor, so all threads
+    are sampled. Each stack is rooted at a "thread <name>" frame, and idle
+    threads are skipped.
+    """
+
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=PROFILER_THREAD_NAME, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                name = names.get(thread_id, str(thread_id))
+                if name == PROFILER_THREAD_NAME or _is_idle(frame):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(f"thread {name}")
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self) -> str:
+        """
+        Render samples in collapsed-stack format ("root;...;leaf count" per line),
+        readable by flamegraph.pl, speedscope and similar tools.
+        """
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+def should_profile(headers: Dict[str, str], query_params: Dict[str, str]) -> bool:
+    """
+    Decide whether a request should be profiled.
+
+    Args:
+        headers: Request headers
+        query_params: Request query parameters
+
+    Returns:
+        bool: True if the request should be profiled
+    """
+    if PROFILING == "all":
+        return True
+    if PROFILING != "request":
+        return False
+    flag = headers.get("x-profile") or query_params.get("profile") or ""
+    return flag.lower() in ("1", "true", "yes")
+
+def _prune_profiles() -> None:
+    """Keep only the newest PROFILE_MAX_FILES profiles."""
+    try:
+        names = sorted(name for name in os.listdir(PROFILE_DIR) if name.endswith(".folded"))
+        for name in names[:-PROFILE_MAX_FILES]:
+            os.remove(os.path.join(PROFILE_DIR, name))
+    except OSError as e:
+        print(f"Error pruning profiles: {e}")
+
+def save_profile(profiler: SamplingProfiler, method: str, path: str) -> Optional[str]:
+    """
+    Write a finished profile to PROFILE_DIR.
+
+    Args:
+        profiler: Stopped profiler
+        method: HTTP method of the profiled request
+        path: URL path of the profiled request
+
+    Returns:
+        Profile ID for retrieval, or None if it could not be saved
+    """
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', path).strip('_') or "root"
+    profile_id = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}_{method}_{slug}_{uuid.uuid4().hex[:8]}"
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        with open(os.path.join(PROFILE_DIR, f"{profile_id}.folded"), "w", encoding="utf-8") as f:
+            f.write(profiler.folded())
+        _prune_profiles()
+        return profile_id
+    except OSError as e:
+        print(f"Error saving profile: {e}")
+        return None
+
+async def profile_requests(request, call_next):
+    """
+    HTTP middleware that profiles opted-in requests.
+
+    Every busy thread is sampled, so work handed to asyncio.to_thread or the
+    job executor is included. Other requests running at the same time show
+    up in the profile too. Only installed when PROFILING is enabled.
+    """
+    if not should_profile(request.headers, request.query_params):
+        return await call_next(request)
+
+    profiler = SamplingProfiler()
+    profiler.start()
+    try:
+        response = await call_next(request)
+    finally:
+        profiler.stop()
+        profile_id = save_profile(profiler, request.method, request.url.path)
+
+    if profile_id:
+        response.headers["X-Profile-Id"] = profile_id
+    return response
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """
+    List saved profiles, newest first.
+
+    Returns:
+        List of dictionaries with profile ID, size and creation time
+    """
+    try:
+        names = sorted((name for name in os.listdir(PROFILE_DIR) if name.endswith(".folded")), reverse=True)
+    except OSError:
+        return []
+
+    profiles = []
+    for name in names:
+        path = os.path.join(PROFILE_DIR, name)
+        profiles.append({
+            "profile_id": name[:-len(".folded")],
+            "size_bytes": os.path.getsize(path),
+            "created_at": datetime.fromtimestamp(os.path.getmtime(path)).isoformat()
+        })
+    return profiles
+
+def get_profile_path(profile_id: str) -> Optional[str]:
+    """
+    Resolve a profile ID to its file.
+
+    Args:
+        profile_id: ID from the X-Profile-Id header or list_profiles
+
+    Returns:
+        Path to the profile file or None if it does not exist
+    """
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.folded")
+    return path if os.path.isfile(path) else None
@@ -0,0 +1,404 @@
+"""Classifies job titles and skills into the canonical roles of ROLE_MAPPINGS."""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+from typing import Dict, List, Any, Optional, Iterable, Tuple
+from config import DB_PATH, ROLE_MAPPINGS, ROLE_CLASSIFIER_MIN_SIMILARITY, ROLE_CLASSIFIER_ACCEPT_SIMILARITY, IMPORT_BATCH_SIZE
+from utils import FileLock, lazy_import
+
+np = lazy_import("numpy")
+
+# Employee metadata field holding the comma-separated canonical roles, from
+# rule matches, accepted titles and strong embedding matches; it decides
+# scheduling eligibility
+ROLES_FIELD = "roles"
+
+# Employee metadata field holding roles suggested by embedding similarity, as
+# comma-separated role:confidence pairs, best first; for review only
+SUGGESTED_ROLES_FIELD = "suggested_roles"
+
+# How a title was classified; ACCEPTED is a reviewer's decision for the title
+RULE = "rule"
+EMBEDDING = "embedding"
+ACCEPTED = "accepted"
+
+# Storage state key of the persisted prototypes and title -> role cache
+ROLE_CACHE_KEY = "role_classifier"
+
+# Storage state key of the normalized title -> role pairs accepted by reviewers;
+# kept apart from the cache so they survive a change of mappings or model
+ACCEPTED_ROLES_KEY = "role_classifier_accepted"
+
+# Sentence model used for prototypes and titles; part of the cache version
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+# Layout of cached title entries ([role, confidence, source]); part of the cache version
+CACHE_FORMAT = 2
+
+# Held while reclassifying the whole roster, so only one process sharing DB_PATH does it at a time
+_classify_lock = FileLock(os.path.join(DB_PATH, "role_classifier.lock"))
+
+def normalize_title(text: Any) -> str:
+    """
+    Normalize a job title, skill or role variation for rule matching and cache keys.
+
+    Args:
+        text: Title text
+
+    Returns:
+        Lower-cased alphanumeric words joined by underscores, without a trailing 's'
+    """
+    text = str(text).lower().strip()
+    text = re.sub(r'[^a-z0-9\s]', '', text)
+    text = re.sub(r'\s+', '_', text)
+    return re.sub(r's$', '', text)
+
+def role_prototypes(mappings: Dict[str, List[str]]) -> List[Tuple[str, str]]:
+    """
+    List the texts that stand for each role: its name and its variations.
+
+    Args:
+        mappings: Role -> variations, as ROLE_MAPPINGS
+
+    Returns:
+        (role, prototype text) pairs
+    """
+    prototypes = []
+    for role, variations in mappings.items():
+        texts = [role.replace('_', ' ').replace('/', ' ')] + list(variations)
+        prototypes.extend((role, text) for text in dict.fromkeys(text.lower() for text in texts))
+    return prototypes
+
+class RoleClassifier:
+    """
+    Maps each distinct title or skill string to a canonical role.
+
+    Strings containing one of a role's variations are classified by rule, as
+    ROLE_MAPPINGS was always applied. Anything else is embedded, once the
+    model is loaded, and matched to the role of its nearest prototype
+    embedding if it is similar enough; such matches are suggestions, unless
+    they reach accept_similarity or a reviewer accepts the title's role.
+    Results are kept in a title -> role cache persisted in storage, so each
+    distinct string is embedded once.
+    """
+
+    def __init__(self, storage, mappings: Dict[str, List[str]] = ROLE_MAPPINGS,
+                 min_similarity: float = ROLE_CLASSIFIER_MIN_SIMILARITY,
+                 accept_similarity: float = ROLE_CLASSIFIER_ACCEPT_SIMILARITY):
+        """
+        Set up the classifier; the cache is loaded on first use.
+
+        Args:
+            storage: Storage backend holding the persisted cache
+            mappings: Role -> variations
+            min_similarity: Cosine similarity needed to suggest the nearest prototype's role
+            accept_similarity: Cosine similarity at which that role is assigned, not just suggested
+        """
+        self.storage = storage
+        self.mappings = mappings
+        self.min_similarity = min_similarity
+        self.accept_similarity = accept_similarity
+        # Cached results depend on the roles, the model, the threshold and the entry layout
+        self.version = hashlib.sha256(
+            json.dumps([mappings, EMBEDDING_MODEL, min_similarity, CACHE_FORMAT], sort_keys=True).encode("utf-8")
+        ).hexdigest()[:16]
+        # Longest variations first, so "forklift driver" wins over "driver"
+        self.rules = sorted(
+            ((normalize_title(text), role) for role, text in role_prototypes(mappings) if normalize_title(text)),
+            key=lambda rule: len(rule[0]), reverse=True
+        )
+        self._cache: Optional[Dict[str, List[Any]]] = None
+        self._prototypes: Optional[Tuple[Any, List[str]]] = None
+        self._model_failed = False
+        self._lock = threading.Lock()
+
+    def _load(self) -> None:
+        """Load the persisted cache if it matches the current version."""
+        if self._cache is not None:
+            return
+        state = None
+        try:
+            state = self.storage.get_state(ROLE_CACHE_KEY)
+        except Exception as e:
+            print(f"Warning: Could not load role classifier cache: {e}")
+        if state and state.get("version") == self.version:
+            self._cache = state.get("titles", {})
+            if state.get("prototypes"):
+                self._prototypes = (np.asarray(state["prototypes"], dtype=np.float32), state["prototype_roles"])
+        else:
+            self._cache = {}
+
+    def _save(self) -> None:
+        """Persist the cache and prototype embeddings."""
+        state = {"version": self.version, "titles": self._cache}
+        if self._prototypes is not None:
+            state["prototypes"] = self._prototypes[0].round(6).tolist()
+            state["prototype_roles"] = self._prototypes[1]
+        try:
+            self.storage.put_state(ROLE_CACHE_KEY, state)
+        except Exception as e:
+            print(f"Warning: Could not save role classifier cache: {e}")
+
+    def _embed(self, texts: List[str]):
+        """Unit-length embeddings of texts, as a float32 matrix."""
+        from semantic_search import embed
+
+        vectors = np.asarray(embed(texts), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def match_rule(self, text: str) -> Optional[str]:
+        """
+        Get the role whose longest variation the text contains, without embedding.
+
+        Args:
+            text: Title, skill or role name
+
+        Returns:
+            Role name or None
+        """
+        return self._match_key(normalize_title(text))
+
+    def accepted_titles(self) -> Dict[str, str]:
+        """Normalized title -> role accepted by a reviewer, read on every call so all processes see new ones."""
+        try:
+            return self.storage.get_state(ACCEPTED_ROLES_KEY) or {}
+        except Exception as e:
+            print(f"Warning: Could not load accepted roles: {e}")
+            return {}
+
+    def accept(self, text: str, role: Optional[str] = None) -> str:
+        """
+        Accept a role for a title or skill, so it is assigned like a rule match.
+
+        Args:
+            text: Title or skill as it appears in the roster
+            role: Role to accept; the title's suggested role if omitted
+
+        Returns:
+            The accepted role
+
+        Raises:
+            ValueError: If the role is unknown, or none was given and the
+                title has no suggested role
+        """
+        key = normalize_title(text)
+        if role is None:
+            cached = self.cached_titles().get(key)
+            if not cached or not cached[0]:
+                raise ValueError(f"No suggested role for {text!r}; name the role to accept")
+            role = cached[0]
+        if role not in self.mappings:
+            raise ValueError(f"Unknown role {role!r}, expected one of {list(self.mappings)}")
+
+        accepted = self.accepted_titles()
+        accepted[key] = role
+        self.storage.put_state(ACCEPTED_ROLES_KEY, accepted)
+        return role
+
+    def _match_key(self, key: str) -> Optional[str]:
+        for pattern, role in self.rules:
+            if pattern in key:
+                return role
+        return None
+
+    def classify(self, texts: Iterable[str]) -> Dict[str, Optional[Tuple[str, float, str]]]:
+        """
+        Classify titles or skills, embedding only strings not seen before.
+
+        Strings no rule matches are only embedded if the model is already
+        loaded, so classifying never loads it; until then they stay
+        unclassified and are retried on the next call.
+
+        Args:
+            texts: Job titles or skill strings; duplicates are classified once
+
+        Returns:
+            Mapping of each non-empty text to (role, confidence, RULE,
+            EMBEDDING or ACCEPTED), or None if it matches no role
+        """
+        from semantic_search import model_loaded
+
+        accepted = self.accepted_titles()
+        keys = {}
+        for text in texts:
+            key = normalize_title(text)
+            if key and key != 'nan':
+                keys[text] = key
+
+        with self._lock:
+            self._load()
+            unseen = {}
+            for text, key in keys.items():
+                if key not in self._cache and key not in accepted:
+                    unseen.setdefault(key, text)
+
+            changed = False
+            to_embed = []
+            for key, text in unseen.items():
+                role = self._match_key(key)
+                if role is not None:
+                    self._cache[key] = [role, 1.0, RULE]
+                    changed = True
+                else:
+                    to_embed.append((key, text))
+
+            if to_embed and model_loaded() and not self._model_failed:
+                try:
+                    if self._prototypes is None:
+                        prototypes = role_prototypes(self.mappings)
+                        self._prototypes = (self._embed([text for _, text in prototypes]),
+                                            [role for role, _ in prototypes])
+                    matrix, prototype_roles = self._prototypes
+                    # One matrix product scores every new string against every prototype
+                    similarities = self._embed([text.lower() for _, text in to_embed]) @ matrix.T
+                    best = similarities.argmax(axis=1)
+                    for row, (key, _) in enumerate(to_embed):
+                        score = float(similarities[row, best[row]])
+                        role = prototype_roles[best[row]] if score >= self.min_similarity else None
+                        self._cache[key] = [role, round(score, 4), EMBEDDING]
+                    changed = True
+                except Exception as e:
+                    # Rules keep working; unmatched strings are retried after a restart
+                    print(f"Warning: Could not embed job titles, classifying by rules only: {e}")
+                    self._model_failed = True
+
+            if changed:
+                self._save()
+
+            results = {}
+            for text, key in keys.items():
+                cached = [accepted[key], 1.0, ACCEPTED] if key in accepted else self._cache.get(key)
+                results[text] = tuple(cached) if cached and cached[0] else None
+            return results
+
+    def cached_titles(self) -> Dict[str, List[Any]]:
+        """Normalized title -> [role, confidence, source] for everything classified so far."""
+        with self._lock:
+            self._load()
+            return dict(self._cache)
+
+_classifier: Optional[RoleClassifier] = None
+_classifier_lock = threading.Lock()
+
+def get_role_classifier() -> RoleClassifier:
+    """
+    Get the classifier for the configured storage, creating it on first use.
+
+    Returns:
+        Shared RoleClassifier
+    """
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                from storage import get_storage
+                _classifier = RoleClassifier(get_storage())
+    return _classifier
+
+def employee_role_texts(metadata: Dict[str, Any]) -> List[str]:
+    """Job title and skills of an employee, the strings its roles are derived from."""
+    texts = [metadata.get("original_job_title", "")]
+    texts.extend(skill for skill in str(metadata.get("skills", "")).split(','))
+    return [text for text in texts if text and text.strip()]
+
+def assign_roles(metadatas: List[Dict[str, Any]], classifier: Optional[RoleClassifier] = None) -> None:
+    """
+    Set the roles and suggested roles of employees from their job title and skills, in place.
+
+    Each distinct title or skill in the batch is classified once. Rule
+    matches, accepted titles and embedding matches of at least the
+    classifier's accept_similarity become roles; weaker embedding matches
+    only become suggestions, with their confidence, for someone to review
+    and accept.
+
+    Args:
+        metadatas: Employee metadata to update
+        classifier: Classifier to use; the shared one if omitted
+    """
+    classifier = classifier or get_role_classifier()
+    results = classifier.classify(text for metadata in metadatas for text in employee_role_texts(metadata))
+    for metadata in metadatas:
+        roles = set()
+        suggestions: Dict[str, float] = {}
+        for result in (results.get(text) for text in employee_role_texts(metadata)):
+            if result is None:
+                continue
+            role, confidence, source = result
+            if source in (RULE, ACCEPTED) or confidence >= classifier.accept_similarity:
+                roles.add(role)
+            else:
+                suggestions[role] = max(confidence, suggestions.get(role, 0.0))
+        metadata[ROLES_FIELD] = ",".join(sorted(roles))
+        metadata[SUGGESTED_ROLES_FIELD] = ",".join(
+            f"{role}:{confidence:.2f}"
+            for role, confidence in sorted(suggestions.items(), key=lambda item: -item[1])
+            if role not in roles
+        )
+
+def classify_roster() -> Dict[str, int]:
+    """
+    Assign roles to every stored employee whose roles or suggestions changed.
+
+    Holds a lock file in DB_PATH while reading and rewriting the roster.
+
+    Returns:
+        Dictionary with the numbers of employees checked and updated
+    """
+    from storage import get_storage
+
+    with _classify_lock:
+        storage = get_storage()
+        employees = storage.get_all_employees()
+        metadatas = [dict(metadata) for metadata in employees["metadatas"]]
+        assign_roles(metadatas)
+
+        changed = [
+            (emp_id, metadata) for emp_id, old, metadata in zip(employees["ids"], employees["metadatas"], metadatas)
+            if old.get(ROLES_FIELD) != metadata[ROLES_FIELD]
+            or old.get(SUGGESTED_ROLES_FIELD) != metadata[SUGGESTED_ROLES_FIELD]
+        ]
+        for start in range(0, len(changed), IMPORT_BATCH_SIZE):
+            batch = changed[start:start + IMPORT_BATCH_SIZE]
+            storage.update_employee_metadata([emp_id for emp_id, _ in batch], [metadata for _, metadata in batch])
+
+        print(f"Classified {len(metadatas)} employees, {len(changed)} updated")
+        return {"checked": len(metadatas), "updated": len(changed)}
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Job title to role classifier")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("classify", help="assign roles to the stored roster")
+    subparsers.add_parser("report", help="list every classified title with its role, confidence and source")
+    accept_parser = subparsers.add_parser("accept", help="assign a title's suggested (or a given) role to everyone with it")
+    accept_parser.add_argument("title", help="job title or skill, as in the roster or the report")
+    accept_parser.add_argument("role", nargs="?", help="role to accept instead of the suggested one")
+    args = parser.parse_args(argv)
+
+    if args.command == "classify":
+        from semantic_search import load_model
+
+        load_model()
+        classify_roster()
+    elif args.command == "accept":
+        try:
+            role = get_role_classifier().accept(args.title, args.role)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        print(f"Accepted {role} for {normalize_title(args.title)}")
+        classify_roster()
+    else:
+        classifier = get_role_classifier()
+        titles = classifier.cached_titles()
+        titles.update({key: [role, 1.0, ACCEPTED] for key, role in classifier.accepted_titles().items()})
+        for key, (role, score, source) in sorted(titles.items()):
+            print(f"{score:6.3f}  {source:<9}  {role or '-':<20} {key}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,436 @@
+"""Roster import pipeline: normalize HR exports and write them to storage in batches."""
+
+from __future__ import annotations
+
+import codecs
+import hashlib
+import json
+from datetime import datetime
+from typing import Dict, List, Any, Iterable, Iterator, Tuple
+from config import IMPORT_BATCH_SIZE
+from storage import StorageBackend
+from utils import lazy_import
+import semantic_search
+from role_classifier import ROLES_FIELD, SUGGESTED_ROLES_FIELD, assign_roles
+
+pd = lazy_import("pandas")
+
+# Source column -> column name used by the importer
+COLUMN_MAPPING = {
+    'Company Code': 'Company Code',
+    'Employee Id': 'Employee Id',
+    'Last Name': 'Last Name',
+    'Preferred First Name': 'First Name',
+    'Hire Date': 'Hire Date',
+    'Current Home Email': 'Email',
+    'Supervisor': 'Supervisor',
+    'Position Description': 'Job Title',
+    'Account': 'Department Description'
+}
+
+# Columns filled with '' when the file does not have them
+OPTIONAL_COLUMNS = ['Email', 'Supervisor', 'Hire Date']
+
+# Metadata left out of the content hash: bookkeeping and derived fields rather than HR data
+UNHASHED_FIELDS = {"last_updated", "content_hash", "active", "removed_from_source", "schedulable",
+                   ROLES_FIELD, SUGGESTED_ROLES_FIELD}
+
+# Encodings tried, in order, on the start of an uploaded CSV
+CSV_ENCODINGS = ['utf-8', 'cp1252', 'latin1']
+
+# Bytes of an upload inspected when sniffing its encoding
+SNIFF_BYTES = 64 * 1024
+
+def content_hash(metadata: Dict[str, Any]) -> str:
+    """
+    Stable hash of an employee's imported fields, used to detect changed rows.
+
+    Args:
+        metadata: Employee metadata from transform_employees
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    content = {key: value for key, value in metadata.items() if key not in UNHASHED_FIELDS}
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode("utf-8")).hexdigest()
+
+def prepare_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rename source columns and convert every value to a string.
+
+    Args:
+        df: Rows as read from the export
+
+    Returns:
+        DataFrame with importer column names; missing cells become 'nan'
+    """
+    df = df.rename(columns=COLUMN_MAPPING)
+    for col in OPTIONAL_COLUMNS:
+        if col not in df.columns:
+            df[col] = ''
+    return df.astype(str)
+
+def transform_employees(df: pd.DataFrame, existing_employee_ids: Iterable[str] = ()
+                        ) -> Tuple[List[str], List[Dict[str, Any]], List[str], int]:
+    """
+    Turn an employee DataFrame into storage records with column-wise operations.
+
+    Rows without an ID or a complete name are skipped, as are IDs already
+    stored or repeated earlier in the file.
+
+    Args:
+        df: DataFrame from prepare_frame
+        existing_employee_ids: Employee IDs to skip as duplicates
+
+    Returns:
+        Tuple of (ids, metadatas, documents, skipped count)
+    """
+    employee_id = df['Employee Id'].str.strip()
+    first_name = df['First Name'].str.strip()
+    last_name = df['Last Name'].str.strip()
+    full_name = (first_name + ' ' + last_name).str.strip()
+
+    has_id = (employee_id.str.lower() != 'nan') & (employee_id != '')
+    is_new = ~employee_id.isin(set(existing_employee_ids)) & ~employee_id.duplicated()
+    has_name = (full_name != '') & (first_name != 'nan') & (last_name != 'nan')
+    valid = has_id & is_new & has_name
+
+    print(f"Skipping {int((~has_id).sum())} rows with missing ID, "
+          f"{int((has_id & ~is_new).sum())} duplicate IDs and "
+          f"{int((has_id & is_new & ~has_name).sum())} incomplete names")
+
+    records = pd.DataFrame({
+        "name": full_name,
+        "employee_id": employee_id,
+        "first_name": first_name,
+        "last_name": last_name,
+        "job_title": df['Job Title'].str.strip(),
+        "department": df['Department Description'].str.strip(),
+        "email": df['Email'].str.strip(),
+        "supervisor": df['Supervisor'].str.strip(),
+        "hire_date": df['Hire Date'].str.strip()
+    })[valid]
+
+    # Job titles and departments, cleaned for the whole column at once
+    records.loc[records["job_title"].str.lower() == 'nan', "job_title"] = "General Worker"
+    records.loc[records["department"].str.lower() == 'nan', "department"] = ""
+    normalized_job_title = (
+        records["job_title"].str.lower().str.strip()
+        .str.replace(r'[^a-z0-9\s]', '', regex=True)
+        .str.replace(r'\s+', '_', regex=True)  # Use underscore for spaces
+        .str.replace(r's$', '', regex=True)     # Remove trailing 's'
+    )
+
+    # Create name variations
+    first_lower = records["first_name"].str.lower()
+    last_lower = records["last_name"].str.lower()
+    variation_columns = [
+        records["name"],
+        records["last_name"] + ', ' + records["first_name"],
+        records["first_name"] + ' ' + records["last_name"],
+        first_lower + ' ' + last_lower,
+        last_lower + ', ' + first_lower
+    ]
+    name_variations = [json.dumps(list(dict.fromkeys(variations))) for variations in zip(*variation_columns)]
+
+    last_updated = str(datetime.now().date())
+    metadata_frame = pd.DataFrame({
+        "name": records["name"],
+        "name_variations": name_variations,
+        "employee_id": records["employee_id"],
+        "first_name": records["first_name"],
+        "last_name": records["last_name"],
+        "original_job_title": records["job_title"],  # Keep original for reference
+        "normalized_job_title": normalized_job_title,  # Add normalized version
+        "department": records["department"],
+        "email": records["email"],
+        "supervisor": records["supervisor"],
+        "hire_date": records["hire_date"],
+        "last_updated": last_updated
+    }, index=records.index)
+
+    # Create employee documents
+    documents = (
+        "Employee Name: " + records["name"]
+        + "\n                    Employee ID: " + records["employee_id"]
+        + "\n                    First Name: " + records["first_name"]
+        + "\n                    Last Name: " + records["last_name"]
+        + "\n                    Job Title: " + records["job_title"]
+        + "\n                    Department: " + records["department"]
+        + "\n                    Email: " + records["email"]
+        + "\n                    Supervisor: " + records["supervisor"]
+        + "\n                    Hire Date: " + records["hire_date"]
+        + "\n                    Last Updated: " + last_updated
+    )
+
+    metadatas = metadata_frame.to_dict("records")
+    for metadata in metadatas:
+        metadata["content_hash"] = content_hash(metadata)
+
+    return (
+        records["employee_id"].tolist(),
+        metadatas,
+        documents.tolist(),
+        len(df) - len(records)
+    )
+
+def upsert_in_batches(storage: StorageBackend, ids: List[str], metadatas: List[Dict[str, Any]],
+                      documents: List[str], batch_size: int = IMPORT_BATCH_SIZE) -> None:
+    """
+    Write employees to storage in chunks of batch_size, embedding them for semantic search.
+
+    Args:
+        storage: Storage backend to write to
+        ids: Employee IDs
+        metadatas: Employee metadata, parallel to ids
+        documents: Employee documents, parallel to ids
+        batch_size: Employees per storage call
+    """
+    embed = True
+    for start in range(0, len(ids), batch_size):
+        end = start + batch_size
+        storage.upsert_employees(ids[start:end], metadatas[start:end], documents[start:end])
+        if embed:
+            # Until the model is loaded (or after it failed) the rest is left
+            # to the precompute runner or `python semantic_search.py reindex`
+            embed = semantic_search.index_employees(ids[start:end], metadatas[start:end])
+        print(f"Imported {min(end, len(ids))}/{len(ids)} employees")
+
+class RosterSync:
+    """
+    Incrementally applies an HR export to the stored roster, chunk by chunk.
+
+    Each normalized record is hashed and compared with the hash stored on
+    the last import. New employees are added; changed ones get their
+    imported fields replaced, keeping everything set outside the import
+    (leave, skills, shift preferences, a manual deactivation). Unchanged
+    ones are not written. When finished, imported employees missing from
+    the export can be deactivated; they are reactivated if they come back.
+    """
+
+    def __init__(self, storage: StorageBackend, deactivate_missing: bool = False):
+        """
+        Load the stored roster's IDs and hashes.
+
+        Args:
+            storage: Storage backend holding the roster
+            deactivate_missing: Deactivate stored employees absent from the export
+        """
+        self.storage = storage
+        self.deactivate_missing = deactivate_missing
+        # Stored employees that came from an HR import, by ID
+        self.stored = {
+            emp_id: metadata for emp_id, metadata in storage.iter_employees()
+            if 'employee_id' in metadata
+        }
+        self.seen: set = set()
+        self.rows = 0
+        self.summary: Dict[str, Any] = {
+            "added": [], "updated": [], "reactivated": [], "deactivated": [], "reclassified": [],
+            "unchanged": 0, "skipped": 0
+        }
+
+    def process(self, df: pd.DataFrame) -> Dict[str, int]:
+        """
+        Apply one chunk of the export.
+
+        Args:
+            df: Chunk from prepare_frame
+
+        Returns:
+            Running counts of rows read and employees per outcome
+        """
+        # IDs from earlier chunks count as duplicates, as within one file
+        ids, metadatas, documents, skipped = transform_employees(df, self.seen)
+        self.rows += len(df)
+        self.summary["skipped"] += skipped
+
+        changed = ([], [], [])
+        unchanged = []
+        for emp_id, metadata, document in zip(ids, metadatas, documents):
+            self.seen.add(emp_id)
+            previous = self.stored.get(emp_id)
+            if previous is None:
+                self.summary["added"].append(emp_id)
+            elif previous.get("removed_from_source"):
+                self.summary["reactivated"].append(emp_id)
+                metadata = {**previous, **metadata, "active": True, "removed_from_source": False}
+            elif previous.get("content_hash") != metadata["content_hash"]:
+                self.summary["updated"].append(emp_id)
+                # Only the imported fields change; leave, skills, preferences
+                # and a manual deactivation are kept
+                metadata = {**previous, **metadata}
+            else:
+                self.summary["unchanged"] += 1
+                unchanged.append((emp_id, previous, dict(previous)))
+                continue
+            for column, value in zip(changed, (emp_id, metadata, document)):
+                column.append(value)
+
+        # Roles come from the title and any skills kept from the stored record;
+        # unchanged employees are only rewritten if their roles changed
+        assign_roles(changed[1] + [metadata for _, _, metadata in unchanged])
+        reclassified_ids, reclassified_metadatas = [], []
+        for emp_id, previous, metadata in unchanged:
+            if (previous.get(ROLES_FIELD) != metadata[ROLES_FIELD]
+                    or previous.get(SUGGESTED_ROLES_FIELD) != metadata[SUGGESTED_ROLES_FIELD]):
+                self.summary["reclassified"].append(emp_id)
+                reclassified_ids.append(emp_id)
+                reclassified_metadatas.append(metadata)
+
+        upsert_in_batches(self.storage, *changed)
+        for start in range(0, len(reclassified_ids), IMPORT_BATCH_SIZE):
+            end = start + IMPORT_BATCH_SIZE
+            self.storage.update_employee_metadata(reclassified_ids[start:end], reclassified_metadatas[start:end])
+        return self.progress()
+
+    def finish(self) -> Dict[str, Any]:
+        """
+        Deactivate employees missing from the export, if enabled.
+
+        Returns:
+            Dictionary with the IDs added, updated, reactivated,
+            deactivated and reclassified (unchanged, but given different
+            roles), and the unchanged and skipped counts
+        """
+        if self.deactivate_missing:
+            removed_ids, removed_metadatas = [], []
+            for emp_id, metadata in self.stored.items():
+                if emp_id in self.seen or metadata.get("removed_from_source"):
+                    continue
+                removed_ids.append(emp_id)
+                removed_metadatas.append({
+                    **metadata,
+                    "active": False,
+                    "removed_from_source": True,
+                    "last_updated": str(datetime.now().date())
+                })
+            for start in range(0, len(removed_ids), IMPORT_BATCH_SIZE):
+                end = start + IMPORT_BATCH_SIZE
+                self.storage.update_employee_metadata(removed_ids[start:end], removed_metadatas[start:end])
+                semantic_search.remove_employees(removed_ids[start:end])
+            self.summary["deactivated"] = removed_ids
+
+        print(f"Sync complete: {len(self.summary['added'])} added, {len(self.summary['updated'])} updated, "
+              f"{len(self.summary['reactivated'])} reactivated, {len(self.summary['deactivated'])} deactivated, "
+              f"{self.summary['unchanged']} unchanged ({len(self.summary['reclassified'])} reclassified), "
+              f"{self.summary['skipped']} skipped")
+        return self.summary
+
+    def progress(self) -> Dict[str, int]:
+        """Running counts of rows read and employees per outcome."""
+        return {
+            "rows": self.rows,
+            **{key: len(value) if isinstance(value, list) else value for key, value in self.summary.items()}
+        }
+
+def sniff_encoding(sample: bytes, complete: bool = True) -> str:
+    """
+    Pick the encoding of a CSV export from its first bytes.
+
+    Args:
+        sample: Start of the file
+        complete: Whether the sample is the whole file; if not, it may end
+            inside a multi-byte character
+
+    Returns:
+        Codec name
+    """
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    for encoding in CSV_ENCODINGS:
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=complete)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return CSV_ENCODINGS[-1]
+
+def sniff_format(sample: bytes) -> str:
+    """
+    Tell an XLSX export from a CSV one by its first bytes.
+
+    Args:
+        sample: Start of the file
+
+    Returns:
+        'xlsx' for a ZIP container, otherwise 'csv'
+    """
+    return 'xlsx' if sample.startswith(b'PK\x03\x04') else 'csv'
+
+def iter_csv_chunks(path: str, chunk_rows: int = IMPORT_BATCH_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Read a CSV export chunk by chunk, sniffing its encoding once.
+
+    Args:
+        path: CSV file path
+        chunk_rows: Rows per chunk
+
+    Yields:
+        Chunks from prepare_frame
+    """
+    with open(path, 'rb') as f:
+        sample = f.read(SNIFF_BYTES)
+        encoding = sniff_encoding(sample, complete=len(sample) < SNIFF_BYTES)
+
+    # Everything is read as text so values do not depend on each chunk's dtypes
+    with open(path, 'r', encoding=encoding, errors='replace', newline='') as f:
+        for chunk in pd.read_csv(f, dtype=str, chunksize=chunk_rows):
+            yield prepare_frame(chunk)
+
+def iter_xlsx_chunks(path: str, chunk_rows: int = IMPORT_BATCH_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Read the first sheet of an XLSX export chunk by chunk without loading it whole.
+
+    Args:
+        path: XLSX file path
+        chunk_rows: Rows per chunk
+
+    Yields:
+        Chunks from prepare_frame
+    """
+    import openpyxl
+
+    # Passed as a file object: openpyxl rejects paths without an Excel extension
+    with open(path, 'rb') as f:
+        workbook = openpyxl.load_workbook(f, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            columns = [str(name) if name is not None else '' for name in header]
+
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) == chunk_rows:
+                    yield prepare_frame(pd.DataFrame(chunk, columns=columns, dtype=object).fillna('nan'))
+                    chunk = []
+            if chunk:
+                yield prepare_frame(pd.DataFrame(chunk, columns=columns, dtype=object).fillna('nan'))
+        finally:
+            workbook.close()
+
+def iter_roster_chunks(path: str, file_format: str, chunk_rows: int = IMPORT_BATCH_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Read an XLSX or CSV export chunk by chunk.
+
+    Args:
+        path: File path
+        file_format: 'xlsx' or 'csv'
+        chunk_rows: Rows per chunk
+
+    Yields:
+        Chunks from prepare_frame
+
+    Raises:
+        ValueError: If the format is not supported
+    """
+    if file_format == 'xlsx':
+        return iter_xlsx_chunks(path, chunk_rows)
+    if file_format == 'csv':
+        return iter_csv_chunks(path, chunk_rows)
+    raise ValueError(f"Unsupported roster format: {file_format!r}, expected 'xlsx' or 'csv'")
@@ -0,0 +1,450 @@
+"""In-memory indexes over the employee roster for fast role and name lookups."""
+
+import json
+import re
+from bisect import bisect_left
+from collections import Counter
+from itertools import chain
+from typing import Dict, List, Any, Set, Callable, Iterable, Optional, Tuple
+from utils import lazy_import
+
+# Only needed once names are matched, so kept out of the app's cold start
+Levenshtein = lazy_import("Levenshtein")
+np = lazy_import("numpy")
+process = lazy_import("rapidfuzz.process")
+LevenshteinDistance = lazy_import("rapidfuzz.distance.Levenshtein")
+
+# Length of the character n-grams used to prune fuzzy name candidates
+NAME_GRAM_SIZE = 2
+
+# Below this many candidate employees, scanning them directly beats the n-gram index
+DIRECT_SCAN_LIMIT = 64
+
+# Names matched per distance-matrix block in bulk reconciliation, bounding
+# memory to about this many rows times the number of distinct variations
+RECONCILE_BLOCK_SIZE = 256
+
+# Fraction of a name's length allowed as edit distance for a match
+MAX_DISTANCE_RATIO = 0.3
+
+# Employee fields returned by the roster APIs, in display order
+EMPLOYEE_FIELDS = ["id", "name", "email", "department", "job_title", "skills", "active", "on_leave"]
+
+# Fields searched by free text, and those that can be sorted or filtered on
+SEARCH_TEXT_FIELDS = ["name", "id", "department", "job_title", "skills"]
+SEARCH_SORT_FIELDS = ["name", "id", "department", "job_title"]
+SEARCH_FILTER_FIELDS = ["department", "job_title"]
+
+# Employee status values accepted by the search status filter
+SEARCH_STATUSES = ["active", "inactive", "on_leave"]
+
+_SEARCH_TOKEN = re.compile(r"[a-z0-9]+")
+
+class SkillIndex:
+    """Inverted index from normalized skill or canonical role to the IDs of available employees."""
+
+    def __init__(self, ids: List[str], metadatas: List[Dict[str, Any]],
+                 is_available: Optional[Callable[[Dict[str, Any]], bool]] = None):
+        """
+        Build the index from the roster.
+
+        Args:
+            ids: Employee IDs in roster order
+            metadatas: Employee metadata, parallel to ids
+            is_available: Predicate deciding whether an employee can be scheduled;
+                omit when the datastore already returned only available employees
+        """
+        # Roster position of each indexed employee, so lookups keep roster order
+        self.positions: Dict[str, int] = {}
+        self.by_skill: Dict[str, Set[str]] = {}
+
+        for position, (emp_id, metadata) in enumerate(zip(ids, metadatas)):
+            if is_available is not None and not is_available(metadata):
+                continue
+            self.positions[emp_id] = position
+            # Listed skills and the canonical roles classified from title and skills
+            for skill in chain(metadata.get("skills", "").split(','), metadata.get("roles", "").split(',')):
+                skill = normalize_skill(skill)
+                if skill:
+                    self.by_skill.setdefault(skill, set()).add(emp_id)
+
+    def lookup(self, variations: Iterable[str]) -> List[str]:
+        """
+        Get available employees having any of the given skills.
+
+        Args:
+            variations: Skill or role name variations to match
+
+        Returns:
+            Matching employee IDs in roster order
+        """
+        matched: Set[str] = set()
+        for variation in variations:
+            matched |= self.by_skill.get(normalize_skill(variation), set())
+        return sorted(matched, key=self.positions.__getitem__)
+
+def normalize_skill(skill: str) -> str:
+    """
+    Normalize a skill or role variation for index keys.
+
+    Args:
+        skill: Skill text
+
+    Returns:
+        Lower-cased skill without surrounding whitespace
+    """
+    return skill.strip().lower()
+
+def name_grams(text: str) -> Set[str]:
+    """
+    Get the distinct character n-grams of a string.
+
+    Args:
+        text: Lower-cased text
+
+    Returns:
+        Set of n-grams
+    """
+    return {text[i:i + NAME_GRAM_SIZE] for i in range(len(text) - NAME_GRAM_SIZE + 1)}
+
+def normalize_name(name: str) -> str:
+    """Form in which names and name variations are compared: trimmed and lower-cased."""
+    return name.strip().lower()
+
+class NameIndex:
+    """Index of lower-cased employee name variations with n-gram candidate pruning."""
+
+    def __init__(self, ids: List[str], metadatas: List[Dict[str, Any]]):
+        """
+        Build the index from the roster.
+
+        Args:
+            ids: Employee IDs in roster order
+            metadatas: Employee metadata, parallel to ids
+        """
+        self.variations: Dict[str, List[str]] = {}
+        self.names: Dict[str, str] = {}
+        self.roster_positions: Dict[str, int] = {}
+        # Distinct variation strings, the employees having each, and
+        # n-gram -> positions in the distinct list
+        self.unique: List[str] = []
+        self.owners: List[List[str]] = []
+        self.positions: Dict[str, int] = {}
+        self.grams: Dict[str, List[int]] = {}
+
+        for emp_id, metadata in zip(ids, metadatas):
+            try:
+                variations = json.loads(metadata.get("name_variations", "[]"))
+            except (TypeError, ValueError) as e:
+                print(f"Error in name matching for {emp_id}: {e}")
+                continue
+
+            # If no variations stored, use the ID
+            lowered = list(dict.fromkeys(normalize_name(v) for v in (variations or [emp_id])))
+            self.variations[emp_id] = lowered
+            self.names[emp_id] = metadata.get("name", emp_id)
+            self.roster_positions[emp_id] = len(self.roster_positions)
+
+            for variation in lowered:
+                position = self.positions.get(variation)
+                if position is None:
+                    position = self.positions[variation] = len(self.unique)
+                    self.unique.append(variation)
+                    self.owners.append([])
+                    for gram in name_grams(variation):
+                        self.grams.setdefault(gram, []).append(position)
+                self.owners[position].append(emp_id)
+
+    def _candidates(self, name_lower: str, max_distance: int,
+                    allowed: Dict[str, int]) -> Iterable[tuple]:
+        """(variation, employee IDs) pairs that may lie within max_distance of the name."""
+        if len(allowed) <= DIRECT_SCAN_LIMIT:
+            return [(v, [emp_id]) for emp_id in allowed for v in self.variations[emp_id]]
+
+        # Each edit destroys at most NAME_GRAM_SIZE of the query's n-grams, so
+        # a variation within max_distance shares at least this many of them
+        query_grams = name_grams(name_lower)
+        min_shared = len(query_grams) - max_distance * NAME_GRAM_SIZE
+        if min_shared <= 0:
+            return zip(self.unique, self.owners)
+
+        shared = Counter(chain.from_iterable(self.grams.get(gram, ()) for gram in query_grams))
+        return [(self.unique[position], self.owners[position])
+                for position, count in shared.items() if count >= min_shared]
+
+    def best_match(self, name: str, employee_list: List[str]) -> Optional[str]:
+        """
+        Find the employee whose name variation is closest to a name.
+
+        Same rules as a linear scan over employee_list: names are compared
+        trimmed and lower-cased (normalize_name), an exact match wins, otherwise the smallest Levenshtein
+        distance, with ties going to the employee listed first. Distances
+        above 30% of the name length are not a match.
+
+        Args:
+            name: Name to search for
+            employee_list: Employee IDs to search within
+
+        Returns:
+            Best matching employee ID or None if no good match found
+        """
+        name_lower = normalize_name(name)
+        # Position of each searchable employee, for first-listed tie-breaking
+        allowed: Dict[str, int] = {}
+        for emp_id in employee_list:
+            if emp_id in self.variations and emp_id not in allowed:
+                allowed[emp_id] = len(allowed)
+
+        exact = self.positions.get(name_lower)
+        if exact is not None:
+            exact_matches = [emp_id for emp_id in self.owners[exact] if emp_id in allowed]
+            if exact_matches:
+                return min(exact_matches, key=allowed.__getitem__)
+
+        max_distance = int(len(name_lower) * MAX_DISTANCE_RATIO)
+        best_match = None
+        best_key = None
+        levenshtein_distance = Levenshtein.distance
+        for variation, owners in self._candidates(name_lower, max_distance, allowed):
+            distance = levenshtein_distance(name_lower, variation, score_cutoff=max_distance)
+            if distance > max_distance:
+                continue
+            for emp_id in owners:
+                if emp_id not in allowed:
+                    continue
+                key = (distance, allowed[emp_id])
+                if best_key is None or key < best_key:
+                    best_key = key
+                    best_match = emp_id
+        return best_match
+
+    def reconcile(self, names: List[str]) -> List[Dict[str, Any]]:
+        """
+        Match a batch of names against the whole roster.
+
+        Distances from every name to every distinct variation are computed
+        in blocks with rapidfuzz's vectorized cdist, on all cores, instead
+        of one best_match call per name. Match rules are those of
+        best_match over the full roster, with ties going to the employee
+        earliest in the roster.
+
+        Args:
+            names: Free-text names, e.g. from a timeclock or sign-in sheet
+
+        Returns:
+            One result per name, in input order, with the matched employee
+            (or None), edit distance, similarity score between 0 and 1, and
+            whether other employees matched equally well
+        """
+        results = []
+        for start in range(0, len(names), RECONCILE_BLOCK_SIZE):
+            block = names[start:start + RECONCILE_BLOCK_SIZE]
+            queries = [normalize_name(name) for name in block]
+            cutoffs = np.array([int(len(query) * MAX_DISTANCE_RATIO) for query in queries])
+
+            if self.unique and queries:
+                # Distances beyond the largest cutoff in the block are capped, which
+                # lets rapidfuzz stop early without changing any match
+                distances = process.cdist(
+                    queries, self.unique, scorer=LevenshteinDistance.distance,
+                    score_cutoff=int(cutoffs.max()), dtype=np.int32, workers=-1
+                )
+                best_distances = distances.min(axis=1)
+            else:
+                distances = None
+                best_distances = np.full(len(block), np.iinfo(np.int32).max)
+
+            for row, name in enumerate(block):
+                best_distance = int(best_distances[row])
+                if best_distance > cutoffs[row]:
+                    results.append({
+                        "name": name,
+                        "employee_id": None,
+                        "employee_name": None,
+                        "distance": None,
+                        "score": 0.0,
+                        "ambiguous": False,
+                        "candidates": []
+                    })
+                    continue
+
+                tied = set()
+                for position in np.flatnonzero(distances[row] == best_distance):
+                    tied.update(self.owners[position])
+                candidates = sorted(tied, key=self.roster_positions.__getitem__)
+                employee_id = candidates[0]
+                results.append({
+                    "name": name,
+                    "employee_id": employee_id,
+                    "employee_name": self.names[employee_id],
+                    "distance": best_distance,
+                    "score": round(1 - best_distance / max(len(queries[row]), 1), 3),
+                    "ambiguous": len(candidates) > 1,
+                    "candidates": candidates
+                })
+        return results
+
+
+def employee_record(emp_id: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the employee record returned by the roster APIs.
+
+    Args:
+        emp_id: Employee ID
+        metadata: Employee metadata
+
+    Returns:
+        Dictionary with the EMPLOYEE_FIELDS
+    """
+    return {
+        "id": emp_id,
+        "name": metadata.get("name", "Unknown"),
+        "email": metadata.get("email", ""),
+        "department": metadata.get("department", ""),
+        "job_title": metadata.get("original_job_title", ""),
+        "skills": metadata.get("skills", ""),
+        "active": metadata.get("active", True),
+        "on_leave": metadata.get("on_leave", False)
+    }
+
+def employee_status(record: Dict[str, Any]) -> str:
+    """
+    Get an employee's status as shown on the dashboard.
+
+    Args:
+        record: Record from employee_record
+
+    Returns:
+        One of SEARCH_STATUSES; leave takes precedence over inactivity
+    """
+    if record["on_leave"]:
+        return "on_leave"
+    return "active" if record["active"] else "inactive"
+
+def search_tokens(text: str) -> List[str]:
+    """
+    Split text into lower-cased alphanumeric search tokens.
+
+    Args:
+        text: Text to split
+
+    Returns:
+        Tokens in order of appearance
+    """
+    return _SEARCH_TOKEN.findall(str(text).lower())
+
+class EmployeeSearchIndex:
+    """Prefix full-text index over the roster with filter, sort and paging support."""
+
+    def __init__(self, ids: List[str], metadatas: List[Dict[str, Any]]):
+        """
+        Build the index from the roster.
+
+        Args:
+            ids: Employee IDs in roster order
+            metadatas: Employee metadata, parallel to ids
+        """
+        # Records by roster position; every other structure refers to positions
+        self.records: List[Dict[str, Any]] = []
+        self.positions: Dict[str, int] = {}
+        postings: Dict[str, Set[int]] = {}
+        # Filter field -> lower-cased value -> positions, including status
+        self.by_value: Dict[str, Dict[str, Set[int]]] = {
+            field: {} for field in SEARCH_FILTER_FIELDS + ["status"]
+        }
+
+        for emp_id, metadata in zip(ids, metadatas):
+            position = len(self.records)
+            record = employee_record(emp_id, metadata)
+            self.records.append(record)
+            self.positions[emp_id] = position
+
+            for field in SEARCH_TEXT_FIELDS:
+                for token in search_tokens(record[field]):
+                    postings.setdefault(token, set()).add(position)
+            for field in SEARCH_FILTER_FIELDS:
+                self.by_value[field].setdefault(str(record[field]).strip().lower(), set()).add(position)
+            self.by_value["status"].setdefault(employee_status(record), set()).add(position)
+
+        # Sorted tokens let a query term match every token it is a prefix of
+        self.tokens: List[str] = sorted(postings)
+        self.postings: List[Set[int]] = [postings[token] for token in self.tokens]
+
+        # Positions in order, and the rank of each position, per sort field,
+        # so unfiltered pages need no sort and filtered ones sort on integers
+        self.orders: Dict[str, List[int]] = {}
+        self.ranks: Dict[str, List[int]] = {}
+        for field in SEARCH_SORT_FIELDS:
+            order = sorted(range(len(self.records)), key=lambda p: (str(self.records[p][field]).lower(), p))
+            ranks = [0] * len(order)
+            for rank, position in enumerate(order):
+                ranks[position] = rank
+            self.orders[field] = order
+            self.ranks[field] = ranks
+
+    def _match_term(self, term: str) -> Set[int]:
+        """Positions of employees with a token starting with term."""
+        matched: Set[int] = set()
+        start = bisect_left(self.tokens, term)
+        for i in range(start, len(self.tokens)):
+            if not self.tokens[i].startswith(term):
+                break
+            matched |= self.postings[i]
+        return matched
+
+    def search(self, query: str = "", filters: Optional[Dict[str, str]] = None,
+               ids: Optional[Iterable[str]] = None, sort: Optional[str] = None,
+               offset: int = 0, limit: int = 50,
+               fields: Optional[List[str]] = None) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Find employees matching a query and filters, and return one page of them.
+
+        Every term of the query must prefix-match a word of the employee's
+        name, ID, department, job title or skills.
+
+        Args:
+            query: Free-text query
+            filters: Field -> value for exact, case-insensitive matches on
+                department, job_title or status
+            ids: Restrict results to these employee IDs
+            sort: Field to sort by, prefixed with '-' for descending order;
+                roster order if omitted
+            offset: Matches to skip
+            limit: Maximum records to return
+            fields: Record fields to return; all EMPLOYEE_FIELDS if omitted
+
+        Returns:
+            Tuple of (total number of matches, records on the requested page)
+        """
+        matched: Optional[Set[int]] = None
+
+        def narrow(positions: Set[int]) -> None:
+            nonlocal matched
+            matched = set(positions) if matched is None else matched & positions
+
+        if ids is not None:
+            narrow({self.positions[emp_id] for emp_id in ids if emp_id in self.positions})
+        for field, value in (filters or {}).items():
+            narrow(self.by_value[field].get(value.strip().lower(), set()))
+        # Rarest terms first keeps the intersections small
+        term_matches = sorted((self._match_term(term) for term in dict.fromkeys(search_tokens(query))), key=len)
+        for positions in term_matches:
+            narrow(positions)
+
+        descending = bool(sort) and sort.startswith("-")
+        field = sort.lstrip("-") if sort else None
+        if matched is None:
+            ordered = self.orders[field] if field else range(len(self.records))
+            if descending:
+                ordered = ordered[::-1]
+        elif field:
+            ordered = sorted(matched, key=self.ranks[field].__getitem__, reverse=descending)
+        else:
+            ordered = sorted(matched)
+
+        page = ordered[offset:offset + limit]
+        if fields is None:
+            return len(ordered), [dict(self.records[position]) for position in page]
+        return len(ordered), [
+            {field: self.records[position][field] for field in fields} for position in page
+        ]
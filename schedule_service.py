@@ -1,30 +1,57 @@
 """Service for warehouse scheduling operations."""
 
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Callable
 from metrics_service import get_metrics_summary, calculate_required_roles
 from database import retrieve_employees, save_scheduled_employees
 from inbound_service import get_incoming_data
-from api_client import get_outbound_orders, get_picked_outbound_orders
+from api_client import get_outbound_orders, get_picked_outbound_orders, track_fetch_errors
 from notification_service import send_schedule_email, send_combined_forecast_email
 from api_client import get_tomorrow_date_range
 from staffing_history import save_daily_staffing
+from utils import report_progress
+from forecast_cache import get_cached_forecast, store_forecast
+from telemetry import SCHEDULER_RUN_LATENCY, timed
 from datetime import datetime
 
-def get_orders_for_scheduling(target_date: Optional[datetime] = None):
+def get_orders_for_scheduling(target_date: Optional[datetime] = None,
+                              progress_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                              use_cache: bool = True):
     """
     Get all orders needed for scheduling.
     
+    Args:
+        target_date: Date to build the forecast for
+        progress_callback: Optional callable notified as data sources complete
+        use_cache: Return a fresh precomputed forecast instead of calling the APIs
+    
     Returns:
         Tuple of (forecast_data, forecast_dates)
     """
+    date_str = target_date.strftime('%Y-%m-%d') if target_date else None
+    
+    if use_cache and date_str:
+        cached_forecast = get_cached_forecast(date_str)
+        if cached_forecast:
+            print(f"DEBUG: Using cached forecast for {date_str}")
+            report_progress(progress_callback, "inbound_computed", {
+                'date': date_str,
+                'incoming_pallets': cached_forecast.get('daily_incoming_pallets', 0)
+            })
+            return cached_forecast, {}
+    
     try:
-        # Get orders from API
-        outbound_orders = get_outbound_orders(target_date)
-        picked_orders = get_picked_outbound_orders(target_date)
-        
-        # Get incoming data using inbound_service
-        incoming_data = get_incoming_data(target_date)
+        # Get orders from API; failed calls return empty lists, so note them
+        with track_fetch_errors() as fetch_errors:
+            outbound_orders = get_outbound_orders(target_date, progress_callback)
+            picked_orders = get_picked_outbound_orders(target_date, progress_callback)
+            
+            # Get incoming data using inbound_service
+            incoming_data = get_incoming_data(target_date)
         total_incoming_pallets = round(incoming_data.get("incoming_pallets", 0))
+        report_progress(progress_callback, "inbound_computed", {
+            'date': date_str,
+            'incoming_pallets': total_incoming_pallets
+        })
         
         # Calculate forecast data
         total_shipping_pallets = sum(order.get('pallet_qty', 0) for order in outbound_orders)
@@ -51,9 +78,16 @@ def get_orders_for_scheduling(target_date: Optional[datetime] = None):
             'staged_pallets': staged_pallets
         }
         
-        print(f"DEBUG: Target date: {target_date.strftime('%Y-%m-%d') if target_date else 'None'}")
+        print(f"DEBUG: Target date: {date_str or 'None'}")
         print(f"DEBUG: Forecast data: shipping={total_shipping_pallets}, incoming={total_incoming_pallets}, cases={cases_to_pick}, staged={staged_pallets}")
         
+        # A forecast built from partial data is used for this run but not
+        # cached, so an API outage isn't served as a quiet day for hours
+        if date_str and not fetch_errors:
+            store_forecast(date_str, forecast_data)
+        elif fetch_errors:
+            print(f"Warning: Not caching forecast for {date_str}, {len(fetch_errors)} API calls failed, first: {fetch_errors[0]}")
+        
         return forecast_data, {}
         
     except Exception as e:
@@ -127,10 +161,15 @@ def assign_employees_to_roles(required_roles: Dict[str, Any]) -> Dict[str, List[
     
     return assigned_employees
 
-def run_scheduler() -> Optional[Dict[str, Any]]:
+@timed(SCHEDULER_RUN_LATENCY)
+def run_scheduler(progress_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Optional[Dict[str, Any]]:
     """
     Run warehouse shift scheduler.
     
+    Args:
+        progress_callback: Optional callable invoked as (stage, data) after
+            each stage of the run completes
+    
     Returns:
         Dictionary containing scheduling data or None if no data
     """
@@ -145,11 +184,21 @@ def run_scheduler() -> Optional[Dict[str, Any]]:
     
     # Get orders for tomorrow using tomorrow's date range
     print(f"DEBUG: Fetching data for TOMORROW: {tomorrow_start.strftime('%Y-%m-%d')}")
-    forecast_data_tomorrow, _ = get_orders_for_scheduling(tomorrow_start)
+    forecast_data_tomorrow, _ = get_orders_for_scheduling(tomorrow_start, progress_callback)
+    report_progress(progress_callback, "forecast_ready", {
+        'day': 'tomorrow',
+        'date': tomorrow_str,
+        'forecast_data': forecast_data_tomorrow
+    })
     
     # Get orders for day after using day after's date range
     print(f"DEBUG: Fetching data for DAY AFTER: {day_after_start.strftime('%Y-%m-%d')}")
-    forecast_data_day_after, _ = get_orders_for_scheduling(day_after_start)
+    forecast_data_day_after, _ = get_orders_for_scheduling(day_after_start, progress_callback)
+    report_progress(progress_callback, "forecast_ready", {
+        'day': 'day_after',
+        'date': day_after_str,
+        'forecast_data': forecast_data_day_after
+    })
     
     if not forecast_data_tomorrow or not forecast_data_day_after:
         return None
@@ -161,6 +210,10 @@ def run_scheduler() -> Optional[Dict[str, Any]]:
     # Save daily staffing data
     save_daily_staffing(tomorrow_str, required_roles_tomorrow)
     save_daily_staffing(day_after_str, required_roles_day_after)
+    report_progress(progress_callback, "roles_computed", {
+        'tomorrow': required_roles_tomorrow,
+        'day_after': required_roles_day_after
+    })
     
     shipping_pallets_tomorrow = forecast_data_tomorrow.get("daily_shipping_pallets", 0)
     total_cases_tomorrow = forecast_data_tomorrow.get("daily_order_qty", 0)
@@ -180,6 +233,10 @@ def run_scheduler() -> Optional[Dict[str, Any]]:
     # Save scheduled employees to database
     save_scheduled_employees(tomorrow_str, tomorrow_day, assigned_employees_tomorrow)
     save_scheduled_employees(day_after_str, day_after_day, assigned_employees_day_after)
+    report_progress(progress_callback, "assignments_saved", {
+        'tomorrow': assigned_employees_tomorrow,
+        'day_after': assigned_employees_day_after
+    })
     
     # Calculate shortages only for tomorrow
     shortages = {}
@@ -260,5 +317,6 @@ def run_scheduler() -> Optional[Dict[str, Any]]:
     send_combined_forecast_email(tomorrow_data, day_after_data, 
                                flattened_tomorrow_staff, flattened_day_after_staff, 
                                shortages)
+    report_progress(progress_callback, "emails_sent", {'shortages': shortages})
     
     return schedule_data
\ No newline at end of file
@@ -0,0 +1,289 @@
+"""Semantic employee search: roster embeddings in a Chroma vector collection."""
+
+import argparse
+import hashlib
+import os
+import threading
+import uuid
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Tuple
+from config import DB_PATH, SEMANTIC_SEARCH_ENABLED, STORAGE_PAGE_SIZE
+from chroma_utils import get_collection
+from utils import FileLock
+
+# Vector-searched collection, separate from the structured employee records
+SEARCH_COLLECTION = "employee_search"
+
+# Query embeddings kept in memory, so repeated searches skip the model
+QUERY_CACHE_SIZE = 256
+
+# State key of a token replaced by every reindex, since it can change results without a roster write
+INDEX_REVISION_KEY = "semantic_index_revision"
+
+_embedding_function = None
+_embedding_lock = threading.Lock()
+# Set once the model has embedded something, i.e. it is downloaded and loaded
+_model_loaded = False
+# Held for a full reindex, so only one process sharing DB_PATH runs it at a time
+_reindex_lock = FileLock(os.path.join(DB_PATH, "semantic_index.lock"))
+
+def get_embedding_function():
+    """
+    Get the sentence embedding model, loading it on first use.
+
+    Returns:
+        Chroma embedding function (all-MiniLM-L6-v2 via ONNX)
+    """
+    global _embedding_function
+    if _embedding_function is None:
+        with _embedding_lock:
+            if _embedding_function is None:
+                from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+                _embedding_function = DefaultEmbeddingFunction()
+    return _embedding_function
+
+def embed(texts: List[str]) -> List[List[float]]:
+    """
+    Embed texts with the sentence model, loading (and on first use downloading) it if needed.
+
+    Args:
+        texts: Texts to embed
+
+    Returns:
+        One embedding per text
+    """
+    global _model_loaded
+    embeddings = get_embedding_function()(texts)
+    _model_loaded = True
+    return embeddings
+
+def model_loaded() -> bool:
+    """Whether the model is loaded, so embedding won't download or load anything."""
+    return _model_loaded
+
+def load_model() -> bool:
+    """
+    Load the embedding model ahead of the code paths that use it.
+
+    Returns:
+        bool: True if the model is loaded (or semantic search is disabled)
+    """
+    if not SEMANTIC_SEARCH_ENABLED or _model_loaded:
+        return True
+    try:
+        embed(["warm up"])
+        return True
+    except Exception as e:
+        print(f"Warning: Could not load the semantic search model: {e}")
+        return False
+
+def index_revision() -> str:
+    """Token of the last reindex, for telling whether search results may have changed."""
+    from storage import get_storage
+
+    return get_storage().get_state(INDEX_REVISION_KEY) or ""
+
+def get_search_collection(path: str = DB_PATH):
+    """
+    Get the employee embedding collection, creating it with cosine distance.
+
+    Args:
+        path: Database directory
+
+    Returns:
+        ChromaDB collection
+    """
+    return get_collection(SEARCH_COLLECTION, path, embedding_function=get_embedding_function(),
+                          metadata={"hnsw:space": "cosine"})
+
+def embedding_text(metadata: Dict[str, Any]) -> str:
+    """
+    Build the text embedded for an employee from the fields worth searching on.
+
+    Names, contact details and dates are left out so they do not dilute the
+    match; name lookups go through the name and full-text indexes instead.
+
+    Args:
+        metadata: Employee metadata
+
+    Returns:
+        Descriptive text
+    """
+    parts = [
+        f"Job title: {metadata.get('original_job_title', '')}",
+        f"Department: {metadata.get('department', '')}"
+    ]
+    if metadata.get("skills"):
+        parts.append(f"Skills: {metadata['skills']}")
+    if metadata.get("supervisor") and metadata.get("supervisor") != "nan":
+        parts.append(f"Supervisor: {metadata['supervisor']}")
+    return ". ".join(part for part in parts if part)
+
+def text_hash(text: str) -> str:
+    """Hash of an embedded text, stored with its vector to skip re-embedding."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def index_employees(ids: List[str], metadatas: List[Dict[str, Any]], path: str = DB_PATH) -> bool:
+    """
+    Embed employees and store their vectors, skipping those whose text is unchanged.
+
+    Nothing is embedded until the model is loaded (by reindex or a search),
+    so imports never download or load it themselves.
+
+    Args:
+        ids: Employee IDs
+        metadatas: Employee metadata, parallel to ids
+        path: Database directory
+
+    Returns:
+        bool: True if the index is up to date, False if the model isn't
+            loaded yet or embedding failed
+    """
+    if not SEMANTIC_SEARCH_ENABLED or not ids:
+        return True
+    if not _model_loaded:
+        return False
+    try:
+        collection = get_search_collection(path)
+        texts = [embedding_text(metadata) for metadata in metadatas]
+        hashes = [text_hash(text) for text in texts]
+
+        stored = collection.get(ids=ids, include=["metadatas"])
+        stored_hashes = {
+            emp_id: (metadata or {}).get("text_hash")
+            for emp_id, metadata in zip(stored.get("ids") or [], stored.get("metadatas") or [])
+        }
+        changed = [i for i, emp_id in enumerate(ids) if stored_hashes.get(emp_id) != hashes[i]]
+        if changed:
+            collection.upsert(
+                ids=[ids[i] for i in changed],
+                documents=[texts[i] for i in changed],
+                metadatas=[{"text_hash": hashes[i]} for i in changed]
+            )
+        return True
+    except Exception as e:
+        print(f"Warning: Could not update semantic search index: {e}")
+        return False
+
+def remove_employees(ids: List[str], path: str = DB_PATH) -> None:
+    """
+    Drop employees from the semantic search index.
+
+    Args:
+        ids: Employee IDs
+        path: Database directory
+    """
+    if not SEMANTIC_SEARCH_ENABLED or not ids:
+        return
+    try:
+        get_search_collection(path).delete(ids=ids)
+    except Exception as e:
+        print(f"Warning: Could not update semantic search index: {e}")
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def embed_query(query: str) -> Tuple[float, ...]:
+    """
+    Embed a search query, caching recent ones.
+
+    Args:
+        query: Normalized query text
+
+    Returns:
+        Query embedding
+    """
+    return tuple(embed([query])[0])
+
+def search(query: str, k: int = 10, path: str = DB_PATH) -> List[Tuple[str, float]]:
+    """
+    Find the employees whose descriptions are closest in meaning to a query.
+
+    Args:
+        query: Free-text description, e.g. "experienced reach truck operator"
+        k: Number of employees to return
+        path: Database directory
+
+    Returns:
+        (employee ID, similarity score) pairs, best first; the score is
+        cosine similarity, 1.0 for identical meaning
+    """
+    query = " ".join(query.lower().split())
+    collection = get_search_collection(path)
+    if not query or collection.count() == 0:
+        return []
+    results = collection.query(
+        query_embeddings=[list(embed_query(query))],
+        n_results=min(k, collection.count()),
+        include=["distances"]
+    )
+    return [
+        (emp_id, round(1.0 - distance, 4))
+        for emp_id, distance in zip(results["ids"][0], results["distances"][0])
+    ]
+
+def reindex(path: str = DB_PATH, batch_size: int = STORAGE_PAGE_SIZE) -> Dict[str, int]:
+    """
+    Bring the semantic search index in line with the stored roster.
+
+    Loads the model first, and holds a lock file in DB_PATH so only one
+    process reindexes at a time. Employees whose embedded text is unchanged
+    are not re-embedded, and inactive employees and those no longer in the
+    roster are removed.
+
+    Args:
+        path: Database directory
+        batch_size: Employees embedded per batch
+
+    Returns:
+        Dictionary with the numbers of employees indexed and removed
+    """
+    if not load_model():
+        print("Semantic search index not updated; run `python semantic_search.py reindex` once the model is available")
+        return {"indexed": 0, "removed": 0}
+
+    with _reindex_lock:
+        return _reindex(path, batch_size)
+
+def _reindex(path: str, batch_size: int) -> Dict[str, int]:
+    """Body of reindex, run with the model loaded and the lock held."""
+    from storage import get_storage
+
+    active_ids = set()
+    batch_ids, batch_metadatas = [], []
+    for emp_id, metadata in get_storage().iter_employees():
+        if metadata.get("active") is False:
+            continue
+        active_ids.add(emp_id)
+        batch_ids.append(emp_id)
+        batch_metadatas.append(metadata)
+        if len(batch_ids) == batch_size:
+            index_employees(batch_ids, batch_metadatas, path)
+            print(f"Indexed {len(active_ids)} employees")
+            batch_ids, batch_metadatas = [], []
+    index_employees(batch_ids, batch_metadatas, path)
+
+    indexed_ids = get_search_collection(path).get(include=[]).get("ids") or []
+    stale = [emp_id for emp_id in indexed_ids if emp_id not in active_ids]
+    for start in range(0, len(stale), batch_size):
+        remove_employees(stale[start:start + batch_size], path)
+
+    get_storage().put_state(INDEX_REVISION_KEY, uuid.uuid4().hex)
+    print(f"Semantic search index: {len(active_ids)} employees, {len(stale)} removed")
+    return {"indexed": len(active_ids), "removed": len(stale)}
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Semantic employee search index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("reindex", help="embed the stored roster, skipping unchanged employees")
+    query_parser = subparsers.add_parser("query", help="search the index from the command line")
+    query_parser.add_argument("text", help="free-text description of the employee")
+    query_parser.add_argument("-k", type=int, default=10, help="number of results")
+    args = parser.parse_args(argv)
+
+    if args.command == "reindex":
+        reindex()
+    else:
+        for emp_id, score in search(args.text, args.k):
+            print(f"{score:.3f}  {emp_id}")
+
+if __name__ == "__main__":
+    main()
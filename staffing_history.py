@@ -1,15 +1,34 @@
 """Module for tracking staffing history and calculating moving averages."""
 
-from datetime import datetime, timedelta
-import chromadb
-from typing import Dict, List, Any
-import json
+import os
+from datetime import datetime, timedelta, time
+from typing import Dict, List, Any, Optional
 from config import DB_PATH
+from telemetry import DATABASE_LATENCY, timed
+from storage import get_storage
+from staffing_matrix import get_staffing_matrix
+from utils import FileLock
 
-# Initialize ChromaDB client for staffing history
-chroma_client = chromadb.PersistentClient(path=DB_PATH)
-staffing_collection = chroma_client.get_or_create_collection(name="staffing_history")
+# Trailing windows, in days, whose per-role sums and counts are updated on every save
+ROLLING_WINDOWS = (7, 28, 90)
 
+# Weight of the newest day in each role's exponentially weighted average
+EWMA_ALPHA = 0.3
+
+# Weighted averages kept for the most recent dates, so re-saving one of them
+# (every scheduler run re-forecasts the next two days) replays only those days
+EWMA_SNAPSHOTS = 7
+
+# Storage state key of the rolling aggregates; aggregates saved with other
+# windows or weights are rebuilt from the history
+AGGREGATES_KEY = "staffing_aggregates"
+AGGREGATES_VERSION = f"{ROLLING_WINDOWS}:{EWMA_ALPHA}"
+
+# Serializes saves and the read-modify-write of the aggregates across threads
+# and every worker process sharing the database
+_aggregates_lock = FileLock(os.path.join(DB_PATH, "staffing_history.lock"))
+
+@timed(DATABASE_LATENCY, module="staffing_history", operation="save_daily_staffing")
 def save_daily_staffing(date: str, required_roles: Dict[str, Any]) -> bool:
     """
     Save daily staffing requirements to the database.
@@ -29,20 +48,15 @@ def save_daily_staffing(date: str, required_roles: Dict[str, Any]) -> bool:
                 role_key = f"{operation}_{role}"
                 flattened_roles[role_key] = count
         
-        # Create metadata and document
-        metadata = {
-            "date": date,
-            "roles": json.dumps(flattened_roles)  # Convert dictionary to JSON string
-        }
-        
         document = f"Staffing requirements for {date}: {flattened_roles}"
         
-        # Save to ChromaDB
-        staffing_collection.upsert(
-            ids=[date],
-            metadatas=[metadata],
-            documents=[document]
-        )
+        # Save to the database, updating the rolling aggregates by the change
+        storage = get_storage()
+        with _aggregates_lock:
+            previous = storage.get_staffing_range(date, date)
+            storage.upsert_staffing(date, flattened_roles, document)
+            update_staffing_aggregates(date, previous[0]["roles"] if previous else None, flattened_roles)
+            update_staffing_matrix(date, flattened_roles)
         
         return True
         
@@ -50,6 +64,233 @@ def save_daily_staffing(date: str, required_roles: Dict[str, Any]) -> bool:
         print(f"Error saving daily staffing: {str(e)}")
         return False
 
+def _shift_date(date: str, days: int) -> str:
+    """Date string the given number of days after (or before) date."""
+    return (datetime.strptime(date, "%Y-%m-%d") + timedelta(days=days)).strftime("%Y-%m-%d")
+
+def _add_day(window: Dict[str, Dict[str, Any]], roles: Dict[str, Any], sign: int) -> None:
+    """Add a day's role counts to a window's sums and counts, or remove them with sign -1."""
+    sums, counts = window["sums"], window["counts"]
+    for role, count in roles.items():
+        sums[role] = sums.get(role, 0) + sign * count
+        counts[role] = counts.get(role, 0) + sign
+        if counts[role] == 0:
+            del sums[role], counts[role]
+
+def _blend(previous: Dict[str, float], roles: Dict[str, Any]) -> Dict[str, float]:
+    """Weighted averages after one more day; roles not staffed that day keep theirs."""
+    blended = dict(previous)
+    for role, count in roles.items():
+        blended[role] = EWMA_ALPHA * count + (1 - EWMA_ALPHA) * previous[role] if role in previous else float(count)
+    return blended
+
+def build_staffing_aggregates(history: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Compute the rolling aggregates from scratch.
+    
+    Args:
+        history: Staffing records ({"date", "roles"}), oldest first
+        
+    Returns:
+        Aggregate state: the latest date, per-window role sums and counts,
+        and the weighted averages of the most recent dates
+    """
+    state = {
+        "version": AGGREGATES_VERSION,
+        "end": history[-1]["date"] if history else None,
+        "windows": {str(window): {"sums": {}, "counts": {}} for window in ROLLING_WINDOWS},
+        "ewma": []
+    }
+    ewma: Dict[str, float] = {}
+    for record in history:
+        for window in ROLLING_WINDOWS:
+            if record["date"] > _shift_date(state["end"], -window):
+                _add_day(state["windows"][str(window)], record["roles"], 1)
+        ewma = _blend(ewma, record["roles"])
+        state["ewma"].append([record["date"], ewma])
+    state["ewma"] = state["ewma"][-EWMA_SNAPSHOTS:]
+    return state
+
+def rebuild_staffing_aggregates() -> Dict[str, Any]:
+    """
+    Recompute the rolling aggregates from the whole history and save them.
+    
+    Only needed when no aggregates are saved yet, after history was written
+    directly to storage, or when the windows change. Holds the aggregates
+    lock, so no save lands between reading the history and saving the result.
+    
+    Returns:
+        Aggregate state
+    """
+    storage = get_storage()
+    with _aggregates_lock:
+        state = build_staffing_aggregates(storage.get_staffing_range("1900-01-01", "9999-12-31"))
+        storage.put_state(AGGREGATES_KEY, state)
+    return state
+
+def update_staffing_aggregates(date: str, previous: Optional[Dict[str, Any]], roles: Dict[str, Any]) -> None:
+    """
+    Apply one saved day to the rolling aggregates.
+    
+    A new latest date moves every window forward, subtracting the days that
+    fall out of it. Re-saving a date inside a window replaces its counts in
+    that window, and the weighted averages are replayed from the snapshot
+    before it. The cost depends on the number of roles, not on the history.
+    
+    Args:
+        date: Date just saved, in YYYY-MM-DD format
+        previous: Role counts saved for the date before, or None
+        roles: Role counts just saved
+    """
+    storage = get_storage()
+    try:
+        state = storage.get_state(AGGREGATES_KEY)
+        if not state or state.get("version") != AGGREGATES_VERSION:
+            rebuild_staffing_aggregates()
+            return
+        
+        end = state["end"]
+        windows = {window: state["windows"][str(window)] for window in ROLLING_WINDOWS}
+        snapshots = state["ewma"]
+        
+        if end is None or date > end:
+            if end is not None:
+                # Days leaving any window, read with one range query
+                leaving = storage.get_staffing_range(
+                    _shift_date(end, 1 - max(ROLLING_WINDOWS)), _shift_date(date, -min(ROLLING_WINDOWS))
+                )
+                for window, aggregate in windows.items():
+                    first, last = _shift_date(end, 1 - window), _shift_date(date, -window)
+                    for record in leaving:
+                        if first <= record["date"] <= last:
+                            _add_day(aggregate, record["roles"], -1)
+            for aggregate in windows.values():
+                _add_day(aggregate, roles, 1)
+            snapshots.append([date, _blend(snapshots[-1][1] if snapshots else {}, roles)])
+            state["end"] = date
+        else:
+            for window, aggregate in windows.items():
+                if date > _shift_date(end, -window):
+                    if previous:
+                        _add_day(aggregate, previous, -1)
+                    _add_day(aggregate, roles, 1)
+            
+            position = next(i for i, (snapshot_date, _) in enumerate(snapshots) if snapshot_date >= date)
+            if position == 0:
+                # Older than the kept snapshots; the averages can't be replayed
+                rebuild_staffing_aggregates()
+                return
+            ewma = snapshots[position - 1][1]
+            snapshots = snapshots[:position]
+            for record in storage.get_staffing_range(date, end):
+                ewma = _blend(ewma, record["roles"])
+                snapshots.append([record["date"], ewma])
+        
+        state["ewma"] = snapshots[-EWMA_SNAPSHOTS:]
+        storage.put_state(AGGREGATES_KEY, state)
+        
+    except Exception as e:
+        print(f"Warning: Could not update staffing aggregates, they will be rebuilt: {e}")
+        try:
+            storage.put_state(AGGREGATES_KEY, None)
+        except Exception:
+            pass
+
+def update_staffing_matrix(date: str, roles: Dict[str, Any]) -> None:
+    """
+    Write a saved day to the columnar staffing matrix.
+    
+    Args:
+        date: Date just saved, in YYYY-MM-DD format
+        roles: Role counts just saved
+    """
+    try:
+        get_staffing_matrix().write_day(date, roles)
+    except Exception as e:
+        print(f"Warning: Could not update staffing matrix, run 'python staffing_matrix.py rebuild': {e}")
+
+@timed(DATABASE_LATENCY, module="staffing_history", operation="get_staffing_aggregates")
+def get_staffing_aggregates() -> Dict[str, Any]:
+    """
+    Get the rolling staffing aggregates, without reading the history.
+    
+    Windows end at the latest saved date, which is usually a forecast day
+    ahead of today.
+    
+    Returns:
+        Dictionary with the latest date ("as_of"), each window's per-role
+        total, number of days and average, and each role's weighted average
+    """
+    try:
+        state = get_storage().get_state(AGGREGATES_KEY)
+        if not state or state.get("version") != AGGREGATES_VERSION:
+            with _aggregates_lock:
+                # Another worker may have rebuilt them while this one waited
+                state = get_storage().get_state(AGGREGATES_KEY)
+                if not state or state.get("version") != AGGREGATES_VERSION:
+                    state = rebuild_staffing_aggregates()
+        
+        windows = {}
+        for window in ROLLING_WINDOWS:
+            aggregate = state["windows"][str(window)]
+            windows[str(window)] = {
+                role: {"total": total, "days": aggregate["counts"][role],
+                       "average": round(total / aggregate["counts"][role], 1)}
+                for role, total in aggregate["sums"].items()
+            }
+        ewma = state["ewma"][-1][1] if state["ewma"] else {}
+        return {
+            "as_of": state["end"],
+            "windows": windows,
+            "ewma": {role: round(value, 1) for role, value in ewma.items()},
+            "ewma_alpha": EWMA_ALPHA
+        }
+        
+    except Exception as e:
+        print(f"Error getting staffing aggregates: {str(e)}")
+        return {"as_of": None, "windows": {}, "ewma": {}, "ewma_alpha": EWMA_ALPHA}
+
+def role_matches(role_key: str, roles: List[str]) -> bool:
+    """
+    Check a flattened staffing role key against requested roles.
+    
+    Args:
+        role_key: Stored key, "<operation>_<role>"
+        roles: Full keys or bare role names, e.g. "inbound_lumper" or "lumper"
+        
+    Returns:
+        bool: True if the key is one of the roles or belongs to one of them
+    """
+    return any(role_key == role or role_key.endswith(f"_{role}") for role in roles)
+
+@timed(DATABASE_LATENCY, module="staffing_history", operation="get_staffing_between")
+def get_staffing_between(start_date: str, end_date: str, roles: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Get the staffing history between two dates with one range query.
+    
+    Args:
+        start_date: First date in YYYY-MM-DD format
+        end_date: Last date in YYYY-MM-DD format, inclusive
+        roles: Only include these roles (full keys or bare role names)
+        
+    Returns:
+        List of staffing data dictionaries, oldest first
+    """
+    try:
+        history = get_storage().get_staffing_range(start_date, end_date)
+        if roles:
+            history = [
+                {"date": record["date"],
+                 "roles": {key: count for key, count in record["roles"].items() if role_matches(key, roles)}}
+                for record in history
+            ]
+        return history
+        
+    except Exception as e:
+        print(f"Error getting staffing history: {str(e)}")
+        return []
+
+@timed(DATABASE_LATENCY, module="staffing_history", operation="get_staffing_history")
 def get_staffing_history(days: int = 7) -> List[Dict[str, Any]]:
     """
     Get staffing history for the specified number of days.
@@ -65,33 +306,27 @@ def get_staffing_history(days: int = 7) -> List[Dict[str, Any]]:
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days-1)
         
-        # Get all records
-        all_records = staffing_collection.get()
-        if not all_records or not all_records["metadatas"]:
-            return []
-        
-        # Filter records within date range
-        filtered_records = []
-        for i, metadata in enumerate(all_records["metadatas"]):
-            record_date = datetime.strptime(metadata["date"], "%Y-%m-%d")
-            if start_date <= record_date <= end_date:
-                # Parse the JSON string back to dictionary
-                roles = json.loads(metadata["roles"])
-                filtered_records.append({
-                    "date": metadata["date"],
-                    "roles": roles
-                })
-        
-        return sorted(filtered_records, key=lambda x: x["date"])
+        # Records are dated at midnight, so the first included date is the
+        # first midnight at or after start_date
+        first_date = start_date.date()
+        if start_date.time() != time.min:
+            first_date += timedelta(days=1)
+        
+        return get_staffing_between(first_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d"))
         
     except Exception as e:
         print(f"Error getting staffing history: {str(e)}")
         return []
 
+@timed(DATABASE_LATENCY, module="staffing_history", operation="calculate_moving_averages")
 def calculate_moving_averages(days: int = 7) -> Dict[str, float]:
     """
     Calculate moving averages for each role over the specified period.
     
+    Like the maintained aggregates, every period ends at the latest saved
+    date. Periods in ROLLING_WINDOWS are read from the aggregates; others
+    are computed from the history.
+    
     Args:
         days: Number of days to include in the moving average
         
@@ -99,7 +334,15 @@ def calculate_moving_averages(days: int = 7) -> Dict[str, float]:
         Dictionary of role moving averages
     """
     try:
-        history = get_staffing_history(days)
+        aggregates = get_staffing_aggregates()
+        if days in ROLLING_WINDOWS:
+            window = aggregates["windows"].get(str(days), {})
+            return {role: aggregate["average"] for role, aggregate in window.items()}
+        
+        end = aggregates["as_of"]
+        if not end:
+            return {}
+        history = get_staffing_between(_shift_date(end, 1 - days), end)
         if not history:
             return {}
         
@@ -0,0 +1,365 @@
+"""Columnar staffing history: a memory-mapped date x role matrix for long-range analytics."""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Tuple
+from config import STAFFING_MATRIX_PATH
+from utils import FileLock, lazy_import
+
+np = lazy_import("numpy")
+
+# Sidecar describing the matrix: base date, days used, role columns and data file
+META_FILE = "matrix.json"
+
+# Held by whichever process is changing the matrix files
+LOCK_FILE = "matrix.lock"
+
+# Rows and role columns allocated for a new matrix; both double when full
+INITIAL_DAYS = 732
+INITIAL_ROLES = 32
+
+# Days between compared periods in year-over-year comparisons; 52 weeks, so
+# each day is compared with the same weekday a year earlier
+YEAR_OVER_YEAR_DAYS = 364
+
+def _parse_date(date: str):
+    return datetime.strptime(date, "%Y-%m-%d").date()
+
+class StaffingMatrix:
+    """
+    Staffing history as a float32 matrix with one row per day and one column per role.
+
+    Row i holds the date base_date + i days; days without saved staffing and
+    roles a day did not require are NaN. The matrix lives in a .npy file
+    opened as a memory map, so reading a date range is a slice of the mapped
+    file with no copying or JSON decoding. It is derived from the staffing
+    history in storage and can be rebuilt from it at any time.
+
+    Writes hold a file lock in the matrix directory and start from the
+    sidecar on disk, so worker processes never give two roles the same
+    column or allocate the same data file.
+    """
+
+    def __init__(self, path: str = STAFFING_MATRIX_PATH):
+        """
+        Set up the matrix; files are opened on first use.
+
+        Args:
+            path: Directory holding the matrix files
+        """
+        self.path = path
+        self.meta: Optional[Dict[str, Any]] = None
+        self.values = None
+        self._meta_mtime = None
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(os.path.join(path, LOCK_FILE))
+
+    @property
+    def meta_path(self) -> str:
+        return os.path.join(self.path, META_FILE)
+
+    def _refresh(self, force: bool = False) -> bool:
+        """
+        Open the matrix, or reopen it if another process changed it.
+
+        Args:
+            force: Reread the sidecar even if its modification time is unchanged
+
+        Returns:
+            bool: False if there is no matrix yet
+        """
+        try:
+            mtime = os.stat(self.meta_path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime is not None and mtime == self._meta_mtime and not force:
+            return True
+        # Under the file lock, so no writer replaces the data file between
+        # reading the sidecar and opening the file it names
+        with self._file_lock:
+            try:
+                with open(self.meta_path, encoding="utf-8") as f:
+                    self.meta = json.load(f)
+                    self._meta_mtime = os.fstat(f.fileno()).st_mtime_ns
+            except FileNotFoundError:
+                self.meta, self.values, self._meta_mtime = None, None, None
+                return False
+            self.values = np.load(os.path.join(self.path, self.meta["file"]), mmap_mode="r+")
+        return True
+
+    def _save_meta(self) -> None:
+        """Write the sidecar atomically, so readers never see a partial one."""
+        temp_path = self.meta_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f)
+        os.replace(temp_path, self.meta_path)
+        self._meta_mtime = os.stat(self.meta_path).st_mtime_ns
+
+    def _next_generation(self) -> int:
+        """Generation above every data file on disk, so a new file never reuses a name another process may map."""
+        generations = [self.meta["generation"]] if self.meta else []
+        for existing in glob.glob(os.path.join(self.path, "values-*.npy")):
+            try:
+                generations.append(int(os.path.basename(existing)[len("values-"):-len(".npy")]))
+            except ValueError:
+                continue
+        return max(generations, default=0) + 1
+
+    def _allocate(self, days: int, roles: int, generation: int):
+        """Create a NaN-filled data file; a new file per generation, since a mapped file can't be replaced on Windows."""
+        filename = f"values-{generation}.npy"
+        values = np.lib.format.open_memmap(
+            os.path.join(self.path, filename), mode="w+", dtype=np.float32, shape=(days, roles)
+        )
+        values[:] = np.nan
+        return filename, values
+
+    def _grow(self, days: int, roles: int) -> None:
+        """Make room for at least the given rows and role columns, doubling the allocation."""
+        capacity_days, capacity_roles = self.values.shape
+        if days <= capacity_days and roles <= capacity_roles:
+            return
+        while capacity_days < days:
+            capacity_days *= 2
+        while capacity_roles < roles:
+            capacity_roles *= 2
+
+        old_file = self.meta["file"]
+        generation = self._next_generation()
+        filename, values = self._allocate(capacity_days, capacity_roles, generation)
+        used_days, used_roles = self.meta["days"], len(self.meta["roles"])
+        values[:used_days, :used_roles] = self.values[:used_days, :used_roles]
+        values.flush()
+
+        self.values = values
+        self.meta.update(file=filename, generation=generation)
+        self._save_meta()
+        try:
+            os.remove(os.path.join(self.path, old_file))
+        except OSError:
+            # Still mapped by another process; removed by the next rebuild
+            pass
+
+    def rebuild(self, history: List[Dict[str, Any]]) -> None:
+        """
+        Recreate the matrix from the staffing history.
+
+        Args:
+            history: Staffing records ({"date", "roles"}), oldest first
+        """
+        with self._lock, self._file_lock:
+            os.makedirs(self.path, exist_ok=True)
+            roles = list(dict.fromkeys(role for record in history for role in record["roles"]))
+            base_date = history[0]["date"] if history else datetime.now().strftime("%Y-%m-%d")
+            days = (_parse_date(history[-1]["date"]) - _parse_date(base_date)).days + 1 if history else 0
+
+            generation = self._next_generation()
+            capacity_days = max(INITIAL_DAYS, days * 2)
+            capacity_roles = max(INITIAL_ROLES, len(roles) * 2)
+            filename, values = self._allocate(capacity_days, capacity_roles, generation)
+            columns = {role: column for column, role in enumerate(roles)}
+            base = _parse_date(base_date)
+            for record in history:
+                row = (_parse_date(record["date"]) - base).days
+                for role, count in record["roles"].items():
+                    values[row, columns[role]] = count
+            values.flush()
+
+            self.values = values
+            self.meta = {"base_date": base_date, "days": days, "roles": roles,
+                         "file": filename, "generation": generation}
+            self._save_meta()
+            for stale in glob.glob(os.path.join(self.path, "values-*.npy")):
+                if os.path.basename(stale) != filename:
+                    try:
+                        os.remove(stale)
+                    except OSError:
+                        pass
+            print(f"Built staffing matrix: {days} days x {len(roles)} roles")
+
+    def rebuild_from_storage(self) -> None:
+        """Recreate the matrix from the staffing history in storage."""
+        from storage import get_storage
+
+        # Locked before reading, so no day saved meanwhile is left out
+        with self._lock, self._file_lock:
+            self.rebuild(get_storage().get_staffing_range("1900-01-01", "9999-12-31"))
+
+    def ensure(self, force: bool = False) -> None:
+        """
+        Build the matrix from storage if it doesn't exist yet.
+
+        Args:
+            force: Reread the sidecar even if its modification time is unchanged
+        """
+        with self._lock:
+            if self._refresh(force):
+                return
+            with self._file_lock:
+                # Another process may have built it while this one waited
+                if not self._refresh(force=True):
+                    self.rebuild_from_storage()
+
+    def write_day(self, date: str, roles: Dict[str, Any]) -> None:
+        """
+        Replace a day's row with its saved role counts.
+
+        Appending a day touches one row; a day before the first one rebuilds
+        the matrix, since rows are counted from the base date.
+
+        Args:
+            date: Date in YYYY-MM-DD format, already saved to storage
+            roles: Role counts saved for the date
+        """
+        with self._lock, self._file_lock:
+            # Columns and data file as last written by any process
+            self.ensure(force=True)
+            row = (_parse_date(date) - _parse_date(self.meta["base_date"])).days
+            if row < 0:
+                self.rebuild_from_storage()
+                return
+
+            new_roles = [role for role in roles if role not in self.meta["roles"]]
+            self._grow(row + 1, len(self.meta["roles"]) + len(new_roles))
+            columns = {role: column for column, role in enumerate(self.meta["roles"] + new_roles)}
+            self.values[row, :] = np.nan
+            for role, count in roles.items():
+                self.values[row, columns[role]] = count
+            self.values.flush()
+
+            if new_roles or row >= self.meta["days"]:
+                self.meta["roles"] = self.meta["roles"] + new_roles
+                self.meta["days"] = max(self.meta["days"], row + 1)
+                self._save_meta()
+
+    def window(self, start_date: str, end_date: str) -> Tuple[str, List[str], Any]:
+        """
+        Get the staffing of a date range as a view of the mapped matrix.
+
+        Args:
+            start_date: First date in YYYY-MM-DD format
+            end_date: Last date in YYYY-MM-DD format, inclusive
+
+        Returns:
+            (first date, role names, values): values has one row per day
+            from the first date and one column per role, NaN where nothing
+            was saved. It is a view, not a copy, and only valid until the
+            next write.
+        """
+        with self._lock:
+            self.ensure()
+            base = _parse_date(self.meta["base_date"])
+            first = max((_parse_date(start_date) - base).days, 0)
+            last = min((_parse_date(end_date) - base).days + 1, self.meta["days"])
+            roles = list(self.meta["roles"])
+            values = self.values[first:max(last, first), :len(roles)]
+            return (base + timedelta(days=first)).strftime("%Y-%m-%d"), roles, values
+
+    def latest_date(self) -> Optional[str]:
+        """Last date in the matrix, or None if it is empty."""
+        with self._lock:
+            self.ensure()
+            if not self.meta["days"]:
+                return None
+            base = _parse_date(self.meta["base_date"])
+            return (base + timedelta(days=self.meta["days"] - 1)).strftime("%Y-%m-%d")
+
+_matrix: Optional[StaffingMatrix] = None
+_matrix_lock = threading.Lock()
+
+def get_staffing_matrix() -> StaffingMatrix:
+    """
+    Get the shared staffing matrix, creating it on first use.
+
+    Returns:
+        StaffingMatrix at STAFFING_MATRIX_PATH
+    """
+    global _matrix
+    if _matrix is None:
+        with _matrix_lock:
+            if _matrix is None:
+                _matrix = StaffingMatrix()
+    return _matrix
+
+def _column_means(values) -> Tuple[Any, Any]:
+    """Per-role means over the days that required the role, and the number of those days."""
+    days = (~np.isnan(values)).sum(axis=0)
+    totals = np.nansum(values, axis=0)
+    return np.divide(totals, days, out=np.full(totals.shape, np.nan), where=days > 0), days
+
+def year_over_year(end_date: Optional[str] = None, days: int = 28) -> Dict[str, Any]:
+    """
+    Compare each role's average staffing with the same period a year earlier.
+
+    The earlier period is 52 weeks back, so weekdays line up.
+
+    Args:
+        end_date: Last date of the current period; the latest saved date if omitted
+        days: Length of both periods in days
+
+    Returns:
+        Dictionary with both periods' dates and, per role, the current and
+        previous averages and the percentage change (None where a period
+        has no data for the role)
+    """
+    matrix = get_staffing_matrix()
+    end_date = end_date or matrix.latest_date()
+    if end_date is None:
+        return {"current": None, "previous": None, "roles": {}}
+
+    end = _parse_date(end_date)
+    periods = {}
+    for name, offset in (("current", 0), ("previous", YEAR_OVER_YEAR_DAYS)):
+        period_end = end - timedelta(days=offset)
+        period_start = period_end - timedelta(days=days - 1)
+        periods[name] = (period_start.strftime("%Y-%m-%d"), period_end.strftime("%Y-%m-%d"))
+
+    _, roles, current_values = matrix.window(*periods["current"])
+    _, _, previous_values = matrix.window(*periods["previous"])
+    current, current_days = _column_means(current_values)
+    previous, previous_days = _column_means(previous_values[:, :len(roles)])
+    change = np.divide(current - previous, previous, out=np.full(current.shape, np.nan),
+                       where=(previous_days > 0) & (previous != 0)) * 100
+
+    def value(array, column, digits=1):
+        return None if np.isnan(array[column]) else round(float(array[column]), digits)
+
+    return {
+        "current": {"start_date": periods["current"][0], "end_date": periods["current"][1]},
+        "previous": {"start_date": periods["previous"][0], "end_date": periods["previous"][1]},
+        "roles": {
+            role: {
+                "current": value(current, column),
+                "previous": value(previous, column),
+                "current_days": int(current_days[column]),
+                "previous_days": int(previous_days[column]),
+                "change_pct": value(change, column)
+            }
+            for column, role in enumerate(roles)
+        }
+    }
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Columnar staffing history")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("rebuild", help="rebuild the matrix from the staffing history in storage")
+    yoy_parser = subparsers.add_parser("yoy", help="compare recent staffing with a year earlier")
+    yoy_parser.add_argument("--end", help="last date of the current period (YYYY-MM-DD)")
+    yoy_parser.add_argument("--days", type=int, default=28, help="length of the compared periods")
+    args = parser.parse_args(argv)
+
+    if args.command == "rebuild":
+        get_staffing_matrix().rebuild_from_storage()
+    else:
+        comparison = year_over_year(args.end, args.days)
+        for role, stats in comparison["roles"].items():
+            print(f"{role:<40} {stats['previous']!s:>8} -> {stats['current']!s:>8}  ({stats['change_pct']!s}%)")
+
+if __name__ == "__main__":
+    main()
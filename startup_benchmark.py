@@ -0,0 +1,92 @@
+"""Cold-start benchmark: time to import the app and serve its first database-backed request."""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+# Runs in a fresh interpreter so nothing is already imported or opened
+COLD_START_SCRIPT = """
+import asyncio, json, time
+start = time.perf_counter()
+import index
+imported = time.perf_counter()
+import main
+from starlette.requests import Request
+asyncio.run(main.get_all_employees(Request({"type": "http", "headers": []})))
+served = time.perf_counter()
+print(json.dumps({"import_s": imported - start, "first_request_s": served - imported}))
+"""
+
+def measure_cold_start() -> dict:
+    """
+    Start a fresh interpreter and time the app's cold start.
+
+    Returns:
+        Dictionary with import, first request and total process times in seconds
+    """
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", COLD_START_SCRIPT],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True
+    )
+    total = time.perf_counter() - started
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings["process_s"] = total
+    return timings
+
+def import_time_report(module: str = "index") -> List[Tuple[str, int]]:
+    """
+    Cold-import a module with `python -X importtime` and total the cost per top-level package.
+
+    Args:
+        module: Module to import
+
+    Returns:
+        (package, microseconds) tuples, most expensive first
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True
+    )
+
+    package_us: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        # Self time excludes nested imports, so summing it never double counts
+        self_time, _, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        package_us[package] = package_us.get(package, 0) + int(self_time)
+
+    return sorted(package_us.items(), key=lambda item: item[1], reverse=True)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5, help="number of cold starts to measure")
+    parser.add_argument("--imports", type=int, default=15, metavar="N",
+                        help="show the N most expensive packages imported by index (0 to skip)")
+    args = parser.parse_args()
+
+    if args.imports:
+        report = import_time_report()
+        print(f"Import time of index by package, total {sum(us for _, us in report) / 1000:.1f} ms:")
+        for package, us in report[:args.imports]:
+            print(f"  {package:<22} {us / 1000:8.1f} ms")
+        print()
+
+    runs = [measure_cold_start() for _ in range(args.runs)]
+    print(f"Cold start over {args.runs} runs (median / max):")
+    for key, label in (("import_s", "import index"), ("first_request_s", "first /api/employees"),
+                       ("process_s", "whole process")):
+        values = [run[key] for run in runs]
+        print(f"  {label:<22} {statistics.median(values) * 1000:8.1f} ms {max(values) * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+    main()
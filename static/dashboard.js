@@ -2,9 +2,19 @@
 class WarehouseDashboard {
     constructor() {
         this.apiBase = window.location.origin;
+        // Current page of the server-side employee search
         this.employees = [];
-        this.filteredEmployees = [];
+        this.employeeTotal = 0;
+        this.employeeQuery = '';
+        this.employeePage = 1;
+        this.employeePageSize = 50;
+        this.employeeRequestId = 0;
+        this.searchDebounce = 250;
+        this.searchTimer = null;
+        // Names of employees seen so far, by ID, for schedule assignments
+        this.employeeNames = {};
         this.scheduleData = null;
+        this.jobPollInterval = 1000;
         this.init();
     }
 
@@ -31,6 +41,20 @@ class WarehouseDashboard {
             this.filterEmployees(e.target.value);
         });
 
+        // Employee paging
+        document.getElementById('employeesPrev').addEventListener('click', () => {
+            if (this.employeePage > 1) {
+                this.employeePage -= 1;
+                this.loadEmployees();
+            }
+        });
+        document.getElementById('employeesNext').addEventListener('click', () => {
+            if (this.employeePage * this.employeePageSize < this.employeeTotal) {
+                this.employeePage += 1;
+                this.loadEmployees();
+            }
+        });
+
         // Keyboard shortcuts
         document.addEventListener('keydown', (e) => {
             if (e.ctrlKey && e.key === 'r') {
@@ -107,17 +131,14 @@ class WarehouseDashboard {
 
     async loadScheduleData() {
         try {
-            const response = await fetch(`${this.apiBase}/api/schedule`);
-            if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
-            }
-            
-            const data = await response.json();
-            if (data.success && data.data) {
-                this.scheduleData = data.data;
+            // Run the scheduler as a background job so long runs don't hit request
+            // timeouts, and stream its progress when the browser supports it
+            const job = window.EventSource ? await this.streamScheduleJob() : await this.runScheduleJob();
+            if (job.status === 'completed' && job.result) {
+                this.scheduleData = job.result;
                 this.displayScheduleData();
             } else {
-                throw new Error('Invalid schedule data received');
+                throw new Error(job.error || 'Invalid schedule data received');
             }
         } catch (error) {
             console.error('Error loading schedule data:', error);
@@ -125,17 +146,119 @@ class WarehouseDashboard {
         }
     }
 
+    async runScheduleJob() {
+        const response = await fetch(`${this.apiBase}/api/schedule/jobs`, { method: 'POST' });
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        
+        const data = await response.json();
+        if (!data.success || !data.data) {
+            throw new Error('Invalid schedule job received');
+        }
+        // Servers that run jobs inline return the finished job straight away
+        if (data.data.status === 'completed' || data.data.status === 'failed') {
+            return data.data;
+        }
+        return this.pollScheduleJob(data.data.job_id);
+    }
+
+    streamScheduleJob() {
+        return new Promise((resolve, reject) => {
+            const source = new EventSource(`${this.apiBase}/api/schedule/stream`);
+            let jobId = null;
+            
+            const onProgress = (event) => {
+                const message = JSON.parse(event.data);
+                this.updateScheduleProgress({ stage: event.type, progress: message.progress });
+                return message.data;
+            };
+            
+            source.addEventListener('job', (event) => {
+                jobId = JSON.parse(event.data).job_id;
+            });
+            ['customer_fetched', 'inbound_computed', 'roles_computed', 'assignments_saved', 'emails_sent']
+                .forEach(stage => source.addEventListener(stage, onProgress));
+            source.addEventListener('forecast_ready', (event) => {
+                this.displayForecastPreview(onProgress(event));
+            });
+            source.addEventListener('schedule', (event) => {
+                source.close();
+                resolve({ status: 'completed', result: onProgress(event) });
+            });
+            source.addEventListener('error', (event) => {
+                source.close();
+                if (event.data) {
+                    resolve({ status: 'failed', error: JSON.parse(event.data).data.error });
+                } else if (jobId) {
+                    // Connection dropped mid-run; keep following the job by polling
+                    this.pollScheduleJob(jobId).then(resolve, reject);
+                } else {
+                    reject(new Error('Schedule stream failed'));
+                }
+            });
+        });
+    }
+
+    async pollScheduleJob(jobId) {
+        while (true) {
+            const response = await fetch(`${this.apiBase}/api/schedule/jobs/${jobId}`);
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            
+            const data = await response.json();
+            const job = data.data;
+            this.updateScheduleProgress(job);
+            
+            if (job.status === 'completed' || job.status === 'failed') {
+                return job;
+            }
+            await this.delay(this.jobPollInterval);
+        }
+    }
+
+    updateScheduleProgress(job) {
+        const stageLabels = {
+            queued: 'Waiting for scheduler...',
+            started: 'Fetching orders and inbound data...',
+            customer_fetched: 'Fetching orders and inbound data...',
+            inbound_computed: 'Inbound pallets calculated...',
+            forecast_ready: 'Forecast ready, calculating staffing...',
+            roles_computed: 'Assigning employees to roles...',
+            assignments_saved: 'Sending schedule emails...',
+            emails_sent: 'Finishing schedule...',
+            completed: 'Schedule generated',
+            schedule: 'Schedule generated'
+        };
+        
+        // Schedule generation fills the 50-90% band of the overall indicator
+        const percentage = 50 + Math.round((job.progress || 0) * 0.4);
+        this.updateProgressStatus(stageLabels[job.stage] || 'Generating schedules...', percentage);
+    }
+
     async loadEmployees() {
+        // Only the latest search is shown if responses arrive out of order
+        const requestId = ++this.employeeRequestId;
         try {
-            const response = await fetch(`${this.apiBase}/api/employees`);
+            const params = new URLSearchParams({
+                q: this.employeeQuery,
+                page: this.employeePage,
+                page_size: this.employeePageSize
+            });
+            const response = await fetch(`${this.apiBase}/api/employees/search?${params}`);
             if (!response.ok) {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
             
             const data = await response.json();
+            if (requestId !== this.employeeRequestId) return;
             if (data.success && data.data) {
                 this.employees = data.data.employees;
-                this.filteredEmployees = [...this.employees];
+                this.employeeTotal = data.data.total_count;
+                this.employees.forEach(employee => {
+                    this.employeeNames[employee.id] = employee.name;
+                });
                 this.displayEmployees();
                 this.updateEmployeeCount();
             } else {
@@ -200,6 +323,29 @@ class WarehouseDashboard {
         document.getElementById(contentId).style.display = 'block';
     }
 
+    displayForecastPreview(forecast) {
+        // Show a day's forecast as soon as it is ready, before staffing is done
+        const prefix = forecast.day === 'day_after' ? 'tomorrow' : '';
+        const data = forecast.forecast_data || {};
+        const values = {
+            ShippingPallets: data.daily_shipping_pallets,
+            IncomingPallets: data.daily_incoming_pallets,
+            CasesToPick: data.cases_to_pick,
+            StagedPallets: data.staged_pallets
+        };
+        
+        Object.entries(values).forEach(([field, value]) => {
+            const elementId = prefix ? `${prefix}${field}` : field.charAt(0).toLowerCase() + field.slice(1);
+            document.getElementById(elementId).textContent = value?.toFixed(1) || '-';
+        });
+        
+        const contentId = prefix ? `${prefix}Content` : 'scheduleContent';
+        const loadingId = prefix ? `${prefix}Loading` : 'scheduleLoading';
+        
+        document.getElementById(loadingId).style.display = 'none';
+        document.getElementById(contentId).style.display = 'block';
+    }
+
     displayRequiredStaff(requiredRoles, prefix) {
         const containerId = prefix ? `${prefix}RequiredStaff` : 'requiredStaff';
         const container = document.getElementById(containerId);
@@ -217,16 +363,43 @@ class WarehouseDashboard {
         });
     }
 
-    displayAssignedEmployees(assignedEmployees, prefix) {
+    async loadEmployeeNames(employeeIds) {
+        // Fetch names not seen yet, one search page of IDs at a time
+        const missing = [...new Set(employeeIds)].filter(id => !(id in this.employeeNames));
+        const maxPageSize = 200;
+        
+        for (let start = 0; start < missing.length; start += maxPageSize) {
+            const ids = missing.slice(start, start + maxPageSize);
+            const params = new URLSearchParams({
+                ids: ids.join(','),
+                fields: 'id,name',
+                page_size: maxPageSize
+            });
+            try {
+                const response = await fetch(`${this.apiBase}/api/employees/search?${params}`);
+                if (!response.ok) {
+                    throw new Error(`HTTP error! status: ${response.status}`);
+                }
+                const data = await response.json();
+                data.data.employees.forEach(employee => {
+                    this.employeeNames[employee.id] = employee.name;
+                });
+            } catch (error) {
+                console.error('Error loading employee names:', error);
+            }
+        }
+    }
+
+    async displayAssignedEmployees(assignedEmployees, prefix) {
         const containerId = prefix ? `${prefix}AssignedEmployees` : 'assignedEmployees';
         const container = document.getElementById(containerId);
         
+        await this.loadEmployeeNames(Object.values(assignedEmployees).flat());
         container.innerHTML = '';
         
         Object.entries(assignedEmployees).forEach(([role, employeeIds]) => {
             employeeIds.forEach(employeeId => {
-                const employee = this.employees.find(emp => emp.id === employeeId);
-                const employeeName = employee ? employee.name : employeeId;
+                const employeeName = this.employeeNames[employeeId] || employeeId;
                 
                 const assignedItem = document.createElement('div');
                 assignedItem.className = 'assigned-item';
@@ -245,7 +418,7 @@ class WarehouseDashboard {
         const container = document.getElementById('employeesList');
         container.innerHTML = '';
         
-        this.filteredEmployees.forEach(employee => {
+        this.employees.forEach(employee => {
             const employeeItem = document.createElement('div');
             employeeItem.className = 'employee-item';
             
@@ -286,26 +459,23 @@ class WarehouseDashboard {
     }
 
     filterEmployees(searchTerm) {
-        if (!searchTerm.trim()) {
-            this.filteredEmployees = [...this.employees];
-        } else {
-            const term = searchTerm.toLowerCase();
-            this.filteredEmployees = this.employees.filter(employee => 
-                employee.name.toLowerCase().includes(term) ||
-                employee.id.toLowerCase().includes(term) ||
-                (employee.department && employee.department.toLowerCase().includes(term)) ||
-                (employee.job_title && employee.job_title.toLowerCase().includes(term)) ||
-                (employee.skills && employee.skills.toLowerCase().includes(term))
-            );
-        }
-        
-        this.displayEmployees();
-        this.updateEmployeeCount();
+        // Searching happens on the server; wait for typing to pause
+        clearTimeout(this.searchTimer);
+        this.searchTimer = setTimeout(() => {
+            this.employeeQuery = searchTerm.trim();
+            this.employeePage = 1;
+            this.loadEmployees();
+        }, this.searchDebounce);
     }
 
     updateEmployeeCount() {
         const countElement = document.getElementById('employeeCount');
-        countElement.textContent = this.filteredEmployees.length;
+        countElement.textContent = this.employeeTotal;
+        
+        const lastPage = Math.max(1, Math.ceil(this.employeeTotal / this.employeePageSize));
+        document.getElementById('employeesPageInfo').textContent = `Page ${this.employeePage} of ${lastPage}`;
+        document.getElementById('employeesPrev').disabled = this.employeePage <= 1;
+        document.getElementById('employeesNext').disabled = this.employeePage >= lastPage;
     }
 
     getEmployeeStatusClass(employee) {
@@ -0,0 +1,704 @@
+"""Storage backends for the roster, scheduled assignments and staffing history."""
+
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+from config import DB_PATH, STORAGE_BACKEND, SQLITE_PATH, STORAGE_PAGE_SIZE
+from chroma_utils import get_collection
+from utils import FileLock
+
+logger = logging.getLogger(__name__)
+
+# Normalized availability flag stamped on every employee at write time so
+# schedulable employees can be selected by the datastore
+SCHEDULABLE_FIELD = "schedulable"
+
+def is_schedulable(metadata: Dict[str, Any]) -> bool:
+    """
+    Check if an employee can be scheduled based on their raw metadata.
+
+    Args:
+        metadata: Employee metadata
+
+    Returns:
+        bool: True if the employee is active, not on leave and works day shifts
+    """
+    try:
+        # Check if employee is active
+        if not metadata.get("active", True):
+            return False
+
+        # Check if employee is on leave
+        if metadata.get("on_leave", False):
+            return False
+
+        # Check shift preferences if available
+        shift_preferences = metadata.get("shift_preferences", [])
+        if shift_preferences and "day" not in shift_preferences:
+            return False
+
+        return True
+
+    except Exception:
+        return False
+
+# Sortable numeric form of schedule and staffing dates (20250114), stamped at
+# write time because Chroma's range operators only compare numbers
+DATE_KEY_FIELD = "date_key"
+
+def date_key(date: str) -> int:
+    """
+    Convert a YYYY-MM-DD date to its numeric sort key.
+
+    Args:
+        date: Date in YYYY-MM-DD format
+
+    Returns:
+        int: The date as YYYYMMDD
+
+    Raises:
+        ValueError: If date is not a valid YYYY-MM-DD date
+    """
+    return int(datetime.strptime(date, "%Y-%m-%d").strftime("%Y%m%d"))
+
+# State key of a random token replaced on every employee write, so any
+# process can tell whether the roster changed
+ROSTER_REVISION_KEY = "roster_revision"
+
+# State key recording when the Chroma collections were copied into this backend
+CHROMA_MIGRATION_KEY = "chroma_migration"
+
+# Background job statuses that keep another run of the job from starting
+ACTIVE_JOB_STATUSES = ("queued", "running")
+
+def with_availability(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of employee metadata with the normalized schedulable flag set."""
+    return {**metadata, SCHEDULABLE_FIELD: is_schedulable(metadata)}
+
+class StorageBackend:
+    """
+    Interface for structured scheduler data.
+
+    Employees and assignments are stored as flat metadata dictionaries
+    (string, number and boolean values) plus a descriptive document.
+    """
+
+    def count_employees(self) -> int:
+        """Number of employees on the roster."""
+        raise NotImplementedError
+
+    def iter_employees(self, page_size: int = STORAGE_PAGE_SIZE,
+                       schedulable_only: bool = False) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        (ID, metadata) of employees in roster order, read page by page without documents.
+
+        With schedulable_only, unavailable employees are filtered out by the datastore.
+        """
+        raise NotImplementedError
+
+    def get_all_employees(self, schedulable_only: bool = False) -> Dict[str, List[Any]]:
+        """Employees as {"ids": [...], "metadatas": [...]} in roster order."""
+        ids, metadatas = [], []
+        for emp_id, metadata in self.iter_employees(schedulable_only=schedulable_only):
+            ids.append(emp_id)
+            metadatas.append(metadata)
+        return {"ids": ids, "metadatas": metadatas}
+
+    def get_employees(self, emp_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Metadata of the given employees that exist, by ID."""
+        raise NotImplementedError
+
+    def upsert_employees(self, ids: List[str], metadatas: List[Dict[str, Any]], documents: List[str]) -> None:
+        """Insert or replace employees, stamping their schedulable flag and a new roster revision."""
+        raise NotImplementedError
+
+    def update_employee_metadata(self, ids: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        """Replace the metadata of existing employees, keeping their documents, and stamp a new roster revision."""
+        raise NotImplementedError
+
+    def get_roster_revision(self) -> str:
+        """Token that changes after every employee write, from any process; '' before the first."""
+        return self.get_state(ROSTER_REVISION_KEY) or ""
+
+    def upsert_assignments(self, ids: List[str], metadatas: List[Dict[str, Any]], documents: List[str]) -> None:
+        """Insert or replace scheduled assignments; metadata must include schedule_date and employee_id."""
+        raise NotImplementedError
+
+    def get_assignments(self, date: str) -> List[Dict[str, Any]]:
+        """Metadata of the assignments scheduled on a date."""
+        raise NotImplementedError
+
+    def get_assignments_range(self, start_date: str, end_date: str, role: Optional[str] = None,
+                              employee_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Metadata of the assignments with start_date <= schedule_date <= end_date,
+        optionally only those of one role or employee, ordered by date.
+        """
+        raise NotImplementedError
+
+    def delete_assignments(self, date: str) -> int:
+        """Delete the assignments scheduled on a date and return how many were deleted."""
+        raise NotImplementedError
+
+    def upsert_staffing(self, date: str, roles: Dict[str, Any], document: str) -> None:
+        """Insert or replace the staffing requirements of a date."""
+        raise NotImplementedError
+
+    def get_staffing_range(self, start_date: str, end_date: str) -> List[Dict[str, Any]]:
+        """Staffing records ({"date", "roles"}) with start_date <= date <= end_date, oldest first."""
+        raise NotImplementedError
+
+    def get_state(self, key: str) -> Optional[Any]:
+        """JSON value saved under key by put_state, or None."""
+        raise NotImplementedError
+
+    def put_state(self, key: str, value: Any) -> None:
+        """Save a JSON-serializable value under key, replacing any previous one."""
+        raise NotImplementedError
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Background job saved by put_job, or None."""
+        raise NotImplementedError
+
+    def put_job(self, job: Dict[str, Any]) -> None:
+        """Insert or replace a background job, keyed by its job_id."""
+        raise NotImplementedError
+
+    def get_active_jobs(self) -> List[Dict[str, Any]]:
+        """Background jobs that are queued or running."""
+        raise NotImplementedError
+
+    def delete_jobs_finished_before(self, timestamp: float) -> int:
+        """Delete background jobs that finished before a Unix timestamp and return how many."""
+        raise NotImplementedError
+
+class SQLiteStorage(StorageBackend):
+    """Relational storage in a single SQLite file, indexed for date and employee lookups."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS employees (
+            id TEXT PRIMARY KEY,
+            metadata TEXT NOT NULL,
+            document TEXT,
+            schedulable INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS scheduled_employees (
+            id TEXT PRIMARY KEY,
+            schedule_date TEXT NOT NULL,
+            employee_id TEXT NOT NULL,
+            assigned_role TEXT,
+            metadata TEXT NOT NULL,
+            document TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_scheduled_employees_date ON scheduled_employees (schedule_date);
+        CREATE INDEX IF NOT EXISTS idx_scheduled_employees_employee ON scheduled_employees (employee_id);
+        CREATE INDEX IF NOT EXISTS idx_scheduled_employees_employee_date
+            ON scheduled_employees (employee_id, schedule_date);
+        CREATE TABLE IF NOT EXISTS staffing_history (
+            date TEXT PRIMARY KEY,
+            roles TEXT NOT NULL,
+            document TEXT
+        );
+        CREATE TABLE IF NOT EXISTS app_state (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            finished_ts REAL,
+            state TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status);
+    """
+
+    def __init__(self, path: str = SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(self.SCHEMA)
+            self._migrate_availability(conn)
+            self._migrate_assignment_roles(conn)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Connection for the calling thread, opened on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _migrate_availability(self, conn: sqlite3.Connection) -> None:
+        """Add and backfill the schedulable column on databases created before it existed."""
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(employees)")]
+        if SCHEDULABLE_FIELD not in columns:
+            conn.execute("ALTER TABLE employees ADD COLUMN schedulable INTEGER")
+
+        rows = conn.execute("SELECT id, metadata FROM employees WHERE schedulable IS NULL").fetchall()
+        if rows:
+            conn.executemany(
+                "UPDATE employees SET metadata = ?, schedulable = ? WHERE id = ?",
+                [(json.dumps(metadata), metadata[SCHEDULABLE_FIELD], emp_id)
+                 for emp_id, metadata in ((row[0], with_availability(json.loads(row[1]))) for row in rows)]
+            )
+            print(f"Backfilled availability for {len(rows)} employees")
+            self._new_roster_revision(conn)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_employees_schedulable ON employees (schedulable)"
+        )
+
+    def _new_roster_revision(self, conn: sqlite3.Connection) -> None:
+        """Replace the roster revision in the caller's transaction, so it commits with the write."""
+        conn.execute(
+            """INSERT INTO app_state (key, value) VALUES (?, '"' || lower(hex(randomblob(16))) || '"')
+               ON CONFLICT(key) DO UPDATE SET value = excluded.value""",
+            (ROSTER_REVISION_KEY,)
+        )
+
+    def _migrate_assignment_roles(self, conn: sqlite3.Connection) -> None:
+        """Add and backfill the assigned_role column on databases created before it existed."""
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(scheduled_employees)")]
+        if "assigned_role" not in columns:
+            conn.execute("ALTER TABLE scheduled_employees ADD COLUMN assigned_role TEXT")
+            rows = conn.execute("SELECT id, metadata FROM scheduled_employees").fetchall()
+            conn.executemany(
+                "UPDATE scheduled_employees SET assigned_role = ? WHERE id = ?",
+                [(json.loads(metadata).get("assigned_role"), assignment_id) for assignment_id, metadata in rows]
+            )
+            if rows:
+                print(f"Backfilled roles for {len(rows)} scheduled assignments")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_scheduled_employees_role_date ON scheduled_employees (assigned_role, schedule_date)"
+        )
+
+    def count_employees(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM employees").fetchone()[0]
+
+    def iter_employees(self, page_size: int = STORAGE_PAGE_SIZE,
+                       schedulable_only: bool = False) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        if schedulable_only:
+            cursor = self._connect().execute(
+                "SELECT id, metadata FROM employees WHERE schedulable = 1 ORDER BY rowid"
+            )
+        else:
+            cursor = self._connect().execute("SELECT id, metadata FROM employees ORDER BY rowid")
+        while True:
+            rows = cursor.fetchmany(page_size)
+            if not rows:
+                return
+            for emp_id, metadata in rows:
+                yield emp_id, json.loads(metadata)
+
+    def get_employees(self, emp_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        employees = {}
+        conn = self._connect()
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(emp_ids), 500):
+            chunk = emp_ids[start:start + 500]
+            rows = conn.execute(
+                f"SELECT id, metadata FROM employees WHERE id IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            employees.update((row[0], json.loads(row[1])) for row in rows)
+        return employees
+
+    def upsert_employees(self, ids: List[str], metadatas: List[Dict[str, Any]], documents: List[str]) -> None:
+        metadatas = [with_availability(metadata) for metadata in metadatas]
+        with self._connect() as conn:
+            conn.executemany(
+                """INSERT INTO employees (id, metadata, document, schedulable) VALUES (?, ?, ?, ?)
+                   ON CONFLICT(id) DO UPDATE SET metadata = excluded.metadata, document = excluded.document,
+                       schedulable = excluded.schedulable""",
+                [(emp_id, json.dumps(metadata), document, metadata[SCHEDULABLE_FIELD])
+                 for emp_id, metadata, document in zip(ids, metadatas, documents)]
+            )
+            self._new_roster_revision(conn)
+
+    def update_employee_metadata(self, ids: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        metadatas = [with_availability(metadata) for metadata in metadatas]
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE employees SET metadata = ?, schedulable = ? WHERE id = ?",
+                [(json.dumps(metadata), metadata[SCHEDULABLE_FIELD], emp_id)
+                 for emp_id, metadata in zip(ids, metadatas)]
+            )
+            self._new_roster_revision(conn)
+
+    def upsert_assignments(self, ids: List[str], metadatas: List[Dict[str, Any]], documents: List[str]) -> None:
+        with self._connect() as conn:
+            conn.executemany(
+                """INSERT INTO scheduled_employees (id, schedule_date, employee_id, assigned_role, metadata, document)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(id) DO UPDATE SET schedule_date = excluded.schedule_date,
+                       employee_id = excluded.employee_id, assigned_role = excluded.assigned_role,
+                       metadata = excluded.metadata, document = excluded.document""",
+                [(assignment_id, metadata["schedule_date"], metadata["employee_id"], metadata.get("assigned_role"),
+                  json.dumps(metadata), document)
+                 for assignment_id, metadata, document in zip(ids, metadatas, documents)]
+            )
+
+    def get_assignments(self, date: str) -> List[Dict[str, Any]]:
+        rows = self._connect().execute(
+            "SELECT metadata FROM scheduled_employees WHERE schedule_date = ? ORDER BY rowid", (date,)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def get_assignments_range(self, start_date: str, end_date: str, role: Optional[str] = None,
+                              employee_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        # ISO dates sort as text, so each filter is one scan of a (column, schedule_date) index
+        clauses, params = ["schedule_date BETWEEN ? AND ?"], [start_date, end_date]
+        if role is not None:
+            clauses.append("assigned_role = ?")
+            params.append(role)
+        if employee_id is not None:
+            clauses.append("employee_id = ?")
+            params.append(employee_id)
+        rows = self._connect().execute(
+            f"SELECT metadata FROM scheduled_employees WHERE {' AND '.join(clauses)} ORDER BY schedule_date, rowid",
+            params
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def delete_assignments(self, date: str) -> int:
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM scheduled_employees WHERE schedule_date = ?", (date,)).rowcount
+
+    def upsert_staffing(self, date: str, roles: Dict[str, Any], document: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                """INSERT INTO staffing_history (date, roles, document) VALUES (?, ?, ?)
+                   ON CONFLICT(date) DO UPDATE SET roles = excluded.roles, document = excluded.document""",
+                (date, json.dumps(roles), document)
+            )
+
+    def get_staffing_range(self, start_date: str, end_date: str) -> List[Dict[str, Any]]:
+        rows = self._connect().execute(
+            "SELECT date, roles FROM staffing_history WHERE date BETWEEN ? AND ? ORDER BY date",
+            (start_date, end_date)
+        ).fetchall()
+        return [{"date": row[0], "roles": json.loads(row[1])} for row in rows]
+
+    def get_state(self, key: str) -> Optional[Any]:
+        row = self._connect().execute("SELECT value FROM app_state WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_state(self, key: str, value: Any) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                """INSERT INTO app_state (key, value) VALUES (?, ?)
+                   ON CONFLICT(key) DO UPDATE SET value = excluded.value""",
+                (key, json.dumps(value))
+            )
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute("SELECT state FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_job(self, job: Dict[str, Any]) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, status, finished_ts, state) VALUES (?, ?, ?, ?)",
+                (job["job_id"], job["status"], job.get("finished_ts"), json.dumps(job))
+            )
+
+    def get_active_jobs(self) -> List[Dict[str, Any]]:
+        placeholders = ",".join("?" * len(ACTIVE_JOB_STATUSES))
+        rows = self._connect().execute(
+            f"SELECT state FROM jobs WHERE status IN ({placeholders})", ACTIVE_JOB_STATUSES
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def delete_jobs_finished_before(self, timestamp: float) -> int:
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM jobs WHERE finished_ts < ?", (timestamp,)).rowcount
+
+class ChromaStorage(StorageBackend):
+    """Storage in ChromaDB collections, as used before the SQLite backend existed."""
+
+    def __init__(self, path: str = DB_PATH):
+        # Collections come from the shared client registry on first access
+        self.path = path
+        self._availability_checked = False
+        self._date_keys_checked = set()
+
+    @property
+    def employee_collection(self):
+        return get_collection("employees", self.path)
+
+    @property
+    def scheduled_employees_collection(self):
+        return get_collection("scheduled_employees", self.path)
+
+    @property
+    def staffing_collection(self):
+        return get_collection("staffing_history", self.path)
+
+    @property
+    def state_collection(self):
+        return get_collection("app_state", self.path)
+
+    @property
+    def job_collection(self):
+        return get_collection("scheduler_jobs", self.path)
+
+    def count_employees(self) -> int:
+        return self.employee_collection.count()
+
+    def _iter_metadatas(self, collection, page_size: int, where: Optional[Dict[str, Any]] = None
+                        ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Page through a collection fetching only IDs and metadata."""
+        # Chroma re-scans skipped rows for every offset, so page by ID instead
+        ids = collection.get(where=where, include=[]).get("ids") or []
+        for start in range(0, len(ids), page_size):
+            page = collection.get(ids=ids[start:start + page_size], include=["metadatas"])
+            yield from zip(page.get("ids") or [], page.get("metadatas") or [])
+
+    def _backfill_availability(self) -> None:
+        """Stamp the schedulable flag on employees written before it existed (once per process)."""
+        if self._availability_checked:
+            return
+        ids, metadatas = [], []
+        for emp_id, metadata in self._iter_metadatas(self.employee_collection, STORAGE_PAGE_SIZE):
+            normalized = with_availability(metadata)
+            if metadata.get(SCHEDULABLE_FIELD) != normalized[SCHEDULABLE_FIELD]:
+                ids.append(emp_id)
+                metadatas.append(normalized)
+        for start in range(0, len(ids), STORAGE_PAGE_SIZE):
+            self.employee_collection.update(
+                ids=ids[start:start + STORAGE_PAGE_SIZE], metadatas=metadatas[start:start + STORAGE_PAGE_SIZE]
+            )
+        if ids:
+            print(f"Backfilled availability for {len(ids)} employees")
+            self._new_roster_revision()
+        self._availability_checked = True
+
+    def _new_roster_revision(self) -> None:
+        """Replace the roster revision; called after the write, so a reader never pairs a new revision with old data."""
+        self.put_state(ROSTER_REVISION_KEY, uuid.uuid4().hex)
+
+    def _backfill_date_keys(self, collection, date_field: str) -> None:
+        """Stamp the numeric date key on records written before it existed (once per process)."""
+        if collection.name in self._date_keys_checked:
+            return
+        ids, metadatas = [], []
+        for record_id, metadata in self._iter_metadatas(collection, STORAGE_PAGE_SIZE):
+            if DATE_KEY_FIELD not in metadata:
+                ids.append(record_id)
+                metadatas.append({DATE_KEY_FIELD: date_key(metadata[date_field])})
+        # Chroma merges updated metadata keys into the existing ones
+        for start in range(0, len(ids), STORAGE_PAGE_SIZE):
+            collection.update(ids=ids[start:start + STORAGE_PAGE_SIZE], metadatas=metadatas[start:start + STORAGE_PAGE_SIZE])
+        if ids:
+            print(f"Backfilled date keys for {len(ids)} {collection.name} records")
+        self._date_keys_checked.add(collection.name)
+
+    def _date_range_where(self, start_date: str, end_date: str) -> List[Dict[str, Any]]:
+        """Chroma where clauses selecting start_date <= date <= end_date by numeric key."""
+        return [{DATE_KEY_FIELD: {"$gte": date_key(start_date)}}, {DATE_KEY_FIELD: {"$lte": date_key(end_date)}}]
+
+    def iter_employees(self, page_size: int = STORAGE_PAGE_SIZE,
+                       schedulable_only: bool = False) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        if not schedulable_only:
+            return self._iter_metadatas(self.employee_collection, page_size)
+        self._backfill_availability()
+        return self._iter_metadatas(self.employee_collection, page_size, where={SCHEDULABLE_FIELD: True})
+
+    def get_employees(self, emp_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        emp_data = self.employee_collection.get(ids=emp_ids, include=["metadatas"])
+        return dict(zip(emp_data.get("ids") or [], emp_data.get("metadatas") or []))
+
+    def upsert_employees(self, ids: List[str], metadatas: List[Dict[str, Any]], documents: List[str]) -> None:
+        metadatas = [with_availability(metadata) for metadata in metadatas]
+        self.employee_collection.upsert(ids=ids, metadatas=metadatas, documents=documents)
+        self._new_roster_revision()
+
+    def update_employee_metadata(self, ids: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        metadatas = [with_availability(metadata) for metadata in metadatas]
+        self.employee_collection.update(ids=ids, metadatas=metadatas)
+        self._new_roster_revision()
+
+    def upsert_assignments(self, ids: List[str], metadatas: List[Dict[str, Any]], documents: List[str]) -> None:
+        metadatas = [{**metadata, DATE_KEY_FIELD: date_key(metadata["schedule_date"])} for metadata in metadatas]
+        self.scheduled_employees_collection.upsert(ids=ids, metadatas=metadatas, documents=documents)
+
+    def get_assignments(self, date: str) -> List[Dict[str, Any]]:
+        results = self.scheduled_employees_collection.get(where={"schedule_date": date}, include=["metadatas"])
+        return results.get("metadatas") or []
+
+    def get_assignments_range(self, start_date: str, end_date: str, role: Optional[str] = None,
+                              employee_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        collection = self.scheduled_employees_collection
+        self._backfill_date_keys(collection, "schedule_date")
+        clauses = self._date_range_where(start_date, end_date)
+        if role is not None:
+            clauses.append({"assigned_role": role})
+        if employee_id is not None:
+            clauses.append({"employee_id": employee_id})
+        results = collection.get(where={"$and": clauses}, include=["metadatas"])
+        return sorted(results.get("metadatas") or [], key=lambda metadata: metadata[DATE_KEY_FIELD])
+
+    def delete_assignments(self, date: str) -> int:
+        results = self.scheduled_employees_collection.get(where={"schedule_date": date}, include=[])
+        if not results.get("ids"):
+            return 0
+        self.scheduled_employees_collection.delete(ids=results["ids"])
+        return len(results["ids"])
+
+    def upsert_staffing(self, date: str, roles: Dict[str, Any], document: str) -> None:
+        self.staffing_collection.upsert(
+            ids=[date],
+            metadatas=[{"date": date, DATE_KEY_FIELD: date_key(date), "roles": json.dumps(roles)}],
+            documents=[document]
+        )
+
+    def get_staffing_range(self, start_date: str, end_date: str) -> List[Dict[str, Any]]:
+        collection = self.staffing_collection
+        self._backfill_date_keys(collection, "date")
+        results = collection.get(where={"$and": self._date_range_where(start_date, end_date)}, include=["metadatas"])
+        records = [
+            {"date": metadata["date"], "roles": json.loads(metadata["roles"])}
+            for metadata in results.get("metadatas") or []
+        ]
+        return sorted(records, key=lambda x: x["date"])
+
+    def get_state(self, key: str) -> Optional[Any]:
+        # Values are kept as JSON documents; metadata only holds scalars
+        results = self.state_collection.get(ids=[key], include=["documents"])
+        documents = results.get("documents") or []
+        return json.loads(documents[0]) if documents else None
+
+    def put_state(self, key: str, value: Any) -> None:
+        self.state_collection.upsert(ids=[key], documents=[json.dumps(value)], metadatas=[{"key": key}])
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        results = self.job_collection.get(ids=[job_id], include=["documents"])
+        documents = results.get("documents") or []
+        return json.loads(documents[0]) if documents else None
+
+    def put_job(self, job: Dict[str, Any]) -> None:
+        # Unfinished jobs get a finished_ts of 0 since metadata can't hold None
+        self.job_collection.upsert(
+            ids=[job["job_id"]], documents=[json.dumps(job)],
+            metadatas=[{"status": job["status"], "finished_ts": float(job.get("finished_ts") or 0)}]
+        )
+
+    def get_active_jobs(self) -> List[Dict[str, Any]]:
+        results = self.job_collection.get(
+            where={"$or": [{"status": status} for status in ACTIVE_JOB_STATUSES]}, include=["documents"]
+        )
+        return [json.loads(document) for document in results.get("documents") or []]
+
+    def delete_jobs_finished_before(self, timestamp: float) -> int:
+        ids = self.job_collection.get(
+            where={"$and": [{"finished_ts": {"$gt": 0}}, {"finished_ts": {"$lt": timestamp}}]}, include=[]
+        ).get("ids") or []
+        if ids:
+            self.job_collection.delete(ids=ids)
+        return len(ids)
+
+STORAGE_BACKENDS = {
+    "sqlite": SQLiteStorage,
+    "chroma": ChromaStorage
+}
+
+_storage: Optional[StorageBackend] = None
+_storage_lock = threading.Lock()
+
+def get_storage() -> StorageBackend:
+    """
+    Get the configured storage backend, creating it on first use.
+
+    Returns:
+        StorageBackend selected by STORAGE_BACKEND
+
+    Raises:
+        ValueError: If STORAGE_BACKEND names an unknown backend
+    """
+    global _storage
+
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                backend = STORAGE_BACKENDS.get(STORAGE_BACKEND)
+                if backend is None:
+                    raise ValueError(f"Unknown STORAGE_BACKEND {STORAGE_BACKEND!r}, expected one of {list(STORAGE_BACKENDS)}")
+                storage = backend()
+                if isinstance(storage, SQLiteStorage):
+                    migrate_chroma_on_first_start(storage)
+                _storage = storage
+    return _storage
+
+def migrate_from_chroma(source: ChromaStorage, target: StorageBackend) -> Dict[str, int]:
+    """
+    Copy employees, assignments and staffing history out of Chroma.
+
+    Args:
+        source: Chroma backend to read from
+        target: Backend to write to
+
+    Returns:
+        Number of records copied per collection
+    """
+    counts = {}
+    for name, collection, upsert in (
+        ("employees", source.employee_collection, target.upsert_employees),
+        ("assignments", source.scheduled_employees_collection, target.upsert_assignments)
+    ):
+        records = collection.get()
+        ids = records.get("ids") or []
+        if ids:
+            upsert(ids, records["metadatas"], records.get("documents") or [""] * len(ids))
+        counts[name] = len(ids)
+
+    records = source.staffing_collection.get()
+    for metadata, document in zip(records.get("metadatas") or [], records.get("documents") or []):
+        target.upsert_staffing(metadata["date"], json.loads(metadata["roles"]), document)
+    counts["staffing_history"] = len(records.get("ids") or [])
+    target.put_state(CHROMA_MIGRATION_KEY, {**counts, "migrated_at": datetime.now().isoformat()})
+    return counts
+
+def migrate_chroma_on_first_start(target: SQLiteStorage, path: str = DB_PATH) -> Optional[Dict[str, int]]:
+    """
+    Copy the Chroma collections into a new, empty SQLite database.
+
+    Upgraded installs switch to SQLite by default; without this they would
+    start on an empty roster with their data still in Chroma. Runs under a
+    lock file in DB_PATH, so with several workers only the first copies and
+    the rest wait for it. Does nothing once the target has employees or has
+    been migrated before, or if there is no Chroma data.
+
+    Args:
+        target: SQLite backend being opened
+        path: Directory of the Chroma database
+
+    Returns:
+        Number of records copied per collection, or None if nothing was migrated
+    """
+    if not os.path.exists(os.path.join(path, "chroma.sqlite3")):
+        return None
+    with FileLock(os.path.join(path, "storage_migration.lock")):
+        if target.count_employees() or target.get_state(CHROMA_MIGRATION_KEY):
+            return None
+        logger.warning("SQLite storage at %s is empty and Chroma data exists in %s; copying it over "
+                       "(set STORAGE_BACKEND=chroma to keep using Chroma instead)", target.path, path)
+        counts = migrate_from_chroma(ChromaStorage(path), target)
+        logger.warning("Migrated %d employees, %d assignments and %d staffing records from Chroma to %s",
+                       counts["employees"], counts["assignments"], counts["staffing_history"], target.path)
+        return counts
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["migrate"]:
+        print("Usage: python storage.py migrate")
+        print("Copies the Chroma collections in DB_PATH into the SQLite database at SQLITE_PATH.")
+        sys.exit(1)
+    counts = migrate_from_chroma(ChromaStorage(), SQLiteStorage())
+    print(f"Migrated {counts['employees']} employees, {counts['assignments']} assignments "
+          f"and {counts['staffing_history']} staffing records to {SQLITE_PATH}")
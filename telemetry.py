@@ -0,0 +1,149 @@
+"""Latency histograms exposed in Prometheus text format."""
+
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple, Callable, Sequence
+
+# Bucket upper bounds in seconds, from fast DB reads up to full scheduler runs
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+_registry: List["Histogram"] = []
+_registry_lock = threading.Lock()
+
+def _escape_label_value(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + "}"
+
+def _format_number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else f"{int(value)}"
+
+class Histogram:
+    """Thread-safe latency histogram with a fixed set of label names."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # label values -> [bucket counts..., sum, count]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        with _registry_lock:
+            _registry.append(self)
+
+    def observe(self, value: float, **labels) -> None:
+        """
+        Record one observation.
+
+        Args:
+            value: Observed duration in seconds
+            **labels: Value for every label name of the histogram
+        """
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Context manager that observes the duration of its block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        """
+        Render the histogram in Prometheus text exposition format.
+
+        Returns:
+            List of exposition lines
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series_items = [(key, list(values)) for key, values in self._series.items()]
+
+        for key, values in sorted(series_items):
+            pairs = list(zip(self.labelnames, key))
+            for bound, count in zip(self.buckets, values):
+                lines.append(f"{self.name}_bucket{_format_labels(pairs + [('le', _format_number(bound))])} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(pairs + [('le', '+Inf')])} {values[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(pairs)} {values[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(pairs)} {values[-1]}")
+        return lines
+
+def timed(histogram: Histogram, **labels) -> Callable:
+    """
+    Decorator that observes each call's duration in a histogram.
+
+    Args:
+        histogram: Histogram to record into
+        **labels: Fixed label values for every call
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with histogram.time(**labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def render_metrics() -> str:
+    """
+    Render every registered histogram.
+
+    Metrics are kept per process, so with several uvicorn workers each
+    scrape reports the worker that served it.
+
+    Returns:
+        Prometheus text exposition document
+    """
+    with _registry_lock:
+        histograms = list(_registry)
+    lines = []
+    for histogram in histograms:
+        lines.extend(histogram.render())
+    return "\n".join(lines) + "\n"
+
+WISE_API_LATENCY = Histogram(
+    "wise_api_request_duration_seconds",
+    "Latency of WISE API requests.",
+    ["endpoint", "customer"]
+)
+
+DATABASE_LATENCY = Histogram(
+    "database_operation_duration_seconds",
+    "Latency of database operations.",
+    ["module", "operation"]
+)
+
+EMAIL_SEND_LATENCY = Histogram(
+    "email_send_duration_seconds",
+    "Latency of sending an email over SMTP.",
+    ["email_type"]
+)
+
+SCHEDULER_RUN_LATENCY = Histogram(
+    "scheduler_run_duration_seconds",
+    "Duration of complete scheduler runs."
+)
+
+HTTP_REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Latency of HTTP requests handled by the API.",
+    ["method", "route", "status"]
+)
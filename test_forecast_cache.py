@@ -0,0 +1,21 @@
+"""Checks that concurrent forecast cache writes from several processes keep every entry."""
+
+from datetime import date, timedelta
+
+from forecast_cache import get_cached_forecast
+
+# Stores every workers-th date of the cache's test range
+WORKER_SCRIPT = """
+from datetime import date, timedelta
+from forecast_cache import store_forecast
+for day in range(worker, int(args[0]), workers):
+    assert store_forecast((date(2030, 1, 1) + timedelta(days=day)).isoformat(), {"worker": worker, "day": day})
+"""
+
+def test_concurrent_stores_from_several_processes_keep_every_date(run_workers):
+    workers, days = 4, 60
+    assert run_workers(WORKER_SCRIPT, workers, days) == [0] * workers
+
+    for day in range(days):
+        forecast = get_cached_forecast((date(2030, 1, 1) + timedelta(days=day)).isoformat())
+        assert forecast == {"worker": day % workers, "day": day}, f"day {day} was lost"
@@ -0,0 +1,42 @@
+"""Fails if cold-importing the app gets slow or starts loading heavy libraries again."""
+
+import json
+import os
+import subprocess
+import sys
+
+# Seconds allowed for a cold `import index`; most of it is FastAPI itself
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "2.0"))
+
+# Libraries that must only load in the code paths that use them
+LAZY_MODULES = ["pandas", "numpy", "openpyxl", "chromadb", "Levenshtein", "rapidfuzz", "requests"]
+
+COLD_IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import index
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (LAZY_MODULES,)
+
+def cold_import_index() -> dict:
+    """Import index in a fresh interpreter and report its time and the heavy modules it loaded."""
+    result = subprocess.run(
+        [sys.executable, "-c", COLD_IMPORT_SCRIPT],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def test_index_import_budget():
+    # Best of three, so one slow start on a busy machine does not fail the check
+    runs = [cold_import_index() for _ in range(3)]
+    fastest = min(run["seconds"] for run in runs)
+
+    assert runs[0]["loaded"] == [], f"import index loaded heavy modules: {runs[0]['loaded']}"
+    assert fastest <= IMPORT_BUDGET_SECONDS, \
+        f"import index took {fastest:.2f}s, budget is {IMPORT_BUDGET_SECONDS:.2f}s"
+
+if __name__ == "__main__":
+    test_index_import_budget()
+    print(f"OK: import index is within {IMPORT_BUDGET_SECONDS:.2f}s and loads none of {LAZY_MODULES}")
@@ -0,0 +1,54 @@
+"""Checks that scheduler jobs are shared by worker processes and only one run is active at a time."""
+
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import job_service
+from storage import get_storage
+
+# Starts a job from every worker with a stubbed scheduler and records the job it got
+WORKER_SCRIPT = """
+import os, time
+import job_service, schedule_service
+def run_scheduler(progress_callback=None):
+    progress_callback("roles_computed", {"worker": worker})
+    time.sleep(2)
+    return {"worker": worker}
+schedule_service.run_scheduler = run_scheduler
+with open(os.path.join(args[0], "%d.txt" % worker), "w") as f:
+    f.write(job_service.create_scheduler_job()["job_id"])
+"""
+
+def wait_for_job(job_id, timeout=10):
+    deadline = time.time() + timeout
+    while job_service.get_job(job_id)["status"] not in ("completed", "failed"):
+        assert time.time() < deadline, f"job {job_id} did not finish"
+        time.sleep(0.05)
+    return job_service.get_job(job_id)
+
+def test_workers_join_one_run_that_every_process_can_read(run_workers):
+    directory = tempfile.mkdtemp(prefix="scheduler_jobs_")
+    workers = 4
+    assert run_workers(WORKER_SCRIPT, workers, directory) == [0] * workers
+
+    job_ids = {open(os.path.join(directory, f"{worker}.txt")).read() for worker in range(workers)}
+    assert len(job_ids) == 1, f"workers started {len(job_ids)} runs"
+    job_id = job_ids.pop()
+    job = job_service.get_job(job_id)
+    assert job["status"] == "completed" and job["stages_completed"] == ["roles_computed"], job
+    events, finished = job_service.get_job_events(job_id)
+    assert finished and [event["event"] for event in events] == ["roles_computed", "schedule"]
+    assert job_service.get_job_events(job_id, 1)[0] == events[1:]
+
+def test_abandoned_job_does_not_block_a_new_run(monkeypatch):
+    monkeypatch.setattr(job_service.schedule_service, "run_scheduler", lambda progress_callback=None: {"ok": True})
+    silent_since = (datetime.now() - timedelta(seconds=job_service.JOB_STALE_SECONDS + 60)).isoformat()
+    get_storage().put_job({"job_id": "abandoned", "status": "running", "finished_ts": None,
+                           "progress": 5, "updated_at": silent_since, "events": []})
+
+    job = job_service.create_scheduler_job()
+    assert job["job_id"] != "abandoned"
+    assert wait_for_job(job["job_id"])["result"] == {"ok": True}
+    assert job_service.get_job("abandoned")["status"] == "failed"
@@ -0,0 +1,26 @@
+"""Checks that request profiles include work handed off to worker threads, tagged by thread."""
+
+import asyncio
+import time
+
+from profiling import SamplingProfiler
+
+def busy_in_worker_thread():
+    deadline = time.time() + 0.3
+    while time.time() < deadline:
+        sum(range(1000))
+
+def test_profiler_samples_work_run_with_to_thread():
+    async def request():
+        profiler = SamplingProfiler(interval=0.005)
+        profiler.start()
+        await asyncio.to_thread(busy_in_worker_thread)
+        await asyncio.sleep(0.1)
+        profiler.stop()
+        return profiler.samples
+
+    samples = asyncio.run(request())
+    worker_stacks = [stack for stack in samples if "busy_in_worker_thread" in stack]
+    assert worker_stacks and all(stack.startswith("thread asyncio_") for stack in worker_stacks), samples
+    # The event loop waiting in select while the worker runs is idle, not work
+    assert not any("select (selectors.py" in stack for stack in samples), samples
@@ -0,0 +1,102 @@
+"""Checks that rule matches, accepted titles and strong embedding matches become roles, and weaker matches stay suggestions."""
+
+import os
+import tempfile
+import zlib
+
+import pytest
+
+import semantic_search
+from role_classifier import RoleClassifier, assign_roles, ROLES_FIELD, SUGGESTED_ROLES_FIELD
+from storage import SQLiteStorage
+
+class BagOfWordsEmbedding:
+    """Stands in for the sentence model: one dimension per word, so similarity is word overlap."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, texts):
+        self.calls += 1
+        vectors = []
+        for text in texts:
+            vector = [0.0] * 384
+            for word in text.lower().split():
+                vector[zlib.crc32(word.encode("utf-8")) % 384] += 1.0
+            vectors.append(vector)
+        return vectors
+
+def classifier(storage=None, **kwargs):
+    storage = storage or SQLiteStorage(os.path.join(tempfile.mkdtemp(prefix="role_classifier_"), "scheduler.sqlite3"))
+    return RoleClassifier(storage, **kwargs)
+
+def classify(titles, role_classifier):
+    metadatas = [{"original_job_title": title} for title in titles]
+    assign_roles(metadatas, role_classifier)
+    return {title: (metadata[ROLES_FIELD], metadata[SUGGESTED_ROLES_FIELD]) for title, metadata in zip(titles, metadatas)}
+
+def with_model(test):
+    """Run a test with the fake model loaded, restoring the real state afterwards."""
+    def run():
+        saved = semantic_search._embedding_function, semantic_search._model_loaded
+        semantic_search._embedding_function, semantic_search._model_loaded = BagOfWordsEmbedding(), True
+        try:
+            test()
+        finally:
+            semantic_search._embedding_function, semantic_search._model_loaded = saved
+    run.__name__ = test.__name__
+    return run
+
+@with_model
+def test_weak_embedding_matches_are_only_suggestions():
+    results = classify(["Level 2 Forklift Driver", "Reach Truck Operator II", "Lift Truck Driver", "Shipping Clerk"],
+                       classifier())
+
+    assert results["Level 2 Forklift Driver"] == ("forklift_driver", "")
+    assert results["Reach Truck Operator II"] == ("bendi_driver", "")
+    # Closest to the "lift driver" variation, but no rule matches it
+    assert results["Lift Truck Driver"][0] == ""
+    assert results["Lift Truck Driver"][1].startswith("forklift_driver:0.8"), results["Lift Truck Driver"]
+    assert results["Shipping Clerk"] == ("", "")
+
+@with_model
+def test_strong_embedding_matches_become_roles():
+    results = classify(["Lift Truck Driver", "Shipping Clerk"], classifier(accept_similarity=0.8))
+
+    assert results["Lift Truck Driver"] == ("forklift_driver", "")
+    assert results["Shipping Clerk"] == ("", "")
+
+@with_model
+def test_accepted_suggestion_becomes_a_role_for_every_classifier():
+    role_classifier = classifier()
+    # Stands in for another process's classifier, with its cache already loaded
+    other = classifier(role_classifier.storage)
+    assert classify(["Lift Truck Driver"], role_classifier)["Lift Truck Driver"][0] == ""
+    assert classify(["Lift Truck Driver"], other)["Lift Truck Driver"][0] == ""
+
+    assert role_classifier.accept("lift truck drivers") == "forklift_driver"
+    assert classify(["Lift Truck Driver"], role_classifier)["Lift Truck Driver"] == ("forklift_driver", "")
+    assert classify(["Lift Truck Driver"], other)["Lift Truck Driver"] == ("forklift_driver", "")
+
+    role_classifier.accept("Shipping Clerk", "consolidation")
+    assert classify(["Shipping Clerk"], role_classifier)["Shipping Clerk"] == ("consolidation", "")
+    with pytest.raises(ValueError):
+        role_classifier.accept("Receiving Clerk")
+    with pytest.raises(ValueError):
+        role_classifier.accept("Receiving Clerk", "driver")
+
+def test_unloaded_model_is_not_loaded_by_classifying():
+    saved = semantic_search._embedding_function, semantic_search._model_loaded
+    embedding = BagOfWordsEmbedding()
+    semantic_search._embedding_function, semantic_search._model_loaded = embedding, False
+    try:
+        role_classifier = classifier()
+        results = classify(["Level 2 Forklift Driver", "Lift Truck Driver"], role_classifier)
+        assert results == {"Level 2 Forklift Driver": ("forklift_driver", ""), "Lift Truck Driver": ("", "")}
+        assert embedding.calls == 0
+
+        # Left unclassified, so it is suggested once the model is loaded
+        semantic_search._model_loaded = True
+        assert classify(["Lift Truck Driver"], role_classifier)["Lift Truck Driver"][1].startswith("forklift_driver:")
+    finally:
+        semantic_search._embedding_function, semantic_search._model_loaded = saved
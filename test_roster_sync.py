@@ -0,0 +1,112 @@
+"""Checks that a roster sync only replaces imported HR fields, on both storage backends."""
+
+import os
+import tempfile
+
+import pandas as pd
+from roster_import import RosterSync, prepare_frame
+from storage import SQLiteStorage, ChromaStorage
+
+def export(*employees):
+    """HR export rows as (employee ID, first name, last name, job title)."""
+    return prepare_frame(pd.DataFrame([
+        {"Employee Id": emp_id, "Preferred First Name": first, "Last Name": last,
+         "Position Description": title, "Account": "Warehouse"}
+        for emp_id, first, last, title in employees
+    ]))
+
+def sync(storage, df, deactivate_missing=True):
+    roster_sync = RosterSync(storage, deactivate_missing)
+    roster_sync.process(df)
+    return roster_sync.finish()
+
+def backends():
+    directory = tempfile.mkdtemp(prefix="roster_sync_storage_")
+    return [SQLiteStorage(os.path.join(directory, "scheduler.sqlite3")), ChromaStorage(directory)]
+
+def stored(storage):
+    return dict(storage.iter_employees())
+
+def set_fields(storage, emp_id, **fields):
+    storage.update_employee_metadata([emp_id], [{**stored(storage)[emp_id], **fields}])
+
+def test_sync_keeps_fields_set_outside_the_import():
+    for storage in backends():
+        sync(storage, export(("1", "Ana", "Diaz", "Forklift Driver"), ("2", "Ben", "Lee", "Loader")))
+        set_fields(storage, "1", on_leave=True, skills="Reach Truck", shift_preferences="early")
+        set_fields(storage, "2", active=False)
+
+        summary = sync(storage, export(("1", "Ana", "Diaz", "Lead Forklift Driver"), ("2", "Ben", "Lee", "Receiver")))
+        assert sorted(summary["updated"]) == ["1", "2"], summary
+
+        employees = stored(storage)
+        assert employees["1"]["original_job_title"] == "Lead Forklift Driver"
+        assert employees["1"]["on_leave"] is True
+        assert employees["1"]["skills"] == "Reach Truck"
+        assert employees["1"]["shift_preferences"] == "early"
+        assert employees["2"]["original_job_title"] == "Receiver"
+        assert employees["2"]["active"] is False, f"{type(storage).__name__} reactivated a manually deactivated employee"
+
+def test_sync_deactivates_and_reactivates():
+    for storage in backends():
+        sync(storage, export(("1", "Ana", "Diaz", "Forklift Driver"), ("2", "Ben", "Lee", "Loader")))
+        set_fields(storage, "2", skills="Reach Truck")
+
+        summary = sync(storage, export(("1", "Ana", "Diaz", "Forklift Driver")))
+        assert summary["deactivated"] == ["2"], summary
+        assert stored(storage)["2"]["active"] is False
+
+        summary = sync(storage, export(("1", "Ana", "Diaz", "Forklift Driver"), ("2", "Ben", "Lee", "Loader")))
+        assert summary["reactivated"] == ["2"], summary
+        employee = stored(storage)["2"]
+        assert employee["active"] is True and employee["removed_from_source"] is False
+        assert employee["skills"] == "Reach Truck", f"{type(storage).__name__} dropped skills on reactivation"
+
+def test_sync_without_deactivate_missing_keeps_absent_employees():
+    for storage in backends():
+        sync(storage, export(("1", "Ana", "Diaz", "Forklift Driver"), ("2", "Ben", "Lee", "Loader")))
+
+        summary = sync(storage, export(("1", "Ana", "Diaz", "Forklift Driver")), deactivate_missing=False)
+        assert summary["deactivated"] == [], summary
+        assert stored(storage)["2"].get("active", True) is True
+        assert not stored(storage)["2"].get("removed_from_source")
+
+def upload_client(monkeypatch, token="upload-secret"):
+    """Test client for the app with the upload token set."""
+    import main
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(main, "ROSTER_UPLOAD_TOKEN", token)
+    return TestClient(main.app, headers={"Authorization": f"Bearer {token}"} if token else {})
+
+def test_upload_keeps_absent_employees_unless_asked(monkeypatch):
+    from storage import get_storage
+
+    client = upload_client(monkeypatch)
+    header = "Employee Id,Preferred First Name,Last Name,Position Description,Account\n"
+    full = header + "u1,Ana,Diaz,Forklift Driver,Warehouse\nu2,Ben,Lee,Loader,Warehouse\n"
+    partial = header + "u1,Ana,Diaz,Forklift Driver,Warehouse\n"
+
+    assert "event: complete" in client.post("/api/employees/upload", content=full).text
+    response = client.post("/api/employees/upload", content=partial)
+    assert '"deactivated":[]' in response.text.replace(" ", ""), response.text
+    assert stored(get_storage())["u2"].get("active", True) is True
+
+    response = client.post("/api/employees/upload?deactivate_missing=true", content=partial)
+    assert '"deactivated":["u2"]' in response.text.replace(" ", ""), response.text
+    assert stored(get_storage())["u2"]["active"] is False
+
+def test_upload_needs_the_token_and_a_body_within_the_limit(monkeypatch):
+    import main
+
+    body = "Employee Id,Preferred First Name,Last Name,Position Description,Account\nu9,Ana,Diaz,Loader,Warehouse\n"
+    assert upload_client(monkeypatch, token="").post("/api/employees/upload", content=body).status_code == 403
+
+    client = upload_client(monkeypatch)
+    response = client.post("/api/employees/upload", content=body, headers={"Authorization": "Bearer wrong"})
+    assert response.status_code == 401
+    assert client.post("/api/employees/upload", content=body, headers={"Authorization": ""}).status_code == 401
+
+    monkeypatch.setattr(main, "ROSTER_UPLOAD_MAX_BYTES", len(body) - 1)
+    response = client.post("/api/employees/upload", content=body)
+    assert response.status_code == 413, response.text
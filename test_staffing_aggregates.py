@@ -0,0 +1,62 @@
+"""Checks that the incrementally maintained staffing aggregates always equal a rebuild from the history."""
+
+import random
+from datetime import date, timedelta
+
+from staffing_history import AGGREGATES_KEY, build_staffing_aggregates, calculate_moving_averages, save_daily_staffing
+from storage import get_storage
+
+# Saves every workers-th date, so the workers' dates arrive interleaved and slightly out of order
+WORKER_SCRIPT = """
+from datetime import date, timedelta
+from staffing_history import save_daily_staffing
+for day in range(worker, int(args[0]), workers):
+    save_daily_staffing((date(2026, 1, 1) + timedelta(days=day)).isoformat(),
+                        {"inbound": {"lumper": day % 5 + 1}, "picking": {"picker": day % 3 + worker}})
+"""
+
+def staffing(day: int, revision: int = 0):
+    roles = {"inbound": {"lumper": (day + revision) % 4 + 1}, "picking": {"picker": day % 3 + 2}}
+    if day % 4 == 0:
+        roles["outbound"] = {"forklift_driver": revision + 1}
+    return roles
+
+def assert_aggregates_match_rebuild():
+    storage = get_storage()
+    saved = storage.get_state(AGGREGATES_KEY)
+    rebuilt = build_staffing_aggregates(storage.get_staffing_range("1900-01-01", "9999-12-31"))
+    assert saved == rebuilt, "saved aggregates differ from a rebuild of the history"
+
+def test_aggregates_match_rebuild_after_out_of_order_saves():
+    first = date(2024, 1, 1)
+    days = list(range(120))
+    random.Random(7).shuffle(days)
+    # Every date once in random order, then re-saves of recent and older dates
+    saves = [(day, 0) for day in days] + [(day, 1) for day in (119, 118, 117, 60, 3, 119)]
+    for day, revision in saves:
+        assert save_daily_staffing((first + timedelta(days=day)).strftime("%Y-%m-%d"), staffing(day, revision))
+    assert_aggregates_match_rebuild()
+
+def test_aggregates_match_rebuild_after_concurrent_saves_from_several_processes(run_workers):
+    workers, days = 4, 240
+    assert run_workers(WORKER_SCRIPT, workers, days) == [0] * workers
+    assert len(get_storage().get_staffing_range("2026-01-01", "2026-12-31")) == days
+    assert_aggregates_match_rebuild()
+
+def test_moving_averages_of_every_period_end_at_the_latest_saved_date():
+    first = date(2029, 1, 1)
+    for day in range(40):
+        assert save_daily_staffing((first + timedelta(days=day)).strftime("%Y-%m-%d"), staffing(day))
+    history = get_storage().get_staffing_range("1900-01-01", "9999-12-31")
+    end = history[-1]["date"]
+
+    for days in (7, 10, 28):
+        start = (date.fromisoformat(end) - timedelta(days=days - 1)).isoformat()
+        records = [record for record in history if start <= record["date"] <= end]
+        roles = {role for record in records for role in record["roles"]}
+        expected = {
+            role: round(sum(record["roles"][role] for record in records if role in record["roles"])
+                        / sum(role in record["roles"] for record in records), 1)
+            for role in roles
+        }
+        assert calculate_moving_averages(days) == expected, f"{days}-day averages"
@@ -0,0 +1,35 @@
+"""Checks that the staffing matrix matches the history after concurrent writes and rebuilds from several processes."""
+
+import math
+from datetime import date, timedelta
+
+import config
+from staffing_matrix import StaffingMatrix
+from storage import get_storage
+
+# Saves every workers-th date with roles new to the matrix; worker 0 also rebuilds it now and then
+WORKER_SCRIPT = """
+from datetime import date, timedelta
+from staffing_history import save_daily_staffing
+from staffing_matrix import get_staffing_matrix
+matrix = get_staffing_matrix()
+for day in range(worker, int(args[0]), workers):
+    roles = {"worker%d" % worker: {"role%d" % (day % 5): day + 1}, "all": {"shared": worker}}
+    assert save_daily_staffing((date(2027, 1, 1) + timedelta(days=day)).isoformat(), roles)
+    if worker == 0 and day % 40 == 0:
+        matrix.rebuild_from_storage()
+"""
+
+def test_matrix_matches_history_after_concurrent_writes_and_rebuilds(run_workers):
+    workers, days = 4, 200
+    assert run_workers(WORKER_SCRIPT, workers, days) == [0] * workers
+
+    last = (date(2027, 1, 1) + timedelta(days=days - 1)).isoformat()
+    history = get_storage().get_staffing_range("2027-01-01", last)
+    assert len(history) == days
+    first_date, roles, values = StaffingMatrix(config.STAFFING_MATRIX_PATH).window("2027-01-01", last)
+    assert first_date == "2027-01-01" and len(values) == days
+    assert len(roles) == len(set(roles)), f"roles share columns: {roles}"
+    for row, record in zip(values, history):
+        saved = {role: float(value) for role, value in zip(roles, row) if not math.isnan(value)}
+        assert saved == record["roles"], f"matrix row for {record['date']} is {saved}, saved {record['roles']}"
@@ -0,0 +1,30 @@
+"""Checks that an upgraded install's Chroma data is copied into a new SQLite database on first start."""
+
+import logging
+import os
+import tempfile
+
+from storage import ChromaStorage, SQLiteStorage, migrate_chroma_on_first_start
+
+def test_first_start_copies_chroma_data_into_empty_sqlite(caplog):
+    directory = tempfile.mkdtemp(prefix="storage_migration_")
+    chroma = ChromaStorage(directory)
+    chroma.upsert_employees(["1", "2"], [{"employee_id": "1", "active": True}, {"employee_id": "2", "active": True}], ["", ""])
+    chroma.upsert_staffing("2028-01-03", {"inbound_lumper": 2}, "")
+    target = SQLiteStorage(os.path.join(directory, "scheduler.sqlite3"))
+
+    with caplog.at_level(logging.WARNING, logger="storage"):
+        counts = migrate_chroma_on_first_start(target, directory)
+    assert counts == {"employees": 2, "assignments": 0, "staffing_history": 1}
+    assert "copying it over" in caplog.text
+    assert sorted(emp_id for emp_id, _ in target.iter_employees()) == ["1", "2"]
+    assert target.get_staffing_range("2028-01-01", "2028-12-31")[0]["roles"] == {"inbound_lumper": 2}
+
+    # Later starts leave the migrated database alone; a new empty one is still filled
+    chroma.upsert_employees(["3"], [{"employee_id": "3", "active": True}], [""])
+    assert migrate_chroma_on_first_start(target, directory) is None
+    assert migrate_chroma_on_first_start(SQLiteStorage(os.path.join(directory, "other.sqlite3")), directory) is not None
+
+def test_new_install_without_chroma_data_is_not_migrated():
+    directory = tempfile.mkdtemp(prefix="storage_migration_")
+    assert migrate_chroma_on_first_start(SQLiteStorage(os.path.join(directory, "scheduler.sqlite3")), directory) is None
@@ -1,7 +1,49 @@
 """Utility functions for the warehouse scheduler."""
 
-import pandas as pd
-from typing import Optional, Tuple
+from __future__ import annotations
+
+import importlib
+import os
+import threading
+import time
+from typing import Optional, Tuple, Dict, Any, Callable
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+class LazyModule:
+    """Module proxy that imports the real module on first attribute access."""
+
+    def __init__(self, name: str):
+        self._name = name
+
+    def __getattr__(self, attr: str) -> Any:
+        # import_module returns the cached module after the first call
+        return getattr(importlib.import_module(self._name), attr)
+
+    def __repr__(self) -> str:
+        return f"<lazy module {self._name!r}>"
+
+def lazy_import(name: str) -> LazyModule:
+    """
+    Defer importing a heavy library until it is actually used.
+
+    Keeps pandas, numpy and similar libraries out of the app's cold start
+    for requests that never touch them. Annotations using the module must
+    not be evaluated at import time (use `from __future__ import annotations`).
+
+    Args:
+        name: Fully qualified module name
+
+    Returns:
+        Proxy usable in place of the module
+    """
+    return LazyModule(name)
+
+pd = lazy_import("pandas")
 
 def find_column_by_pattern(df: pd.DataFrame, patterns: list) -> Optional[str]:
     """
@@ -51,4 +93,109 @@ def parse_column_data(df: pd.DataFrame, column: str) -> list:
     if column not in df.columns:
         return []
     
-    return [safe_float_convert(val) for val in df[column].values]
\ No newline at end of file
+    return [safe_float_convert(val) for val in df[column].values]
+
+def report_progress(progress_callback: Optional[Callable[[str, Dict[str, Any]], None]],
+                    stage: str, data: Dict[str, Any]) -> None:
+    """
+    Report a completed scheduler stage to the caller, if it asked for updates.
+    
+    Args:
+        progress_callback: Callable receiving (stage, data), or None
+        stage: Name of the stage that just completed
+        data: Partial results produced by the stage
+    """
+    if progress_callback is None:
+        return
+    try:
+        progress_callback(stage, data)
+    except Exception as e:
+        print(f"Error reporting scheduler progress for stage {stage}: {e}")
+
+class FileLock:
+    """
+    Exclusive lock shared by every process using the same lock file.
+
+    Held with flock on POSIX and msvcrt.locking on Windows, so the OS
+    releases it if the holder dies and there are no stale locks to clean up.
+    Re-entrant within a process: nested acquires by the holding thread only
+    take the file lock once.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def _lock_file(self, blocking: bool) -> bool:
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+                return True
+            except BlockingIOError:
+                return False
+        while True:
+            try:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_NBLCK, 1)
+                return True
+            except OSError:
+                if not blocking:
+                    return False
+                time.sleep(0.05)
+
+    def _unlock_file(self) -> None:
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """
+        Take the lock.
+
+        Args:
+            blocking: Wait for the lock instead of giving up if it is held
+
+        Returns:
+            bool: True if the lock was acquired
+        """
+        if not self._thread_lock.acquire(blocking):
+            return False
+        if self._depth == 0:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                self._file = open(self.path, "a+")
+                if not self._lock_file(blocking):
+                    self._file.close()
+                    self._file = None
+                    self._thread_lock.release()
+                    return False
+            except Exception:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+        return True
+
+    def release(self) -> None:
+        """Release one acquire; the file lock is dropped by the outermost one."""
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                self._unlock_file()
+            finally:
+                self._file.close()
+                self._file = None
+        self._thread_lock.release()
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()